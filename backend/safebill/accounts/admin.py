@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, BusinessDetail, BankAccount, BuyerModel, SellerRating , DeletedUser
+from .models import User, BusinessDetail, BankAccount, BuyerModel, SellerRating , SellerRatingBucket, DeletedUser
 
 # Register your models here.
 admin.site.register(User, UserAdmin)
@@ -8,4 +8,5 @@ admin.site.register(BusinessDetail)
 admin.site.register(BankAccount)
 admin.site.register(BuyerModel)
 admin.site.register(SellerRating)
+admin.site.register(SellerRatingBucket)
 admin.site.register(DeletedUser)
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+Offline geocoding of seller addresses.
+
+Coordinates come from bundled tables, never from a network call, so geocoding
+is cheap enough to run on every BusinessDetail save:
+
+- ``data/postal_code_centroids.csv``: the default postal-code table
+  (``postal_code,latitude,longitude``, the mean of the commune points of each
+  postal code), built from the open La Poste postal code base with
+  ``manage.py build_postal_centroids``. SELLER_POSTAL_CENTROIDS_FILE points at
+  another table in the same format.
+- ``data/department_centroids.csv``: one reference point (the prefecture) per
+  French department. Only a fallback for postal codes missing from the
+  postal-code table, since every seller in a department gets the same point.
+"""
+import csv
+import logging
+import math
+import os
+import re
+from functools import lru_cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+POSTAL_CODE_CENTROIDS_FILE = os.path.join(DATA_DIR, 'postal_code_centroids.csv')
+DEPARTMENT_CENTROIDS_FILE = os.path.join(DATA_DIR, 'department_centroids.csv')
+EARTH_RADIUS_KM = 6371.0
+
+PRECISION_POSTAL_CODE = 'postal_code'
+PRECISION_DEPARTMENT = 'department'
+
+_POSTAL_CODE_RE = re.compile(r'\b(\d{5})\b')
+
+
+@lru_cache(maxsize=1)
+def _department_centroids():
+    with open(DEPARTMENT_CENTROIDS_FILE, newline='', encoding='utf-8') as f:
+        return {
+            row['code']: (float(row['latitude']), float(row['longitude']))
+            for row in csv.DictReader(f)
+        }
+
+
+@lru_cache(maxsize=1)
+def _postal_code_centroids():
+    path = getattr(settings, 'SELLER_POSTAL_CENTROIDS_FILE', '') or POSTAL_CODE_CENTROIDS_FILE
+    try:
+        with open(path, newline='', encoding='utf-8') as f:
+            return {
+                row['postal_code'].strip(): (float(row['latitude']), float(row['longitude']))
+                for row in csv.DictReader(f)
+            }
+    except (OSError, KeyError, ValueError) as e:
+        logger.error(
+            f"Failed to load postal code centroids from {path}, "
+            f"geocoding to department level only: {e}"
+        )
+        return {}
+
+
+def department_for_postal_code(postal_code):
+    """Department code of a French postal code ('75011' -> '75', '20090' -> '2A')."""
+    if not postal_code or len(postal_code) != 5 or not postal_code.isdigit():
+        return None
+    if postal_code.startswith('97'):
+        return postal_code[:3]
+    if postal_code.startswith('20'):
+        # Corsica: 200xx/201xx are Corse-du-Sud, 202xx-206xx Haute-Corse
+        return '2A' if postal_code[2] in '01' else '2B'
+    return postal_code[:2]
+
+
+def extract_postal_code(address):
+    """Last 5-digit group of an address (street numbers come before the postal code)."""
+    matches = _POSTAL_CODE_RE.findall(address or '')
+    return matches[-1] if matches else None
+
+
+def geocode_postal_code(postal_code):
+    """
+    Resolve a postal code to coordinates.
+
+    Returns:
+        tuple: (latitude, longitude, precision) or None if unknown
+    """
+    postal_code = (postal_code or '').strip()
+    point = _postal_code_centroids().get(postal_code)
+    if point:
+        return point[0], point[1], PRECISION_POSTAL_CODE
+    point = _department_centroids().get(department_for_postal_code(postal_code))
+    if point:
+        return point[0], point[1], PRECISION_DEPARTMENT
+    return None
+
+
+def geocode_business_detail(business_detail):
+    """
+    Set latitude/longitude/geocode_precision from the seller's full address.
+
+    Returns:
+        bool: True if the stored coordinates changed
+    """
+    result = geocode_postal_code(extract_postal_code(business_detail.full_address))
+    latitude, longitude, precision = result if result else (None, None, '')
+    changed = (
+        business_detail.latitude != latitude
+        or business_detail.longitude != longitude
+        or business_detail.geocode_precision != precision
+    )
+    business_detail.latitude = latitude
+    business_detail.longitude = longitude
+    business_detail.geocode_precision = precision
+    return changed
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Latitude/longitude ranges enclosing a circle, for an indexed prefilter.
+
+    Returns:
+        tuple: (min_lat, max_lat, min_lng, max_lng)
+    """
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    # Longitude degrees shrink towards the poles; clamp to avoid dividing by ~0
+    cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+    lng_delta = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat))
+    return (
+        latitude - lat_delta,
+        latitude + lat_delta,
+        longitude - lng_delta,
+        longitude + lng_delta,
+    )
@@ -0,0 +1,163 @@
+"""
+Benchmark the seller search on synthetic sellers.
+Run: python manage.py benchmark_seller_search --sizes 1000,10000
+
+Sellers are created inside a transaction that is rolled back at the end, so the
+command leaves the database unchanged.
+"""
+
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts import seller_search
+from accounts.geocoding import geocode_business_detail
+from accounts.models import BusinessDetail
+from accounts.seller_search import REGION_TO_DEPARTMENTS, get_seller_data
+
+User = get_user_model()
+
+ACTIVITY_TYPES = ['plomberie', 'electricite', 'maconnerie', 'peinture', 'menuiserie', 'chauffage']
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark seller search (legacy full list, OFFSET page, keyset page, facets, radius) on synthetic data"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default='1000,10000',
+            help='Comma-separated seller counts to benchmark (default: 1000,10000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per measurement; the median is reported (default: 5)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed so runs are comparable (default: 42)',
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        for size in sizes:
+            try:
+                with transaction.atomic():
+                    self._create_sellers(size, random.Random(options['seed']))
+                    self._benchmark(size, options['repeat'])
+                    raise _Rollback()
+            except _Rollback:
+                pass
+        self.stdout.write(self.style.SUCCESS('Benchmark finished; synthetic sellers rolled back'))
+
+    def _create_sellers(self, size, rng):
+        departments = [dept for depts in REGION_TO_DEPARTMENTS.values() for dept in depts]
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f'bench_seller_{i:07d}',
+                    email=f'bench_seller_{i:07d}@example.com',
+                    role='seller',
+                    seller_onboarding_complete=True,
+                    average_rating=Decimal(rng.randint(0, 500)) / Decimal('100'),
+                    rating_count=rng.randint(0, 200),
+                )
+                for i in range(size)
+            ],
+            batch_size=2000,
+        )
+        details = [
+            BusinessDetail(
+                user=user,
+                company_name=f'Bench {user.username}',
+                siret_number=f'{i:014d}',
+                full_address=f'{i} rue du Test, {rng.randint(10000, 95999)} Ville',
+                type_of_activity=rng.choice(ACTIVITY_TYPES),
+                selected_service_areas=rng.sample(departments, rng.randint(1, 4)),
+            )
+            for i, user in enumerate(users)
+        ]
+        # bulk_create skips save(), which is where sellers are normally geocoded
+        for detail in details:
+            geocode_business_detail(detail)
+        BusinessDetail.objects.bulk_create(details, batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE accounts_user')
+            cursor.execute('ANALYZE accounts_businessdetail')
+
+    def _measure(self, repeat, func):
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = len(captured)
+        timings.sort()
+        return timings[len(timings) // 2], queries
+
+    def _benchmark(self, size, repeat):
+        filters = {'service_type': ACTIVITY_TYPES[0], 'region': 'ile_de_france'}
+        sellers = seller_search.apply_filters(seller_search.base_queryset(), **filters)
+
+        # Deep page: halfway through the matching sellers
+        deep_offset = sellers.count() // 2
+        anchor = sellers[deep_offset - 1] if deep_offset else None
+        deep_cursor = seller_search.encode_cursor(anchor) if anchor else None
+
+        def legacy_list_without_join():
+            # What the old endpoints did: no select_related, one user query per seller
+            qs = seller_search.apply_filters(
+                BusinessDetail.objects.filter(user__seller_onboarding_complete=True)
+                .order_by('-user__average_rating', 'user__username'),
+                **filters,
+            )
+            [get_seller_data(seller) for seller in qs]
+
+        # .all() in each run gives a fresh queryset, so no run reads another's result cache
+        def legacy_list():
+            [get_seller_data(seller) for seller in sellers.all()]
+
+        def offset_page():
+            page = sellers.all()[deep_offset:deep_offset + seller_search.DEFAULT_PAGE_SIZE]
+            [get_seller_data(seller) for seller in page]
+
+        def keyset_page():
+            page, _ = seller_search.paginate(sellers, cursor=deep_cursor)
+            [get_seller_data(seller) for seller in page]
+
+        def facets():
+            seller_search.facet_counts(sellers)
+
+        def radius_page():
+            # 30 km around Lyon, nearest first
+            qs = seller_search.nearby(seller_search.base_queryset(), 45.764, 4.8357, 30)
+            page, _ = seller_search.paginate(qs)
+            [get_seller_data(seller) for seller in page]
+
+        self.stdout.write(self.style.SUCCESS(f"\n{size} sellers (service_type + region filter)"))
+        for label, func in [
+            ('full list, no join (old)', legacy_list_without_join),
+            ('full list, joined', legacy_list),
+            (f'OFFSET page at {deep_offset}', offset_page),
+            ('keyset page at same row', keyset_page),
+            ('facets', facets),
+            ('radius page (30 km)', radius_page),
+        ]:
+            elapsed_ms, queries = self._measure(repeat, func)
+            self.stdout.write(f"  {label:<28} {elapsed_ms:8.1f} ms  {queries:5d} queries")
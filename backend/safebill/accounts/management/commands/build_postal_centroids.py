@@ -0,0 +1,96 @@
+"""
+Build the bundled postal code centroid table from the open La Poste postal code base.
+Run: python manage.py build_postal_centroids <base_officielle_codes_postaux.csv> [--output PATH]
+
+The source is the "Base officielle des codes postaux" (La Poste, Licence Ouverte),
+one row per commune/postal code pair with the commune's point either in a
+``coordonnees_gps`` ("lat, lng") column or in ``latitude``/``longitude`` columns.
+A postal code shared by several communes gets the mean of their points. Run
+geocode_sellers --all afterwards to move existing sellers onto the new table.
+"""
+
+import csv
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.geocoding import POSTAL_CODE_CENTROIDS_FILE
+
+
+def _column(fieldnames, *candidates):
+    by_name = {name.lstrip('#').strip().lower(): name for name in fieldnames or []}
+    for candidate in candidates:
+        if candidate in by_name:
+            return by_name[candidate]
+    return None
+
+
+def _commune_point(row, gps_column, lat_column, lng_column):
+    try:
+        if gps_column:
+            latitude, longitude = row[gps_column].split(',')
+        else:
+            latitude, longitude = row[lat_column], row[lng_column]
+        return float(latitude), float(longitude)
+    except (AttributeError, ValueError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Build the postal_code,latitude,longitude table used to geocode sellers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='La Poste postal code base (CSV, ";" or "," separated)')
+        parser.add_argument(
+            '--output',
+            default=POSTAL_CODE_CENTROIDS_FILE,
+            help='Table to write (default: the bundled accounts/data/postal_code_centroids.csv)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['source'], newline='', encoding='utf-8-sig') as f:
+                dialect = csv.Sniffer().sniff(f.readline(), delimiters=';,')
+                f.seek(0)
+                reader = csv.DictReader(f, dialect=dialect)
+                postal_column = _column(reader.fieldnames, 'code_postal', 'postal_code')
+                commune_column = _column(reader.fieldnames, 'code_commune_insee')
+                gps_column = _column(reader.fieldnames, 'coordonnees_gps', 'coordonnees_geographiques')
+                lat_column = _column(reader.fieldnames, 'latitude')
+                lng_column = _column(reader.fieldnames, 'longitude')
+                if not postal_column or not (gps_column or (lat_column and lng_column)):
+                    raise CommandError(
+                        f"{options['source']} has no postal code and coordinate columns "
+                        f"(found: {', '.join(reader.fieldnames or [])})"
+                    )
+
+                # One point per commune: the base repeats communes once per Ligne_5 locality
+                communes = defaultdict(dict)
+                skipped = 0
+                for row in reader:
+                    postal_code = (row[postal_column] or '').strip().zfill(5)
+                    point = _commune_point(row, gps_column, lat_column, lng_column)
+                    if not point or len(postal_code) != 5 or not postal_code.isdigit():
+                        skipped += 1
+                        continue
+                    commune = row[commune_column] if commune_column else point
+                    communes[postal_code].setdefault(commune, point)
+        except (OSError, csv.Error) as e:
+            raise CommandError(f"Cannot read {options['source']}: {e}")
+
+        with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['postal_code', 'latitude', 'longitude'])
+            for postal_code in sorted(communes):
+                points = list(communes[postal_code].values())
+                writer.writerow([
+                    postal_code,
+                    f"{sum(p[0] for p in points) / len(points):.5f}",
+                    f"{sum(p[1] for p in points) / len(points):.5f}",
+                ])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(communes)} postal codes to {options['output']}"
+        ))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"Skipped {skipped} rows without a postal code or point"))
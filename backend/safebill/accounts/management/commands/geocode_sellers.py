@@ -0,0 +1,59 @@
+"""
+Geocode seller addresses from the bundled offline centroid tables.
+Run: python manage.py geocode_sellers [--all]
+
+New and edited sellers are geocoded on save and migration 0023 filled in the
+existing rows; this catches up rows left without coordinates (or recomputes
+everything after the postal code table changes).
+"""
+
+from django.core.management.base import BaseCommand
+
+from accounts.geocoding import geocode_business_detail
+from accounts.models import BusinessDetail
+
+
+class Command(BaseCommand):
+    help = "Store latitude/longitude for sellers from the postal code in their address"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every seller, not only those without coordinates',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows written per UPDATE batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        sellers = BusinessDetail.objects.only(
+            'id', 'full_address', 'latitude', 'longitude', 'geocode_precision'
+        ).order_by('id')
+        if not options['all']:
+            sellers = sellers.filter(latitude__isnull=True)
+
+        batch = []
+        updated = 0
+        unresolved = 0
+        for seller in sellers.iterator(chunk_size=options['batch_size']):
+            if geocode_business_detail(seller):
+                batch.append(seller)
+            if seller.latitude is None:
+                unresolved += 1
+            if len(batch) >= options['batch_size']:
+                BusinessDetail.objects.bulk_update(batch, ['latitude', 'longitude', 'geocode_precision'])
+                updated += len(batch)
+                batch = []
+        if batch:
+            BusinessDetail.objects.bulk_update(batch, ['latitude', 'longitude', 'geocode_precision'])
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Updated coordinates of {updated} sellers"))
+        if unresolved:
+            self.stdout.write(
+                self.style.WARNING(f"{unresolved} sellers have no recognizable postal code in their address")
+            )
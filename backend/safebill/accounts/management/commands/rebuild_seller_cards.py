@@ -0,0 +1,32 @@
+"""
+Rebuild the stored listing card of every seller.
+Run: python manage.py rebuild_seller_cards
+
+Cards are kept up to date on save; run this after the migration that adds
+them, or after changing what build_seller_card returns.
+"""
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import BusinessDetail
+from accounts.seller_search import refresh_seller_cards
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized seller listing cards"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Sellers rebuilt per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        ids = list(BusinessDetail.objects.order_by('id').values_list('id', flat=True))
+        rebuilt = 0
+        for start in range(0, len(ids), options['batch_size']):
+            batch = ids[start:start + options['batch_size']]
+            rebuilt += refresh_seller_cards(BusinessDetail.objects.filter(id__in=batch))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} seller cards"))
@@ -0,0 +1,32 @@
+"""
+Rebuild the full-text/trigram search entry of every seller.
+Run: python manage.py rebuild_seller_search_index
+
+Entries are kept up to date on save and migration 0024 built them for the
+existing sellers; run this after changing what refresh_search_index indexes.
+"""
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import BusinessDetail
+from accounts.seller_search import refresh_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the seller free-text search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Sellers updated per statement (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        ids = list(BusinessDetail.objects.order_by('id').values_list('id', flat=True))
+        updated = 0
+        for start in range(0, len(ids), options['batch_size']):
+            batch = ids[start:start + options['batch_size']]
+            updated += refresh_search_index(BusinessDetail.objects.filter(id__in=batch))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the search entry of {updated} sellers"))
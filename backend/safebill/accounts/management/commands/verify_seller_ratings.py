@@ -0,0 +1,39 @@
+"""
+Check seller rating totals and histograms against SellerRating.
+Run: python manage.py verify_seller_ratings [--fix]
+
+Totals are maintained incrementally on every rating write (migration 0026
+backfilled them for existing ratings); this recomputes them from scratch.
+"""
+
+from django.core.management.base import BaseCommand
+
+from accounts.services import SellerRatingService
+
+
+class Command(BaseCommand):
+    help = "Verify (and optionally fix) seller rating totals and histograms"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Overwrite drifted sellers with the recomputed values',
+        )
+
+    def handle(self, *args, **options):
+        drift = SellerRatingService.verify(fix=options['fix'])
+        for item in drift:
+            stored, expected = item['stored'], item['expected']
+            self.stdout.write(self.style.WARNING(
+                f"Seller {item['seller_id']}: stored {stored['rating_count']} ratings / "
+                f"sum {stored['rating_sum']} / avg {stored['average_rating']} / {stored['histogram']}, "
+                f"expected {expected['rating_count']} / {expected['rating_sum']} / "
+                f"{expected['average_rating']} / {expected['histogram']}"
+            ))
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("All seller rating totals are consistent"))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(drift)} sellers"))
+        else:
+            self.stdout.write(self.style.ERROR(f"{len(drift)} sellers drifted; rerun with --fix"))
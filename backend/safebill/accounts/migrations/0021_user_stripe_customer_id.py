@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_deleteduser'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='stripe_customer_id',
+            field=models.CharField(blank=True, db_index=True, default='', help_text="Stripe Customer used for this user's checkouts", max_length=255),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:31
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indexes are built CONCURRENTLY so seller search keeps working while they build
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0021_user_stripe_customer_id'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='businessdetail',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['selected_service_areas'], name='bizdetail_service_areas_gin'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='businessdetail',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('selected_categories', name='jsonb_path_ops'), name='bizdetail_categories_gin'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='businessdetail',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('selected_subcategories', name='jsonb_path_ops'), name='bizdetail_subcategories_gin'),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='businessdetail',
+            index=models.Index(django.db.models.functions.text.Lower('type_of_activity'), name='bizdetail_activity_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:34
+
+import csv
+import os
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of accounts.geocoding as of this migration, so later changes to
+# the live module don't change what this backfill does
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+POSTAL_CODE_RE = re.compile(r'\b(\d{5})\b')
+
+
+def _read_centroids(path, code_column):
+    try:
+        with open(path, newline='', encoding='utf-8') as f:
+            return {
+                row[code_column].strip(): (float(row['latitude']), float(row['longitude']))
+                for row in csv.DictReader(f)
+            }
+    except (OSError, KeyError, ValueError):
+        return {}
+
+
+def _department(postal_code):
+    if postal_code.startswith('97'):
+        return postal_code[:3]
+    if postal_code.startswith('20'):
+        return '2A' if postal_code[2] in '01' else '2B'
+    return postal_code[:2]
+
+
+def geocode_existing_sellers(apps, schema_editor):
+    # New and edited sellers are geocoded on save; fill in the existing rows
+    BusinessDetail = apps.get_model('accounts', 'BusinessDetail')
+    postal_codes = _read_centroids(
+        getattr(settings, 'SELLER_POSTAL_CENTROIDS_FILE', '')
+        or os.path.join(DATA_DIR, 'postal_code_centroids.csv'),
+        'postal_code',
+    )
+    departments = _read_centroids(os.path.join(DATA_DIR, 'department_centroids.csv'), 'code')
+
+    fields = ['latitude', 'longitude', 'geocode_precision']
+    batch = []
+    for detail in BusinessDetail.objects.only('id', 'full_address', *fields).iterator(chunk_size=1000):
+        matches = POSTAL_CODE_RE.findall(detail.full_address or '')
+        if not matches:
+            continue
+        postal_code = matches[-1]
+        if postal_code in postal_codes:
+            point, precision = postal_codes[postal_code], 'postal_code'
+        elif _department(postal_code) in departments:
+            point, precision = departments[_department(postal_code)], 'department'
+        else:
+            continue
+        detail.latitude, detail.longitude = point
+        detail.geocode_precision = precision
+        batch.append(detail)
+        if len(batch) >= 1000:
+            BusinessDetail.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        BusinessDetail.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0022_businessdetail_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='businessdetail',
+            name='geocode_precision',
+            field=models.CharField(blank=True, choices=[('postal_code', 'Postal code'), ('department', 'Department')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='businessdetail',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='businessdetail',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='businessdetail',
+            index=models.Index(fields=['latitude', 'longitude'], name='bizdetail_lat_lng_idx'),
+        ),
+        migrations.RunPython(geocode_existing_sellers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:37
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.contrib.postgres.search
+from django.contrib.postgres.lookups import Unaccent
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Cast, Coalesce, Concat, Lower, Replace
+
+
+def _json_words(field):
+    # ["salle_de_bain", "plomberie"] -> 'salle de bain plomberie' once tokenized
+    return Replace(Cast(field, TextField()), Value('_'), Value(' '), output_field=TextField())
+
+
+def index_existing_sellers(apps, schema_editor):
+    # Entries are rebuilt on save; fill them in for the existing sellers. Frozen
+    # copy of accounts.seller_search.refresh_search_index as of this migration
+    BusinessDetail = apps.get_model('accounts', 'BusinessDetail')
+    User = apps.get_model('accounts', 'User')
+    about = Subquery(User.objects.filter(pk=OuterRef('user_id')).values('about')[:1])
+    ids = list(BusinessDetail.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), 5000):
+        BusinessDetail.objects.filter(id__in=ids[start:start + 5000]).update(
+            search_vector=(
+                SearchVector(
+                    Unaccent(F('company_name')), Unaccent(F('type_of_activity')),
+                    weight='A', config='french',
+                )
+                + SearchVector(
+                    Unaccent(_json_words('selected_categories')),
+                    Unaccent(_json_words('selected_subcategories')),
+                    weight='B', config='french',
+                )
+                + SearchVector(Unaccent(Coalesce(about, Value(''), output_field=TextField())), weight='C', config='french')
+                + SearchVector(Unaccent(F('full_address')), weight='D', config='french')
+            ),
+            search_document=Lower(Unaccent(Concat(
+                F('company_name'), Value(' '),
+                F('type_of_activity'), Value(' '),
+                _json_words('selected_categories'), Value(' '),
+                _json_words('selected_subcategories'), Value(' '),
+                F('full_address'),
+                output_field=TextField(),
+            ))),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_businessdetail_coordinates'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        django.contrib.postgres.operations.UnaccentExtension(),
+        migrations.AddField(
+            model_name='businessdetail',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='businessdetail',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='businessdetail',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='bizdetail_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='businessdetail',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('search_document', name='gin_trgm_ops'), name='bizdetail_search_document_trgm'),
+        ),
+        migrations.RunPython(index_existing_sellers, migrations.RunPython.noop),
+    ]
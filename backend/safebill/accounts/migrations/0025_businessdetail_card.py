@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0024_businessdetail_text_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='businessdetail',
+            name='card',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='businessdetail',
+            name='card_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
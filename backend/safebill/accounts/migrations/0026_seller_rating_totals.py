@@ -0,0 +1,69 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:43
+
+from decimal import ROUND_HALF_UP, Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_totals(apps, schema_editor):
+    # Same grouped aggregates as SellerRatingService.verify(); from here on
+    # the totals are maintained incrementally on every rating write
+    User = apps.get_model('accounts', 'User')
+    SellerRating = apps.get_model('accounts', 'SellerRating')
+    SellerRatingBucket = apps.get_model('accounts', 'SellerRatingBucket')
+
+    users = [
+        User(
+            pk=row['seller_id'],
+            rating_sum=row['total'],
+            rating_count=row['count'],
+            average_rating=(Decimal(row['total']) / row['count']).quantize(
+                Decimal('0.01'), rounding=ROUND_HALF_UP
+            ),
+        )
+        for row in SellerRating.objects.values('seller_id').annotate(
+            total=Sum('rating'), count=Count('id')
+        ).order_by()
+    ]
+    User.objects.bulk_update(users, ['rating_sum', 'rating_count', 'average_rating'], batch_size=1000)
+
+    SellerRatingBucket.objects.bulk_create(
+        [
+            SellerRatingBucket(seller_id=seller_id, rating=rating, count=count)
+            for seller_id, rating, count in SellerRating.objects.values_list(
+                'seller_id', 'rating'
+            ).annotate(count=Count('id')).order_by()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0025_businessdetail_card'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, help_text='Sum of all received ratings (average_rating = rating_sum / rating_count)'),
+        ),
+        migrations.CreateModel(
+            name='SellerRatingBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_buckets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('seller', 'rating')},
+            },
+        ),
+        migrations.RunPython(backfill_rating_totals, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
-from django.db.models import Avg, Count
-from django.db.models.signals import post_save, post_delete
+from django.db.models.functions import Lower
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 
@@ -42,6 +44,8 @@ class User(AbstractUser):
     about = models.TextField(null=True, blank=True)
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00, help_text="Average rating from all received ratings")
     rating_count = models.PositiveIntegerField(default=0, help_text="Total number of ratings received")
+    rating_sum = models.PositiveIntegerField(default=0, help_text="Sum of all received ratings (average_rating = rating_sum / rating_count)")
+    stripe_customer_id = models.CharField(max_length=255, blank=True, default="", db_index=True, help_text="Stripe Customer used for this user's checkouts")
 
     def __str__(self):
         if self.username.startswith('deleted_'):
@@ -64,6 +68,16 @@ class User(AbstractUser):
                     pass
             super().save(*args, **kwargs)
 
+        # Keep the seller's listing card and search entry in step with the profile
+        from .seller_search import SELLER_CARD_USER_FIELDS, refresh_search_index, refresh_seller_cards
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or SELLER_CARD_USER_FIELDS.intersection(update_fields):
+            sellers = BusinessDetail.objects.filter(user_id=self.pk)
+            refresh_seller_cards(sellers)
+            if update_fields is None or 'about' in update_fields:
+                refresh_search_index(sellers)
+
     @property
     def is_super_admin(self):
         """Check if user is a super admin"""
@@ -102,6 +116,66 @@ class BusinessDetail(models.Model):
         max_length=255, blank=True
     ) 
     #skills = models.JSONField(default=list, blank=True)
+    # Geocoded offline from the postal code in full_address (see accounts.geocoding)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geocode_precision = models.CharField(
+        max_length=20,
+        blank=True,
+        default='',
+        choices=[('postal_code', 'Postal code'), ('department', 'Department')],
+    )
+    # Free-text search entry, rebuilt in SQL on save (see seller_search.refresh_search_index)
+    search_vector = SearchVectorField(null=True, editable=False)
+    search_document = models.TextField(blank=True, default='', editable=False)
+    # Listing card (see seller_search.build_seller_card), rebuilt whenever it changes
+    card = models.JSONField(default=dict, blank=True, editable=False)
+    card_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Default jsonb_ops: serves both @> (service area) and ?| (region) lookups
+            GinIndex(fields=['selected_service_areas'], name='bizdetail_service_areas_gin'),
+            # jsonb_path_ops is smaller and faster but only serves @> (__contains)
+            GinIndex(
+                OpClass('selected_categories', name='jsonb_path_ops'),
+                name='bizdetail_categories_gin',
+            ),
+            GinIndex(
+                OpClass('selected_subcategories', name='jsonb_path_ops'),
+                name='bizdetail_subcategories_gin',
+            ),
+            # Case-insensitive activity type match (see seller_search.apply_filters)
+            models.Index(Lower('type_of_activity'), name='bizdetail_activity_lower_idx'),
+            # Bounding-box prefilter of the radius search (see seller_search.nearby)
+            models.Index(fields=['latitude', 'longitude'], name='bizdetail_lat_lng_idx'),
+            # Weighted full-text search, plus trigrams for typo-tolerant word matches
+            GinIndex(fields=['search_vector'], name='bizdetail_search_vector_gin'),
+            GinIndex(
+                OpClass('search_document', name='gin_trgm_ops'),
+                name='bizdetail_search_document_trgm',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        from .seller_search import build_seller_card, refresh_search_index
+
+        # Keep the coordinates in step with the address; geocoding is an
+        # in-memory table lookup, so this adds no query
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'full_address' in update_fields:
+            from .geocoding import geocode_business_detail
+
+            geocode_business_detail(self)
+            if update_fields is not None:
+                update_fields = set(update_fields) | {'latitude', 'longitude', 'geocode_precision'}
+        self.card = build_seller_card(self)
+        self.card_updated_at = timezone.now()
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'card', 'card_updated_at'}
+        super().save(*args, **kwargs)
+
+        refresh_search_index(BusinessDetail.objects.filter(pk=self.pk))
 
     def __str__(self):
         siret_info = (f"(SIRET: "
@@ -154,21 +228,44 @@ class SellerRating(models.Model):
         return f"{self.seller.username} rated {self.rating} by {self.buyer.username} for {self.project_id}"
 
 
-@receiver([post_save, post_delete], sender=SellerRating)
-def update_seller_rating_stats(sender, instance, **kwargs):
-    """Update seller's average rating and rating count when ratings change"""
-    seller = instance.seller
-    
-    # Calculate new average rating and count
-    rating_stats = SellerRating.objects.filter(seller=seller).aggregate(
-        avg_rating=Avg('rating'),
-        rating_count=Count('id')
-    )
-    
-    # Update seller's rating fields
-    seller.average_rating = rating_stats['avg_rating'] or 0.00
-    seller.rating_count = rating_stats['rating_count'] or 0
-    seller.save(update_fields=['average_rating', 'rating_count'])
+class SellerRatingBucket(models.Model):
+    """Number of ratings a seller received with a given value (rating histogram)."""
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rating_buckets')
+    rating = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('seller', 'rating')
+
+    def __str__(self):
+        return f"{self.seller.username}: {self.count} x {self.rating}"
+
+
+@receiver(pre_save, sender=SellerRating)
+def remember_previous_rating(sender, instance, **kwargs):
+    """Keep the stored value of an edited rating so the change can be applied as a delta"""
+    if instance.pk:
+        instance._previous_rating = (
+            SellerRating.objects.filter(pk=instance.pk).values_list('rating', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=SellerRating)
+def add_rating_to_seller_stats(sender, instance, created, **kwargs):
+    """Apply a new or edited rating to the seller's running totals"""
+    from .services import SellerRatingService
+
+    old_rating = None if created else getattr(instance, '_previous_rating', None)
+    if created or old_rating != instance.rating:
+        SellerRatingService.apply_change(instance.seller_id, old_rating, instance.rating)
+
+
+@receiver(post_delete, sender=SellerRating)
+def remove_rating_from_seller_stats(sender, instance, **kwargs):
+    """Take a deleted rating out of the seller's running totals"""
+    from .services import SellerRatingService
+
+    SellerRatingService.apply_change(instance.seller_id, instance.rating, None)
 
 
 class DeletedUser(models.Model):
@@ -0,0 +1,569 @@
+"""
+Seller search shared by the seller listing endpoints.
+
+All filters (activity type, service area, region, location, minimum rating)
+compose on one BusinessDetail queryset joined to its user, so a page of
+results costs a single query. Every filter maps to an index on BusinessDetail
+(see its Meta.indexes). Pages use keyset pagination on the listing order
+(-average_rating, username): the cursor carries the last row's sort values, so
+deep pages cost the same as the first one instead of an OFFSET scan. Facet
+counts are computed with conditional aggregates in two queries.
+"""
+import base64
+import hashlib
+import json
+import math
+import re
+import unicodedata
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.utils import timezone
+from django.contrib.postgres.lookups import Unaccent
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db.models import (
+    Count,
+    DecimalField,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+    TextField,
+    Value,
+)
+from django.db.models.functions import (
+    ASin,
+    Cast,
+    Coalesce,
+    Concat,
+    Cos,
+    Lower,
+    Power,
+    Radians,
+    Replace,
+    Sin,
+    Sqrt,
+)
+
+from utils.cache import get_or_compute
+
+from . import geocoding
+from .models import BusinessDetail
+
+# Region to departments mapping (duplicate of frontend; backend needs minimal map)
+REGION_TO_DEPARTMENTS = {
+    'auvergne_rhone_alpes': [
+        'ain_01','allier_03','ardeche_07','cantal_15','drome_26','isere_38','loire_42','haute_loire_43','puy_de_dome_63','rhone_69','savoie_73','haute_savoie_74'
+    ],
+    'bourgogne_franche_comte': [
+        "cote_d_or_21","doubs_25","jura_39","nievre_58","haute_saone_70","saone_et_loire_71","yonne_89","territoire_de_belfort_90"
+    ],
+    'bretagne': ["cotes_d_armor_22","finistere_29","ille_et_vilaine_35","morbihan_56"],
+    'centre_val_de_loire': ["cher_18","eure_et_loir_28","indre_36","indre_et_loire_37","loir_et_cher_41","loiret_45"],
+    'corse': ["corse_du_sud_2a","haute_corse_2b"],
+    'grand_est': ["marne_51","haute_marne_52","meurthe_et_moselle_54","meuse_55","moselle_57","bas_rhin_67","haut_rhin_68","vosges_88"],
+    'hauts_de_france': ["aisne_02","nord_59","oise_60","pas_de_calais_62","somme_80"],
+    'normandie': ["calvados_14","eure_27","manche_50","orne_61","seine_maritime_76"],
+    'nouvelle_aquitaine': ["charente_16","charente_maritime_17","correze_19","creuse_23","dordogne_24","gironde_33","landes_40","lot_et_garonne_47","pyrenees_atlantiques_64","deux_sevres_79","vienne_86","haute_vienne_87"],
+    'occitanie': ["ariege_09","aude_11","aveyron_12","gard_30","haute_garonne_31","gers_32","herault_34","lot_46","lozere_48","hautes_pyrenees_65","pyrenees_orientales_66","tarn_81","tarn_et_garonne_82"],
+    'pays_de_la_loire': ["loire_atlantique_44","maine_et_loire_49","mayenne_53","sarthe_72","vendee_85"],
+    'provence_alpes_cote_d_azur': ["alpes_de_haute_provence_04","hautes_alpes_05","alpes_maritimes_06","bouches_du_rhone_13","var_83","vaucluse_84"],
+    'ile_de_france': ["paris_75","seine_et_marne_77","yvelines_78","essonne_91","hauts_de_seine_92","seine_saint_denis_93","val_de_marne_94","val_d_oise_95"],
+    'outre_mer': ["guadeloupe_971","martinique_972","guyane_973","la_reunion_974","mayotte_976"],
+}
+
+# Rating facet bands: (key, lower bound inclusive, upper bound exclusive)
+RATING_BANDS = [
+    ('4_plus', Decimal('4'), None),
+    ('3_to_4', Decimal('3'), Decimal('4')),
+    ('2_to_3', Decimal('2'), Decimal('3')),
+    ('below_2', None, Decimal('2')),
+]
+
+# Text search: stemming configuration, and short/common words left out of the
+# per-word trigram match (the full-text query handles them as stop words)
+SEARCH_CONFIG = 'french'
+SEARCH_STOP_WORDS = {
+    'les', 'des', 'aux', 'une', 'pour', 'par', 'sur', 'dans', 'avec', 'the', 'and',
+}
+
+DEFAULT_PAGE_SIZE = 12
+MAX_PAGE_SIZE = 50
+MAX_RADIUS_KM = 200
+
+
+class SellerSearchError(ValueError):
+    """Invalid search parameter; the message is returned to the client."""
+
+
+def normalize_label(text: str) -> str:
+    if not text:
+        return ''
+    # Remove accents, lowercase, replace non-alphanum with underscores, collapse repeats
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    text = text.lower()
+    text = re.sub(r"[^a-z0-9]+", "_", text)
+    text = re.sub(r"_+", "_", text).strip('_')
+    return text
+
+
+def _plain_text(value):
+    """Lowercase and strip accents like Postgres lower(unaccent(...))."""
+    value = unicodedata.normalize('NFD', value or '')
+    return ''.join(ch for ch in value if unicodedata.category(ch) != 'Mn').lower()
+
+
+def _json_words(field):
+    # ["salle_de_bain", "plomberie"] -> 'salle de bain plomberie' once tokenized
+    return Replace(Cast(field, TextField()), Value('_'), Value(' '), output_field=TextField())
+
+
+def refresh_search_index(queryset):
+    """
+    Rebuild the search entry of the given sellers with a single UPDATE.
+
+    The weighted vector ranks company name and activity (A) above categories
+    (B), the seller's about text (C) and the address (D). search_document
+    holds the same words lowercased and unaccented for trigram matching.
+    The user model is taken from the queryset, so migrations can pass a
+    historical BusinessDetail queryset.
+
+    Returns:
+        int: Rows updated
+    """
+    user_model = queryset.model._meta.get_field('user').related_model
+    about = Subquery(user_model.objects.filter(pk=OuterRef('user_id')).values('about')[:1])
+    return queryset.update(
+        search_vector=(
+            SearchVector(
+                Unaccent(F('company_name')), Unaccent(F('type_of_activity')),
+                weight='A', config=SEARCH_CONFIG,
+            )
+            + SearchVector(
+                Unaccent(_json_words('selected_categories')),
+                Unaccent(_json_words('selected_subcategories')),
+                weight='B', config=SEARCH_CONFIG,
+            )
+            + SearchVector(Unaccent(Coalesce(about, Value(''), output_field=TextField())), weight='C', config=SEARCH_CONFIG)
+            + SearchVector(Unaccent(F('full_address')), weight='D', config=SEARCH_CONFIG)
+        ),
+        search_document=Lower(Unaccent(Concat(
+            F('company_name'), Value(' '),
+            F('type_of_activity'), Value(' '),
+            _json_words('selected_categories'), Value(' '),
+            _json_words('selected_subcategories'), Value(' '),
+            F('full_address'),
+            output_field=TextField(),
+        ))),
+    )
+
+
+# User fields shown on a seller card; saving any of them refreshes the card
+SELLER_CARD_USER_FIELDS = {
+    'username', 'email', 'about', 'profile_pic', 'average_rating', 'rating_count',
+}
+
+
+def build_seller_card(seller):
+    """Card shown in seller listings, from a BusinessDetail and its user."""
+    return {
+        'id': seller.user.id,
+        'name': seller.user.username,
+        'email': seller.user.email,  # Add email for quote requests
+        'business_type': seller.type_of_activity,
+        'about': seller.user.about,
+        'profile_pic': seller.user.profile_pic.url if seller.user.profile_pic else None,
+        'selected_service_areas': seller.selected_service_areas,
+        'full_address': seller.full_address,
+        'company_name': seller.company_name,
+        'categories': seller.selected_categories,
+        'subcategories': seller.selected_subcategories,
+        'average_rating': float(seller.user.average_rating),
+        'rating_count': seller.user.rating_count,
+    }
+
+
+def refresh_seller_cards(queryset):
+    """
+    Rebuild the stored card of the given sellers.
+
+    Returns:
+        int: Cards rebuilt
+    """
+    sellers = list(queryset.select_related('user'))
+    now = timezone.now()
+    for seller in sellers:
+        seller.card = build_seller_card(seller)
+        seller.card_updated_at = now
+    BusinessDetail.objects.bulk_update(sellers, ['card', 'card_updated_at'], batch_size=1000)
+    return len(sellers)
+
+
+def get_seller_data(seller):
+    """Helper function to standardize seller data response"""
+    # The stored card is kept current on save; build it only for rows not backfilled yet
+    data = dict(seller.card) if seller.card else build_seller_card(seller)
+    distance_km = getattr(seller, 'distance_km', None)
+    if distance_km is not None:
+        data['distance_km'] = round(distance_km, 1)
+    headline = getattr(seller, 'search_headline', None)
+    if headline is not None:
+        data['search_headline'] = headline
+    return data
+
+
+def base_queryset():
+    """Onboarded sellers with their user joined in, in listing order."""
+    return (
+        BusinessDetail.objects.filter(user__seller_onboarding_complete=True)
+        .select_related('user')
+        .order_by('-user__average_rating', 'user__username')
+    )
+
+
+def parse_min_rating(value):
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise SellerSearchError('min_rating must be a valid number.')
+
+
+def apply_filters(qs, service_type=None, service_area=None, region=None,
+                  category=None, subcategory=None, min_rating=None,
+                  city=None, postal_code=None, address=None,
+                  point=None, radius_km=None, text=None):
+    """
+    Narrow a seller queryset with any combination of the search filters.
+
+    Location filters follow the original map search: a service area derived
+    from city + postal code is tried first. Otherwise, when the request sent
+    a ``point`` (lat/lng), sellers within ``radius_km`` of it are returned
+    nearest first; sellers not geocoded yet still match on their full
+    address. Without a point, only the full address is matched.
+    Free ``text`` is applied last, so its rank decides the order.
+    """
+    if service_type:
+        # lower() = lower() matches the functional index; __iexact compiles to
+        # UPPER(...) and would scan the table
+        qs = qs.alias(type_of_activity_lower=Lower('type_of_activity')).filter(
+            type_of_activity_lower=Lower(Value(service_type))
+        )
+    if service_area:
+        qs = qs.filter(selected_service_areas__contains=[service_area])
+    if category:
+        qs = qs.filter(selected_categories__contains=[category])
+    if subcategory:
+        qs = qs.filter(selected_subcategories__contains=[subcategory])
+    if region:
+        departments = REGION_TO_DEPARTMENTS.get(region)
+        if not departments:
+            raise SellerSearchError('Unknown region key.')
+        # ?| matches sellers whose service area list holds ANY of the departments
+        qs = qs.filter(selected_service_areas__has_any_keys=departments)
+    if min_rating is not None:
+        qs = qs.filter(user__average_rating__gte=min_rating)
+    if city or postal_code or address or point:
+        qs = _apply_location(qs, city or '', postal_code or '', address or '', point, radius_km)
+    if text:
+        qs = text_search(qs, text)
+    return qs
+
+
+def _apply_location(qs, city, postal_code, address, point=None, radius_km=None):
+    # Attempt 1: service area value derived from city + postal
+    if city and postal_code and postal_code.isdigit():
+        candidate_value = f"{normalize_label(city)}_{postal_code}"
+        direct = qs.filter(selected_service_areas__contains=[candidate_value])
+        if direct.exists():
+            return direct
+
+    address_match = Q()
+    if city:
+        address_match |= Q(full_address__icontains=city)
+    if postal_code:
+        address_match |= Q(full_address__icontains=postal_code)
+    if address:
+        address_match |= Q(full_address__icontains=address)
+
+    # Attempt 2: sellers around the lat/lng sent by the map, plus sellers
+    # without coordinates whose address matches
+    if point:
+        if radius_km is None:
+            radius_km = getattr(settings, 'SELLER_SEARCH_RADIUS_KM', 30)
+        return nearby(qs, point[0], point[1], radius_km, unlocated=address_match)
+
+    # Attempt 3: by full address icontains city or postal code
+    return qs.filter(address_match)
+
+
+def search_point_from_params(params):
+    """
+    Resolve the point a location search is centred on.
+
+    Only explicit lat/lng start a radius search: a postal code or city on its
+    own keeps the service area and address matching of the original search.
+
+    Returns:
+        tuple: (latitude, longitude) or None
+    """
+    lat, lng = params.get('lat'), params.get('lng')
+    if lat not in (None, '') and lng not in (None, ''):
+        try:
+            lat, lng = float(lat), float(lng)
+        except ValueError:
+            raise SellerSearchError('lat and lng must be valid numbers.')
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise SellerSearchError('lat/lng out of range.')
+        return lat, lng
+    return None
+
+
+def parse_radius(value, default):
+    if value in (None, ''):
+        return float(default)
+    try:
+        radius = float(value)
+    except ValueError:
+        raise SellerSearchError('radius_km must be a valid number.')
+    if not 0 < radius <= MAX_RADIUS_KM:
+        raise SellerSearchError(f'radius_km must be between 0 and {MAX_RADIUS_KM}.')
+    return radius
+
+
+def distance_expression(latitude, longitude):
+    """Great-circle (haversine) distance in km from a point to the seller."""
+    lat0 = math.radians(latitude)
+    lng0 = math.radians(longitude)
+    half_dlat = (Radians('latitude') - Value(lat0)) / 2
+    half_dlng = (Radians('longitude') - Value(lng0)) / 2
+    a = Power(Sin(half_dlat), 2) + Value(math.cos(lat0)) * Cos(Radians('latitude')) * Power(Sin(half_dlng), 2)
+    return Value(2 * geocoding.EARTH_RADIUS_KM) * ASin(Sqrt(a, output_field=FloatField()))
+
+
+def nearby(qs, latitude, longitude, radius_km, unlocated=None):
+    """
+    Sellers within ``radius_km`` of a point, nearest first, then by rating.
+
+    The bounding box is an indexed range scan on (latitude, longitude); the
+    exact distance is only computed for the rows inside it. Sellers without
+    coordinates that match the ``unlocated`` Q are included too, after the
+    located ones (their distance_km is NULL, which sorts last).
+    """
+    min_lat, max_lat, min_lng, max_lng = geocoding.bounding_box(latitude, longitude, radius_km)
+    within = Q(
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lng, max_lng),
+        distance_km__lte=radius_km,
+    )
+    if unlocated:
+        within |= Q(latitude__isnull=True) & unlocated
+    return (
+        qs.annotate(distance_km=distance_expression(latitude, longitude))
+        .filter(within)
+        .order_by('distance_km', '-user__average_rating', 'user__username')
+    )
+
+
+def text_search(qs, text):
+    """
+    Sellers matching free text, best match first, then by rating.
+
+    A seller matches when the stemmed full-text query hits its weighted
+    vector, or when every word of the text is a close trigram match for a
+    word of its search_document (typo tolerance: "plombeir" finds
+    "plombier"). Both conditions are served by GIN indexes, so Postgres
+    combines them with a bitmap OR instead of scanning the table.
+    """
+    plain = _plain_text(text).strip()
+    if not plain:
+        return qs
+    query = SearchQuery(plain, search_type='websearch', config=SEARCH_CONFIG)
+    match = Q(search_vector=query)
+    words = [
+        word for word in re.findall(r'\w+', plain)
+        if len(word) >= 3 and word not in SEARCH_STOP_WORDS
+    ]
+    if words:
+        all_words = Q()
+        for word in words:
+            all_words &= Q(search_document__trigram_word_similar=word)
+        match |= all_words
+
+    return (
+        qs.filter(match)
+        # Rounded to numeric so the keyset cursor can compare it exactly
+        .annotate(
+            search_rank=Cast(
+                SearchRank(F('search_vector'), query) + TrigramWordSimilarity(plain, 'search_document'),
+                DecimalField(max_digits=12, decimal_places=6),
+            ),
+            search_headline=SearchHeadline(
+                Concat(
+                    F('company_name'), Value(' - '), Coalesce(F('user__about'), Value(''), output_field=TextField()),
+                    output_field=TextField(),
+                ),
+                SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG),
+                config=SEARCH_CONFIG,
+                start_sel='<mark>',
+                stop_sel='</mark>',
+                max_words=30,
+                min_words=10,
+            ),
+        )
+        .order_by('-search_rank', '-user__average_rating', 'user__username')
+    )
+
+
+def filters_from_params(params):
+    """Read the search filters from request query params."""
+    return {
+        'service_type': (params.get('service_type') or '').strip() or None,
+        'service_area': (params.get('service_area') or '').strip() or None,
+        'region': (params.get('region') or '').strip() or None,
+        'category': (params.get('category') or '').strip() or None,
+        'subcategory': (params.get('subcategory') or '').strip() or None,
+        'min_rating': parse_min_rating(params.get('min_rating')),
+        'city': (params.get('city') or '').strip() or None,
+        'postal_code': (params.get('postal_code') or '').strip() or None,
+        'address': (params.get('address') or '').strip() or None,
+        'text': (params.get('q') or '').strip() or None,
+        'point': search_point_from_params(params),
+        'radius_km': parse_radius(
+            params.get('radius_km'), getattr(settings, 'SELLER_SEARCH_RADIUS_KM', 30)
+        ),
+    }
+
+
+# Scores a search can be ordered by before (rating, username): name -> (type, descending)
+LEADING_SCORES = {
+    'distance_km': (float, False),
+    'search_rank': (Decimal, True),
+}
+
+
+def _leading_score(qs):
+    """The score annotation qs is ordered by first, or None."""
+    if not qs.query.order_by:
+        return None
+    name = qs.query.order_by[0].lstrip('-')
+    return name if name in LEADING_SCORES and name in qs.query.annotations else None
+
+
+def encode_cursor(seller, score=None):
+    values = [str(seller.user.average_rating), seller.user.username]
+    if score:
+        value = getattr(seller, score)
+        values.append(None if value is None else str(value))
+    payload = json.dumps(values)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, score=None):
+    """
+    Returns:
+        tuple: (average_rating, username, score value or None)
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        score_value = None
+        if score and values[2] is not None:
+            score_value = LEADING_SCORES[score][0](values[2])
+        return Decimal(values[0]), str(values[1]), score_value
+    except (ValueError, TypeError, IndexError, InvalidOperation):
+        raise SellerSearchError('Invalid cursor.')
+
+
+def paginate(qs, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return one page of sellers after ``cursor`` in listing order
+    (distance or text rank first for radius and text searches).
+
+    Returns:
+        tuple: (list of BusinessDetail, next cursor or None)
+    """
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    score = _leading_score(qs)
+    if cursor:
+        rating, username, score_value = decode_cursor(cursor, score)
+        after = (
+            Q(user__average_rating__lt=rating)
+            | Q(user__average_rating=rating, user__username__gt=username)
+        )
+        if score and score_value is None:
+            # Only distance_km can be NULL (unlocated sellers); those rows sort last
+            after = Q(**{f'{score}__isnull': True}) & after
+        elif score:
+            # Radius and text searches are ordered by their score first
+            past = 'lt' if LEADING_SCORES[score][1] else 'gt'
+            after = Q(**{f'{score}__{past}': score_value}) | (Q(**{score: score_value}) & after)
+            if not LEADING_SCORES[score][1]:
+                after |= Q(**{f'{score}__isnull': True})
+        qs = qs.filter(after)
+    # One extra row tells whether another page exists without a COUNT
+    rows = list(qs[:page_size + 1])
+    next_cursor = encode_cursor(rows[page_size - 1], score) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
+
+
+def facet_counts(qs):
+    """
+    Count matching sellers per activity type, region and rating band.
+
+    Returns:
+        dict: {'total', 'activity_types': {type: n}, 'regions': {key: n}, 'rating_bands': {band: n}}
+    """
+    qs = qs.order_by()
+    aggregates = {'total': Count('id')}
+    for region_key, departments in REGION_TO_DEPARTMENTS.items():
+        aggregates[f'region__{region_key}'] = Count(
+            'id', filter=Q(selected_service_areas__has_any_keys=departments)
+        )
+    for band, lower, upper in RATING_BANDS:
+        band_filter = Q()
+        if lower is not None:
+            band_filter &= Q(user__average_rating__gte=lower)
+        if upper is not None:
+            band_filter &= Q(user__average_rating__lt=upper)
+        aggregates[f'rating__{band}'] = Count('id', filter=band_filter)
+    totals = qs.aggregate(**aggregates)
+
+    activity_types = {
+        row['type_of_activity']: row['count']
+        for row in qs.values('type_of_activity').annotate(count=Count('id')).order_by('-count')
+        if row['type_of_activity']
+    }
+    return {
+        'total': totals['total'],
+        'activity_types': activity_types,
+        'regions': {
+            region_key: totals[f'region__{region_key}'] for region_key in REGION_TO_DEPARTMENTS
+        },
+        'rating_bands': {band: totals[f'rating__{band}'] for band, _, _ in RATING_BANDS},
+    }
+
+
+def cached_facet_counts(qs, filters):
+    """
+    facet_counts() through the shared cache, keyed by the filters.
+
+    Facets are the same for every page of a search, so paging through results
+    only computes them once per SELLER_LISTING_MAX_AGE window.
+    """
+    digest = hashlib.sha256(
+        json.dumps(filters, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return get_or_compute(
+        f'seller_search:facets:{digest}',
+        lambda: facet_counts(qs),
+        timeout=getattr(settings, 'SELLER_LISTING_MAX_AGE', 60),
+    )
@@ -1,8 +1,12 @@
+from decimal import Decimal, ROUND_HALF_UP
+
 from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Cast, Round
 from django.utils import timezone
 from django.contrib.auth import authenticate
 from datetime import timedelta
-from .models import User, DeletedUser
+from .models import User, DeletedUser, SellerRating, SellerRatingBucket
 
 
 class UserDeletionService:
@@ -303,3 +307,157 @@ class UserDeletionService:
             'outstanding_balance': outstanding_balance,
             'balance_blocks_deletion': balance_blocks_deletion
         }
+
+
+class SellerRatingService:
+    """
+    Running rating totals of sellers.
+
+    Each rating write applies a delta to User.rating_sum/rating_count, and
+    recomputes average_rating from them, in one UPDATE with F() expressions,
+    plus one UPDATE of the histogram bucket. The cost no longer grows with the
+    number of ratings a seller has. verify() recomputes everything from
+    SellerRating to catch drift (run periodically by verify_seller_ratings_task).
+    """
+
+    RATING_VALUES = range(0, 6)
+
+    @staticmethod
+    def apply_change(seller_id, old_rating=None, new_rating=None):
+        """
+        Apply one rating change to the seller's totals and histogram.
+
+        Args:
+            seller_id: Rated seller
+            old_rating: Value removed (None for a new rating)
+            new_rating: Value added (None for a deleted rating)
+        """
+        from .seller_search import refresh_seller_cards
+        from .models import BusinessDetail
+
+        sum_delta = (new_rating or 0) - (old_rating or 0)
+        count_delta = (new_rating is not None) - (old_rating is not None)
+        new_sum = F('rating_sum') + sum_delta
+        new_count = F('rating_count') + count_delta
+
+        with transaction.atomic():
+            # SET expressions all read the row as it was, so the average uses the new totals
+            User.objects.filter(pk=seller_id).update(
+                rating_sum=new_sum,
+                rating_count=new_count,
+                average_rating=Case(
+                    When(
+                        rating_count__gt=-count_delta,
+                        then=Round(
+                            Cast(new_sum, DecimalField(max_digits=12, decimal_places=4)) / new_count,
+                            2,
+                        ),
+                    ),
+                    default=Value(Decimal('0.00')),
+                    output_field=DecimalField(max_digits=3, decimal_places=2),
+                ),
+            )
+            if old_rating is not None:
+                SellerRatingBucket.objects.filter(seller_id=seller_id, rating=old_rating).update(
+                    count=F('count') - 1
+                )
+            if new_rating is not None:
+                SellerRatingBucket.objects.bulk_create(
+                    [SellerRatingBucket(seller_id=seller_id, rating=new_rating)],
+                    ignore_conflicts=True,
+                )
+                SellerRatingBucket.objects.filter(seller_id=seller_id, rating=new_rating).update(
+                    count=F('count') + 1
+                )
+            refresh_seller_cards(BusinessDetail.objects.filter(user_id=seller_id))
+
+    @staticmethod
+    def histogram(seller_id):
+        """
+        Returns:
+            dict: {rating value: number of ratings} for every value 0-5
+        """
+        counts = {rating: 0 for rating in SellerRatingService.RATING_VALUES}
+        counts.update(
+            SellerRatingBucket.objects.filter(seller_id=seller_id).values_list('rating', 'count')
+        )
+        return counts
+
+    @staticmethod
+    def verify(fix=False):
+        """
+        Recompute every seller's totals and histogram from SellerRating.
+
+        Args:
+            fix: Overwrite drifted sellers with the recomputed values
+
+        Returns:
+            list: One dict per drifted seller with 'seller_id', 'stored' and 'expected'
+        """
+        from .seller_search import refresh_seller_cards
+        from .models import BusinessDetail
+
+        expected = {
+            row['seller_id']: {
+                'rating_sum': row['total'],
+                'rating_count': row['count'],
+                'average_rating': (Decimal(row['total']) / row['count']).quantize(
+                    Decimal('0.01'), rounding=ROUND_HALF_UP
+                ),
+                'histogram': {},
+            }
+            for row in SellerRating.objects.values('seller_id').annotate(
+                total=Sum('rating'), count=Count('id')
+            )
+        }
+        for seller_id, rating, count in SellerRating.objects.values_list(
+            'seller_id', 'rating'
+        ).annotate(count=Count('id')).order_by():
+            expected[seller_id]['histogram'][rating] = count
+
+        stored_histograms = {}
+        for seller_id, rating, count in SellerRatingBucket.objects.filter(count__gt=0).values_list(
+            'seller_id', 'rating', 'count'
+        ):
+            stored_histograms.setdefault(seller_id, {})[rating] = count
+
+        empty = {'rating_sum': 0, 'rating_count': 0, 'average_rating': Decimal('0.00'), 'histogram': {}}
+        drift = []
+        stored_users = User.objects.filter(
+            Q(rating_count__gt=0) | Q(rating_sum__gt=0) | Q(average_rating__gt=0)
+            | Q(pk__in=list(expected)) | Q(pk__in=list(stored_histograms))
+        ).values('id', 'rating_sum', 'rating_count', 'average_rating')
+        for user in stored_users:
+            stored = {
+                'rating_sum': user['rating_sum'],
+                'rating_count': user['rating_count'],
+                'average_rating': user['average_rating'],
+                'histogram': stored_histograms.get(user['id'], {}),
+            }
+            wanted = expected.get(user['id'], empty)
+            if stored != wanted:
+                drift.append({'seller_id': user['id'], 'stored': stored, 'expected': wanted})
+
+        if fix and drift:
+            with transaction.atomic():
+                users = []
+                for item in drift:
+                    wanted = item['expected']
+                    users.append(User(
+                        pk=item['seller_id'],
+                        rating_sum=wanted['rating_sum'],
+                        rating_count=wanted['rating_count'],
+                        average_rating=wanted['average_rating'],
+                    ))
+                User.objects.bulk_update(users, ['rating_sum', 'rating_count', 'average_rating'])
+
+                drifted_ids = [item['seller_id'] for item in drift]
+                SellerRatingBucket.objects.filter(seller_id__in=drifted_ids).delete()
+                SellerRatingBucket.objects.bulk_create([
+                    SellerRatingBucket(seller_id=item['seller_id'], rating=rating, count=count)
+                    for item in drift
+                    for rating, count in item['expected']['histogram'].items()
+                ])
+                refresh_seller_cards(BusinessDetail.objects.filter(user_id__in=drifted_ids))
+
+        return drift
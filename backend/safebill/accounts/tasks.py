@@ -414,3 +414,26 @@ def orchestrate_success_story_emails_task(self):
 	# 	logger.error(f"Error in success story orchestrator: {exc}")
 	# 	self.retry(exc=exc, countdown=2 ** self.request.retries)
 
+
+
+@shared_task(bind=True, max_retries=3, queue='emails')
+def verify_seller_ratings_task(self):
+	"""
+	Recompute seller rating totals and histograms from SellerRating and
+	correct any drift from the incrementally maintained values.
+	"""
+	from .services import SellerRatingService
+
+	try:
+		drift = SellerRatingService.verify(fix=True)
+		if drift:
+			logger.warning(
+				f"Seller rating verification: corrected {len(drift)} sellers "
+				f"({', '.join(str(item['seller_id']) for item in drift[:20])})"
+			)
+		else:
+			logger.info("Seller rating verification: no drift found")
+		return len(drift)
+	except Exception as exc:
+		logger.error(f"Error verifying seller ratings: {exc}")
+		self.retry(exc=exc, countdown=2 ** self.request.retries)
@@ -14,6 +14,7 @@ from .views import (
     filter_sellers_by_type_and_area,
     filter_sellers_by_type_area_and_skills,
     list_all_sellers,
+    search_sellers,
     UserProfileView,
     verify_siret_api,
     BuyerRegistrationView,
@@ -71,6 +72,11 @@ urlpatterns = [
         list_all_sellers,
         name='all-sellers'
     ),
+    path(
+        'search-sellers/',
+        search_sellers,
+        name='search-sellers'
+    ),
     path(
         'filter-sellers-by-location/',
         filter_sellers_by_location,
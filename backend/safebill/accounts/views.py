@@ -1,4 +1,6 @@
 from rest_framework import status
+import hashlib
+import json
 import logging
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -10,7 +12,8 @@ from .serializers import (
      BankAccountSerializer,
     UserProfileSerializer, BuyerRegistrationSerializer, SellerRatingSerializer
 )
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode, http_date, quote_etag
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils.encoding import force_bytes, force_str
 from django.contrib.auth.tokens import default_token_generator
 from rest_framework_simplejwt.views import TokenObtainPairView
@@ -18,10 +21,10 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from .models import BankAccount, BusinessDetail
 from rest_framework.decorators import api_view, permission_classes
-from .services import UserDeletionService
+from .services import SellerRatingService, UserDeletionService
+from . import seller_search
+from .seller_search import SellerSearchError, get_seller_data as _get_seller_data
 
-import re
-import unicodedata
 from rest_framework.generics import CreateAPIView
 from rest_framework.pagination import PageNumberPagination
 from .models import SellerRating
@@ -38,47 +41,6 @@ from .tasks import (
     send_password_reset_email_task
 )
 
-# Region to departments mapping (duplicate of frontend; backend needs minimal map)
-REGION_TO_DEPARTMENTS = {
-    'auvergne_rhone_alpes': [
-        'ain_01','allier_03','ardeche_07','cantal_15','drome_26','isere_38','loire_42','haute_loire_43','puy_de_dome_63','rhone_69','savoie_73','haute_savoie_74'
-    ],
-    'bourgogne_franche_comte': [
-        "cote_d_or_21","doubs_25","jura_39","nievre_58","haute_saone_70","saone_et_loire_71","yonne_89","territoire_de_belfort_90"
-    ],
-    'bretagne': ["cotes_d_armor_22","finistere_29","ille_et_vilaine_35","morbihan_56"],
-    'centre_val_de_loire': ["cher_18","eure_et_loir_28","indre_36","indre_et_loire_37","loir_et_cher_41","loiret_45"],
-    'corse': ["corse_du_sud_2a","haute_corse_2b"],
-    'grand_est': ["marne_51","haute_marne_52","meurthe_et_moselle_54","meuse_55","moselle_57","bas_rhin_67","haut_rhin_68","vosges_88"],
-    'hauts_de_france': ["aisne_02","nord_59","oise_60","pas_de_calais_62","somme_80"],
-    'normandie': ["calvados_14","eure_27","manche_50","orne_61","seine_maritime_76"],
-    'nouvelle_aquitaine': ["charente_16","charente_maritime_17","correze_19","creuse_23","dordogne_24","gironde_33","landes_40","lot_et_garonne_47","pyrenees_atlantiques_64","deux_sevres_79","vienne_86","haute_vienne_87"],
-    'occitanie': ["ariege_09","aude_11","aveyron_12","gard_30","haute_garonne_31","gers_32","herault_34","lot_46","lozere_48","hautes_pyrenees_65","pyrenees_orientales_66","tarn_81","tarn_et_garonne_82"],
-    'pays_de_la_loire': ["loire_atlantique_44","maine_et_loire_49","mayenne_53","sarthe_72","vendee_85"],
-    'provence_alpes_cote_d_azur': ["alpes_de_haute_provence_04","hautes_alpes_05","alpes_maritimes_06","bouches_du_rhone_13","var_83","vaucluse_84"],
-    'ile_de_france': ["paris_75","seine_et_marne_77","yvelines_78","essonne_91","hauts_de_seine_92","seine_saint_denis_93","val_de_marne_94","val_d_oise_95"],
-    'outre_mer': ["guadeloupe_971","martinique_972","guyane_973","la_reunion_974","mayotte_976"],
-}
-
-
-def _get_seller_data(seller):
-    """Helper function to standardize seller data response"""
-    return {
-        'id': seller.user.id,
-        'name': seller.user.username,
-        'email': seller.user.email,  # Add email for quote requests
-        'business_type': seller.type_of_activity,
-        'about': seller.user.about,
-        'profile_pic': seller.user.profile_pic.url if seller.user.profile_pic else None,
-        'selected_service_areas': seller.selected_service_areas,
-        'full_address': seller.full_address,
-        'company_name': seller.company_name,
-        'categories': seller.selected_categories,
-        'subcategories': seller.selected_subcategories,
-        'average_rating': float(seller.user.average_rating),
-        'rating_count': seller.user.rating_count,
-    }
-
 User = get_user_model()
 
 
@@ -529,144 +491,84 @@ class UserProfileView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _seller_response(request, data, seller=None):
+    """
+    Seller response with validators for conditional requests.
+
+    The ETag hashes the response body. A client (or CDN) revalidating an
+    unchanged response gets a 304 instead of the body. Only the single-seller
+    response (``seller`` given) also sends Last-Modified, from its card: a
+    list can change (a seller leaving it) without any of its cards changing.
+    """
+    body = json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+    etag = quote_etag(hashlib.sha256(body).hexdigest()[:32])
+    last_modified = None
+    if seller is not None and seller.card_updated_at:
+        last_modified = int(seller.card_updated_at.timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = Response(data)
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(
+        response, public=True, max_age=getattr(settings, 'SELLER_LISTING_MAX_AGE', 60)
+    )
+    return response
+
+
+def _legacy_seller_list(request, accepted, required=(), missing_message=''):
+    """
+    Unpaginated seller list kept for the original filter endpoints.
+
+    They all run through the shared seller search (same ordering, one joined
+    query), each honouring only its own query params plus min_rating.
+    """
+    if any(not (request.GET.get(param) or '').strip() for param in required):
+        return Response({'detail': missing_message}, status=400)
+    try:
+        filters = seller_search.filters_from_params(request.GET)
+        filters = {key: value for key, value in filters.items() if key in accepted or key == 'min_rating'}
+        sellers = seller_search.apply_filters(seller_search.base_queryset(), **filters)
+    except SellerSearchError as e:
+        return Response({'detail': str(e)}, status=400)
+    sellers = list(sellers)
+    return _seller_response(request, [_get_seller_data(seller) for seller in sellers])
+
+
 @api_view(['GET'])
 def filter_sellers_by_service_type(request):
-    service_type = request.GET.get('service_type')
-    min_rating = request.GET.get('min_rating')
-    
-    if not service_type:
-        return Response(
-            {'detail': 'service_type query param is required.'},
-            status=400
-        )
-    
-    sellers = BusinessDetail.objects.filter(
-        type_of_activity__iexact=service_type,
-        user__seller_onboarding_complete=True
+    return _legacy_seller_list(
+        request, ['service_type'], ['service_type'], 'service_type query param is required.'
     )
-    
-    # Apply rating filter if provided
-    if min_rating:
-        try:
-            min_rating_float = float(min_rating)
-            sellers = sellers.filter(user__average_rating__gte=min_rating_float)
-        except ValueError:
-            return Response(
-                {'detail': 'min_rating must be a valid number.'},
-                status=400
-            )
-    
-    # Order by rating (highest first), then by name
-    sellers = sellers.order_by('-user__average_rating', 'user__username')
-    
-    data = [_get_seller_data(seller) for seller in sellers]
-    return Response(data)
 
 
 @api_view(['GET'])
 def filter_sellers_by_service_area(request):
-    service_area = request.GET.get('service_area')
-    min_rating = request.GET.get('min_rating')
-    
-    if not service_area:
-        return Response(
-            {'detail': 'service_area query param is required.'},
-            status=400
-        )
-    
-    sellers = BusinessDetail.objects.filter(
-        selected_service_areas__contains=[service_area],
-        user__seller_onboarding_complete=True
+    return _legacy_seller_list(
+        request, ['service_area'], ['service_area'], 'service_area query param is required.'
     )
-    
-    # Apply rating filter if provided
-    if min_rating:
-        try:
-            min_rating_float = float(min_rating)
-            sellers = sellers.filter(user__average_rating__gte=min_rating_float)
-        except ValueError:
-            return Response(
-                {'detail': 'min_rating must be a valid number.'},
-                status=400
-            )
-    
-    # Order by rating (highest first), then by name
-    sellers = sellers.order_by('-user__average_rating', 'user__username')
-    
-    data = [_get_seller_data(seller) for seller in sellers]
-    return Response(data)
 
 
 @api_view(['GET'])
 def filter_sellers_by_type_and_area(request):
-    service_type = request.GET.get('service_type')
-    service_area = request.GET.get('service_area')
-    min_rating = request.GET.get('min_rating')
-    
-    if not service_type or not service_area:
-        return Response(
-            {'detail': 'Both service_type and service_area query params are required.'},
-            status=400
-        )
-    
-    sellers = BusinessDetail.objects.filter(
-        type_of_activity__iexact=service_type,
-        selected_service_areas__contains=[service_area],
-        user__seller_onboarding_complete=True
+    return _legacy_seller_list(
+        request,
+        ['service_type', 'service_area'],
+        ['service_type', 'service_area'],
+        'Both service_type and service_area query params are required.',
     )
-    
-    # Apply rating filter if provided
-    if min_rating:
-        try:
-            min_rating_float = float(min_rating)
-            sellers = sellers.filter(user__average_rating__gte=min_rating_float)
-        except ValueError:
-            return Response(
-                {'detail': 'min_rating must be a valid number.'},
-                status=400
-            )
-    
-    # Order by rating (highest first), then by name
-    sellers = sellers.order_by('-user__average_rating', 'user__username')
-    
-    data = [_get_seller_data(seller) for seller in sellers]
-    return Response(data)
+
 
 @api_view(['GET'])
 def filter_sellers_by_type_area_and_skills(request):
-    service_type = request.GET.get('service_type')
-    service_area = request.GET.get('service_area')
-    min_rating = request.GET.get('min_rating')
-    
-    if not service_type or not service_area:
-        return Response(
-            {'detail': 'Both service_type and service_area query params are required.'},
-            status=400
-        )
-    
-    # Build the base query
-    sellers = BusinessDetail.objects.filter(
-        type_of_activity__iexact=service_type,
-        selected_service_areas__contains=[service_area],
-        user__seller_onboarding_complete=True
+    return _legacy_seller_list(
+        request,
+        ['service_type', 'service_area'],
+        ['service_type', 'service_area'],
+        'Both service_type and service_area query params are required.',
     )
-    
-    # Apply rating filter if provided
-    if min_rating:
-        try:
-            min_rating_float = float(min_rating)
-            sellers = sellers.filter(user__average_rating__gte=min_rating_float)
-        except ValueError:
-            return Response(
-                {'detail': 'min_rating must be a valid number.'},
-                status=400
-            )
-    
-    # Order by rating (highest first), then by name
-    sellers = sellers.order_by('-user__average_rating', 'user__username')
-    
-    data = [_get_seller_data(seller) for seller in sellers]
-    return Response(data)
 
 
 class SellerPagination(PageNumberPagination):
@@ -680,37 +582,71 @@ def list_all_sellers(request):
     paginator = SellerPagination()
     min_rating = request.GET.get('min_rating')
     
-    # Base queryset
-    sellers = BusinessDetail.objects.filter(user__seller_onboarding_complete=True).select_related('user')
-
-    # Apply rating filter if provided
-    if min_rating:
-        try:
-            min_rating_float = float(min_rating)
-            sellers = sellers.filter(user__average_rating__gte=min_rating_float)
-        except ValueError:
-            return Response(
-                {'detail': 'min_rating must be a valid number.'},
-                status=400
-            )
+    try:
+        sellers = seller_search.apply_filters(
+            seller_search.base_queryset(),
+            min_rating=seller_search.parse_min_rating(min_rating),
+        )
+    except SellerSearchError as e:
+        return Response({'detail': str(e)}, status=400)
 
-    # Order by rating (highest first), then by name
-    sellers = sellers.order_by('-user__average_rating', 'user__username')
-    
     # Apply pagination
     paginated_sellers = paginator.paginate_queryset(sellers, request)
     data = [_get_seller_data(seller) for seller in paginated_sellers]
     
-    return paginator.get_paginated_response(data)
+    return _seller_response(request, paginator.get_paginated_response(data).data)
+
+
+@api_view(['GET'])
+def search_sellers(request):
+    """
+    Search sellers with any combination of filters, keyset-paginated.
+
+    Query params (all optional):
+      - q: free text ("plombier Le Mans"), results ranked by relevance with a
+        highlighted ``search_headline``
+      - service_type, service_area, region, category, subcategory, min_rating
+      - city, postal_code, address, lat, lng, radius_km (map selection, see
+        filter_sellers_by_location; a radius search is ordered nearest first)
+      - cursor: ``next_cursor`` of the previous page
+      - page_size: default 12, max 50
+      - facets: ``true`` to include counts per activity type, region and rating band
+
+    Results are ordered by rating (highest first), then by name. Unlike page
+    numbers, the cursor stays cheap on deep pages and does not skip or repeat
+    sellers when ratings change between requests.
+    """
+    try:
+        filters = seller_search.filters_from_params(request.GET)
+        sellers = seller_search.apply_filters(seller_search.base_queryset(), **filters)
+        page, next_cursor = seller_search.paginate(
+            sellers,
+            cursor=request.GET.get('cursor'),
+            page_size=request.GET.get('page_size') or seller_search.DEFAULT_PAGE_SIZE,
+        )
+    except ValueError as e:
+        # SellerSearchError, or a non-numeric page_size
+        return Response({'detail': str(e)}, status=400)
+
+    data = {
+        'results': [_get_seller_data(seller) for seller in page],
+        'next_cursor': next_cursor,
+    }
+    if request.GET.get('facets', '').lower() == 'true':
+        data['facets'] = seller_search.cached_facet_counts(sellers, filters)
+    return _seller_response(request, data)
 
 
 @api_view(['GET'])
 def get_seller_details(request, seller_id):
     """Get detailed information for a specific seller"""
     try:
-        seller = BusinessDetail.objects.get(user__id=seller_id, user__seller_onboarding_complete=True)
+        seller = BusinessDetail.objects.select_related('user').get(
+            user__id=seller_id, user__seller_onboarding_complete=True
+        )
         data = _get_seller_data(seller)
-        return Response(data)
+        data['rating_histogram'] = SellerRatingService.histogram(seller.user_id)
+        return _seller_response(request, data, seller)
     except BusinessDetail.DoesNotExist:
         return Response(
             {'detail': 'Seller not found.'},
@@ -763,18 +699,6 @@ class EligibleProjectsForRating(APIView):
 
 
 
-def _normalize_label(text: str) -> str:
-    if not text:
-        return ''
-    # Remove accents, lowercase, replace non-alphanum with underscores, collapse repeats
-    text = unicodedata.normalize('NFD', text)
-    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
-    text = text.lower()
-    text = re.sub(r"[^a-z0-9]+", "_", text)
-    text = re.sub(r"_+", "_", text).strip('_')
-    return text
-
-
 @api_view(['GET'])
 def filter_sellers_by_location(request):
     """
@@ -786,77 +710,29 @@ def filter_sellers_by_location(request):
       - address (formatted)
       - lat
       - lng
+      - radius_km (default SELLER_SEARCH_RADIUS_KM)
       - min_rating
 
     Strategy:
       1) If city and postal_code are provided, build a candidate service-area value
          (e.g., "le_mans_72100") and match against selected_service_areas.
-      2) Fallback: Match full_address icontains city or postal_code
+      2) If lat/lng are provided, sellers within radius_km of them, nearest
+         first, then by rating; sellers not geocoded yet match on step 3.
+      3) Otherwise: Match full_address icontains city or postal_code
     """
     city = (request.GET.get('city') or '').strip()
     postal_code = (request.GET.get('postal_code') or '').strip()
     address = (request.GET.get('address') or '').strip()
-    min_rating = request.GET.get('min_rating')
-
-    # Base queryset: sellers only
-    qs = BusinessDetail.objects.filter(user__seller_onboarding_complete=True)
-
-    # Apply rating filter if provided
-    if min_rating:
-        try:
-            min_rating_float = float(min_rating)
-            qs = qs.filter(user__average_rating__gte=min_rating_float)
-        except ValueError:
-            return Response(
-                {'detail': 'min_rating must be a valid number.'},
-                status=400
-            )
-
-    # Attempt 1: service area value derived from city + postal
-    matched = None
-    if city and postal_code and postal_code.isdigit():
-        candidate_value = f"{_normalize_label(city)}_{postal_code}"
-        direct = qs.filter(selected_service_areas__contains=[candidate_value])
-        if direct.exists():
-            matched = direct
-
-    # Attempt 2: by full address icontains city or postal code
-    if matched is None and (city or postal_code or address):
-        addr_qs = qs
-        if city:
-            addr_qs = addr_qs.filter(full_address__icontains=city)
-        if postal_code:
-            addr_qs = addr_qs | qs.filter(full_address__icontains=postal_code)
-        if address:
-            addr_qs = addr_qs | qs.filter(full_address__icontains=address)
-        addr_qs = addr_qs.distinct()
-        if addr_qs.exists():
-            matched = addr_qs
-
-    sellers = matched if matched is not None else qs.none()
-    
-    # Order by rating (highest first), then by name
-    sellers = sellers.order_by('-user__average_rating', 'user__username')
-    
-    data = [_get_seller_data(seller) for seller in sellers]
-    return Response(data)
+    if not (city or postal_code or address or request.GET.get('lat')):
+        return Response([])
+    return _legacy_seller_list(
+        request, ['city', 'postal_code', 'address', 'point', 'radius_km']
+    )
 
 
 @api_view(['GET'])
 def filter_sellers_by_region(request):
-    region_key = (request.GET.get('region') or '').strip()
-    if not region_key:
-        return Response({'detail': 'region query param is required.'}, status=400)
-    departments = REGION_TO_DEPARTMENTS.get(region_key)
-    if not departments:
-        return Response({'detail': 'Unknown region key.'}, status=400)
-    # Filter sellers that have selected_service_areas containing ANY of the department values
-    sellers = BusinessDetail.objects.filter(
-        user__seller_onboarding_complete=True,
-        selected_service_areas__overlap=departments
-    ).select_related('user').order_by('-user__average_rating', 'user__username')
-    data = [_get_seller_data(seller) for seller in sellers]
-    return Response(data)
+    return _legacy_seller_list(request, ['region'], ['region'], 'region query param is required.')
 
 
 @api_view(['POST'])
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import PlatformRevenue
+from .models import PlatformRevenue, PlatformRevenueEntry
 
 # Register your models here.
 
@@ -47,3 +47,18 @@ class PlatformRevenueAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         # Prevent deletion to maintain revenue data integrity
         return False
+
+
+@admin.register(PlatformRevenueEntry)
+class PlatformRevenueEntryAdmin(admin.ModelAdmin):
+    list_display = ["kind", "amount", "year", "month", "source", "rolled_up", "created_at"]
+    list_filter = ["kind", "rolled_up", "year", "month"]
+    search_fields = ["source"]
+    readonly_fields = ["kind", "amount", "year", "month", "source", "rolled_up", "created_at"]
+
+    def has_add_permission(self, request):
+        # Entries are appended by RevenueService only
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminpanelApp', '0003_remove_platformrevenue_buyer_revenue_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformRevenueEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('vat_collected', 'VAT Collected'), ('seller_revenue', 'Seller Revenue')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('source', models.CharField(blank=True, default='', max_length=64)),
+                ('rolled_up', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Platform Revenue Entry',
+                'verbose_name_plural': 'Platform Revenue Entries',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('rolled_up', False)), fields=['year', 'month'], name='platform_revenue_pending_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('source', ''), _negated=True), fields=('kind', 'source'), name='unique_platform_revenue_entry_source')],
+            },
+        ),
+    ]
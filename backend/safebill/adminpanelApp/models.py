@@ -73,6 +73,56 @@ class PlatformRevenue(models.Model):
             },
         )
 
+    @classmethod
+    def rollup_ledger(cls):
+        """
+        Fold pending PlatformRevenueEntry rows into the monthly records.
+
+        Pending entries are locked with SKIP LOCKED, summed per month and kind in
+        one grouped query, and applied with F() increments, so concurrent rollups
+        never double-count and each monthly row is touched once per rollup.
+
+        Returns:
+            int: Number of ledger entries rolled up
+        """
+        from django.db import transaction
+        from django.db.models import Count, F, Q, Sum
+
+        with transaction.atomic():
+            pending_ids = list(
+                PlatformRevenueEntry.objects.select_for_update(skip_locked=True)
+                .filter(rolled_up=False)
+                .values_list("id", flat=True)
+            )
+            if not pending_ids:
+                return 0
+
+            totals = (
+                PlatformRevenueEntry.objects.filter(id__in=pending_ids)
+                .values("year", "month")
+                .annotate(
+                    vat=Sum("amount", filter=Q(kind="vat_collected")),
+                    seller=Sum("amount", filter=Q(kind="seller_revenue")),
+                    milestones=Count("id", filter=Q(kind="seller_revenue")),
+                )
+                .order_by()
+            )
+            for row in totals:
+                vat = row["vat"] or Decimal("0.00")
+                seller = row["seller"] or Decimal("0.00")
+                cls.objects.get_or_create(year=row["year"], month=row["month"])
+                cls.objects.filter(year=row["year"], month=row["month"]).update(
+                    vat_collected=F("vat_collected") + vat,
+                    seller_revenue=F("seller_revenue") + seller,
+                    # total_revenue mirrors seller_revenue (see save())
+                    total_revenue=F("seller_revenue") + seller,
+                    total_milestones_approved=F("total_milestones_approved") + row["milestones"],
+                    updated_at=timezone.now(),
+                )
+
+            PlatformRevenueEntry.objects.filter(id__in=pending_ids).update(rolled_up=True)
+            return len(pending_ids)
+
     @classmethod
     def get_monthly_revenue(cls, year, month):
         """Get revenue for specific month"""
@@ -92,3 +142,70 @@ class PlatformRevenue(models.Model):
             "seller_revenue": total["total_seller"] or Decimal("0.00"),
             "total_revenue": total["total_platform"] or Decimal("0.00"),
         }
+
+
+class PlatformRevenueEntry(models.Model):
+    """
+    Append-only ledger of platform revenue events.
+
+    Payment webhooks and milestone approvals insert one row each instead of
+    updating the monthly PlatformRevenue row, so concurrent payments never
+    contend on (or overwrite) a shared counter. Entries are folded into
+    PlatformRevenue by PlatformRevenue.rollup_ledger(); the unique source
+    makes recording the same payment or milestone twice a no-op.
+    """
+
+    KIND_CHOICES = [
+        ("vat_collected", "VAT Collected"),
+        ("seller_revenue", "Seller Revenue"),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    year = models.IntegerField()
+    month = models.IntegerField()  # 1-12
+    # "payment:<id>" / "milestone:<id>"; empty for entries without a traceable source
+    source = models.CharField(max_length=64, blank=True, default="")
+    rolled_up = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Platform Revenue Entry"
+        verbose_name_plural = "Platform Revenue Entries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "source"],
+                condition=~models.Q(source=""),
+                name="unique_platform_revenue_entry_source",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["year", "month"],
+                condition=models.Q(rolled_up=False),
+                name="platform_revenue_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.amount} EUR ({self.year}-{self.month:02d})"
+
+    @classmethod
+    def record(cls, kind, amount, source=""):
+        """
+        Append an entry for the current month.
+
+        Returns:
+            bool: True if the entry was added, False if this source was already recorded
+        """
+        now = timezone.now()
+        if not source:
+            cls.objects.create(kind=kind, amount=amount, year=now.year, month=now.month)
+            return True
+        _, created = cls.objects.get_or_create(
+            kind=kind,
+            source=source,
+            defaults={"amount": amount, "year": now.year, "month": now.month},
+        )
+        return created
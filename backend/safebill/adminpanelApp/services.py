@@ -1,7 +1,8 @@
 from decimal import Decimal
 from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from .models import PlatformRevenue
+from .models import PlatformRevenue, PlatformRevenueEntry
 from payments.models import Payment
 from payments.services import FeeCalculationService
 from projects.models import Milestone
@@ -16,36 +17,60 @@ class RevenueService:
     """
 
     @staticmethod
-    def add_seller_revenue(milestone_amount, platform_fee_percentage, vat_rate):
+    def add_seller_revenue(milestone_amount, platform_fee_percentage, vat_rate, milestone_id=None):
         """
         Add seller revenue when a milestone is approved.
         This is called when a milestone is approved by the buyer.
 
+        The fee is appended to the revenue ledger and folded into the monthly
+        PlatformRevenue record by the periodic rollup.
+
         Args:
             milestone_amount: Amount for this specific milestone
+            milestone_id: Approved milestone; recording the same milestone twice is a no-op
         """
         try:
-            with transaction.atomic():
-                # Calculate seller fee using centralized service
-                fees = FeeCalculationService.calculate_fees(
-                    milestone_amount, platform_fee_percentage, vat_rate
-                )
-                seller_fee_amount = fees["platform_fee"]
-
-                revenue_record, created = PlatformRevenue.get_or_create_current_month()
-
-                # Add seller revenue
-                revenue_record.seller_revenue += seller_fee_amount
-                revenue_record.total_milestones_approved += 1
-                revenue_record.save()
-
+            # Calculate seller fee using centralized service
+            fees = FeeCalculationService.calculate_fees(
+                milestone_amount, platform_fee_percentage, vat_rate
+            )
+            seller_fee_amount = fees["platform_fee"]
+
+            source = f"milestone:{milestone_id}" if milestone_id else ""
+            if PlatformRevenueEntry.record("seller_revenue", seller_fee_amount, source=source):
                 logger.info(f"Added seller revenue: {seller_fee_amount} EUR")
-                return revenue_record
+            else:
+                logger.info(f"Seller revenue for {source} already recorded")
+            return seller_fee_amount
 
         except Exception as e:
             logger.error(f"Error adding seller revenue: {e}")
             raise
 
+    @staticmethod
+    def add_vat_collected(payment):
+        """
+        Record the VAT collected on a paid payment (buyer total minus base amount).
+
+        Args:
+            payment: Payment that was just marked as paid
+
+        Returns:
+            bool: True if recorded, False if this payment was already recorded
+        """
+        vat_amount = payment.buyer_total_amount - payment.amount
+        recorded = PlatformRevenueEntry.record("vat_collected", vat_amount, source=f"payment:{payment.id}")
+        if recorded:
+            logger.info(f"Recorded VAT collected for payment {payment.id}: {vat_amount} EUR")
+        return recorded
+
+    @staticmethod
+    def rollup_pending():
+        """
+        Apply pending revenue ledger entries to the monthly records
+        """
+        return PlatformRevenue.rollup_ledger()
+
     @staticmethod
     def get_current_month_revenue():
         """
@@ -72,6 +97,7 @@ class RevenueService:
         """
         Get comprehensive revenue summary
         """
+        RevenueService.rollup_pending()
         current_month = RevenueService.get_current_month_revenue()
         total_revenue = RevenueService.get_total_revenue()
 
@@ -105,31 +131,46 @@ class RevenueService:
                 else:
                     end_date = timezone.datetime(year, month + 1, 1)
 
-                payments = Payment.objects.filter(
-                    status="paid", created_at__gte=start_date, created_at__lt=end_date
+                # Lock this month's pending ledger entries before the recount. Only
+                # these (and entries for what the recount saw) are marked rolled up
+                # below; anything committed later stays pending for rollup_ledger()
+                pending_ids = list(
+                    PlatformRevenueEntry.objects.select_for_update()
+                    .filter(year=year, month=month, rolled_up=False)
+                    .values_list("id", flat=True)
+                )
+
+                payments = list(
+                    Payment.objects.filter(
+                        status="paid", created_at__gte=start_date, created_at__lt=end_date
+                    )
                 )
 
                 # Calculate vat collected
                 vat_collected = sum(p.buyer_total_amount - p.amount for p in payments)
 
                 # Calculate seller revenue from approved milestones
-                milestones = Milestone.objects.filter(
-                    status="approved",
-                    completion_date__gte=start_date,
-                    completion_date__lt=end_date,
+                milestones = list(
+                    Milestone.objects.filter(
+                        status="approved",
+                        completion_date__gte=start_date,
+                        completion_date__lt=end_date,
+                    ).select_related("project")
                 )
 
-                seller_revenue = Decimal("0.00")
-
-                for milestone in milestones:
-                    # Calculate seller fee for this milestone using centralized service
-                    fees = FeeCalculationService.calculate_fees(
+                # Seller fees for all milestones in one batch via the centralized service
+                fees = FeeCalculationService.calculate_fees_batch(
+                    (
                         milestone.relative_payment,
                         milestone.project.platform_fee_percentage,
                         milestone.project.vat_rate,
                     )
-                    seller_fee_amount = fees["seller_fee_amount"]
-                    seller_revenue += seller_fee_amount
+                    for milestone in milestones
+                )
+                seller_revenue = sum(
+                    (milestone_fees["platform_fee"] for milestone_fees in fees),
+                    Decimal("0.00"),
+                )
 
                 # Update or create revenue record
                 revenue_record, created = PlatformRevenue.objects.get_or_create(
@@ -138,16 +179,26 @@ class RevenueService:
                     defaults={
                         "vat_collected": vat_collected,
                         "seller_revenue": seller_revenue,
-                        "total_payments": payments.count(),
-                        "total_milestones_approved": milestones.count(),
+                        "total_payments": len(payments),
+                        "total_milestones_approved": len(milestones),
                     },
                 )
 
+                # The recount includes the locked entries, and the entries of any
+                # payment or milestone it counted that committed after the lock
+                counted_sources = [f"payment:{payment.id}" for payment in payments] + [
+                    f"milestone:{milestone.id}" for milestone in milestones
+                ]
+                PlatformRevenueEntry.objects.filter(rolled_up=False).filter(
+                    Q(id__in=pending_ids)
+                    | Q(year=year, month=month, source__in=counted_sources)
+                ).update(rolled_up=True)
+
                 if not created:
                     revenue_record.vat_collected = vat_collected
                     revenue_record.seller_revenue = seller_revenue
-                    revenue_record.total_payments = payments.count()
-                    revenue_record.total_milestones_approved = milestones.count()
+                    revenue_record.total_payments = len(payments)
+                    revenue_record.total_milestones_approved = len(milestones)
                     revenue_record.save()
 
                 logger.info(
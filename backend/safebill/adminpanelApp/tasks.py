@@ -0,0 +1,18 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def rollup_platform_revenue_task():
+    """
+    Fold pending revenue ledger entries into the monthly PlatformRevenue records
+    """
+    from .models import PlatformRevenue
+
+    rolled_up = PlatformRevenue.rollup_ledger()
+    if rolled_up:
+        logger.info(f"Rolled up {rolled_up} platform revenue ledger entries")
+    return rolled_up
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import StripeAccount, StripeIdentity
+from .models import StripeAccount, StripeIdentity, StripeWebhookEvent
 
 
 @admin.register(StripeAccount)
@@ -30,6 +30,23 @@ class StripeAccountAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(StripeWebhookEvent)
+class StripeWebhookEventAdmin(admin.ModelAdmin):
+    list_display = [
+        "event_id",
+        "event_type",
+        "endpoint",
+        "object_id",
+        "status",
+        "attempts",
+        "received_at",
+        "processed_at",
+    ]
+    list_filter = ["status", "endpoint", "event_type", "received_at"]
+    search_fields = ["event_id", "object_id"]
+    readonly_fields = ["received_at", "processing_started_at", "processed_at"]
+
+
 @admin.register(StripeIdentity)
 class StripeIdentityAdmin(admin.ModelAdmin):
     list_display = [
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connect_stripe', '0002_alter_stripeidentity_identity_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(help_text='Stripe event ID', max_length=255, unique=True)),
+                ('event_type', models.CharField(db_index=True, max_length=100)),
+                ('endpoint', models.CharField(choices=[('connect', 'Connect'), ('identity', 'Identity')], max_length=20)),
+                ('object_id', models.CharField(blank=True, default='', help_text='ID of the Stripe object the event is about; events are ordered per object', max_length=255)),
+                ('stripe_created', models.PositiveBigIntegerField(default=0, help_text='Event creation time reported by Stripe (unix timestamp)')),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('processed', 'Processed'), ('failed', 'Failed'), ('ignored', 'Ignored')], db_index=True, default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processing_started_at', models.DateTimeField(blank=True, null=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Stripe Webhook Event',
+                'verbose_name_plural': 'Stripe Webhook Events',
+                'ordering': ['-received_at'],
+                'indexes': [models.Index(fields=['object_id', 'status', 'stripe_created'], name='connect_str_object__f68719_idx')],
+            },
+        ),
+    ]
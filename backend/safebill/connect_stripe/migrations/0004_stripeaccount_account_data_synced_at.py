@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('connect_stripe', '0003_stripewebhookevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stripeaccount',
+            name='account_data_synced_at',
+            field=models.DateTimeField(blank=True, help_text='When account_data was last taken from Stripe (webhook or API)', null=True),
+        ),
+    ]
@@ -40,6 +40,11 @@ class StripeAccount(models.Model):
         blank=True,
         help_text="Additional Stripe account data and requirements",
     )
+    account_data_synced_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When account_data was last taken from Stripe (webhook or API)",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -113,3 +118,78 @@ class StripeIdentity(models.Model):
     def is_verified(self):
         """Check if identity verification is complete"""
         return self.identity_verified and self.identity_status == "verified"
+
+
+class StripeWebhookEvent(models.Model):
+    """
+    Stripe webhook events stored on receipt and processed asynchronously.
+
+    The webhook views verify the signature, insert the event (the unique
+    event_id deduplicates Stripe's retries) and acknowledge immediately; a
+    Celery worker then runs the handler. Events touching the same Stripe object
+    are processed one at a time in Stripe's creation order.
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("processed", "Processed"),
+        ("failed", "Failed"),
+        ("ignored", "Ignored"),
+    ]
+
+    ENDPOINT_CHOICES = [
+        ("connect", "Connect"),
+        ("identity", "Identity"),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True, help_text="Stripe event ID")
+    event_type = models.CharField(max_length=100, db_index=True)
+    endpoint = models.CharField(max_length=20, choices=ENDPOINT_CHOICES)
+    object_id = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        help_text="ID of the Stripe object the event is about; events are ordered per object",
+    )
+    stripe_created = models.PositiveBigIntegerField(
+        default=0, help_text="Event creation time reported by Stripe (unix timestamp)"
+    )
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending", db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    received_at = models.DateTimeField(auto_now_add=True)
+    processing_started_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Stripe Webhook Event"
+        verbose_name_plural = "Stripe Webhook Events"
+        ordering = ["-received_at"]
+        indexes = [
+            models.Index(fields=["object_id", "status", "stripe_created"]),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} ({self.event_id}) - {self.status}"
+
+    @classmethod
+    def record(cls, endpoint, event):
+        """
+        Store a verified event unless it was already received.
+
+        Returns:
+            tuple: (StripeWebhookEvent, created)
+        """
+        data_object = (event.get("data") or {}).get("object") or {}
+        return cls.objects.get_or_create(
+            event_id=event["id"],
+            defaults={
+                "event_type": event.get("type", ""),
+                "endpoint": endpoint,
+                "object_id": data_object.get("id") or "",
+                "stripe_created": event.get("created") or 0,
+                "payload": event,
+            },
+        )
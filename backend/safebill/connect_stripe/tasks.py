@@ -1,6 +1,14 @@
 import logging
+import uuid
+from datetime import timedelta
+
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from utils.email_service import EmailService
+from utils.redis_client import get_redis_client, release_lock
 
 logger = logging.getLogger(__name__)
 logger.propagate = True
@@ -58,3 +66,145 @@ def send_payment_failed_email_task(
     except Exception as exc:
         logger.error(f"Error sending payment failed email: {exc}")
         self.retry(exc=exc, countdown=2 ** self.request.retries)
+
+
+# ====================================================================== Stripe Webhook Processing ======================================================================
+WEBHOOK_MAX_ATTEMPTS = getattr(settings, "STRIPE_WEBHOOK_MAX_ATTEMPTS", 5)
+# Upper bound for the per-object lock (released as soon as the events are processed)
+WEBHOOK_OBJECT_LOCK_TIMEOUT = 300
+# Pending events older than this were never picked up (e.g. broker outage) and are re-enqueued
+WEBHOOK_STALE_PENDING_MINUTES = 5
+# Events stuck in "processing" this long belong to a crashed worker
+WEBHOOK_STALE_PROCESSING_MINUTES = 30
+
+
+def _acquire_object_lock(object_key):
+    """
+    Serialize processing per Stripe object across workers (no-op if Redis is down).
+
+    Returns:
+        str: Token to pass to _release_object_lock(), or None if another worker
+        holds the lock
+    """
+    token = uuid.uuid4().hex
+    client = get_redis_client()
+    if client is None:
+        return token
+    try:
+        claimed = client.set(f"stripe:webhook:lock:{object_key}", token, nx=True, ex=WEBHOOK_OBJECT_LOCK_TIMEOUT)
+        return token if claimed else None
+    except Exception as e:
+        logger.warning(f"Stripe webhook lock unavailable for {object_key}: {e}")
+        return token
+
+
+def _release_object_lock(object_key, token):
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        if not release_lock(client, f"stripe:webhook:lock:{object_key}", token):
+            logger.warning(
+                f"Stripe webhook lock for {object_key} expired before processing finished; "
+                f"left the current holder's lock in place"
+            )
+    except Exception as e:
+        logger.warning(f"Stripe webhook lock release failed for {object_key}: {e}")
+
+
+@shared_task(bind=True, max_retries=5)
+def process_stripe_webhook_event(self, event_pk):
+    """
+    Process a stored Stripe webhook event.
+
+    All unprocessed events for the same Stripe object are handled in Stripe's
+    creation order, so an older event that is retried is never overtaken by a
+    newer one. An event that keeps failing is skipped after
+    STRIPE_WEBHOOK_MAX_ATTEMPTS attempts so it cannot block its object forever.
+    """
+    from .models import StripeWebhookEvent
+    from .webhook_handlers import dispatch_event
+
+    event = StripeWebhookEvent.objects.filter(pk=event_pk).only("event_id", "object_id").first()
+    if not event:
+        logger.warning(f"Stripe webhook event {event_pk} not found")
+        return None
+
+    object_key = event.object_id or event.event_id
+    lock_token = _acquire_object_lock(object_key)
+    if not lock_token:
+        # Another worker is processing this object; it will pick this event up
+        # if it is still pending, otherwise this run finds nothing to do
+        self.apply_async(args=[event_pk], countdown=2)
+        return None
+
+    try:
+        if event.object_id:
+            queue = StripeWebhookEvent.objects.filter(object_id=event.object_id)
+        else:
+            queue = StripeWebhookEvent.objects.filter(pk=event.pk)
+        queue = queue.filter(
+            status__in=["pending", "failed"], attempts__lt=WEBHOOK_MAX_ATTEMPTS
+        ).order_by("stripe_created", "id")
+
+        processed = 0
+        for queued in queue:
+            claimed = StripeWebhookEvent.objects.filter(
+                pk=queued.pk, status__in=["pending", "failed"]
+            ).update(status="processing", attempts=F("attempts") + 1, processing_started_at=timezone.now())
+            if not claimed:
+                continue
+
+            try:
+                # A handler that fails midway rolls back entirely, so a retry or a
+                # requeued stale event replays it from a clean state. Handlers enqueue
+                # their Celery tasks (emails, HubSpot syncs) with on_commit, so those
+                # only run once, after the state they read is committed
+                with transaction.atomic():
+                    handled = dispatch_event(queued.endpoint, queued.payload)
+            except Exception as exc:
+                logger.exception(f"Error processing Stripe event {queued.event_id} ({queued.event_type}): {exc}")
+                StripeWebhookEvent.objects.filter(pk=queued.pk).update(status="failed", last_error=str(exc))
+                # Later events for this object wait until this one succeeds or is given up on
+                raise self.retry(exc=exc, countdown=5 * 2 ** self.request.retries)
+
+            StripeWebhookEvent.objects.filter(pk=queued.pk).update(
+                status="processed" if handled else "ignored",
+                last_error="",
+                processed_at=timezone.now(),
+            )
+            processed += 1
+
+        return processed
+    finally:
+        _release_object_lock(object_key, lock_token)
+
+
+@shared_task
+def requeue_stale_stripe_webhook_events():
+    """Re-enqueue webhook events that were never picked up or whose worker died."""
+    from .models import StripeWebhookEvent
+
+    now = timezone.now()
+    StripeWebhookEvent.objects.filter(
+        status="processing",
+        processing_started_at__lt=now - timedelta(minutes=WEBHOOK_STALE_PROCESSING_MINUTES),
+    ).update(status="failed", last_error="Processing interrupted")
+
+    stale = StripeWebhookEvent.objects.filter(
+        status__in=["pending", "failed"],
+        attempts__lt=WEBHOOK_MAX_ATTEMPTS,
+        received_at__lt=now - timedelta(minutes=WEBHOOK_STALE_PENDING_MINUTES),
+    ).order_by("stripe_created", "id")
+
+    # One task per object is enough: it drains every pending event of that object
+    seen = set()
+    for event_pk, object_key in stale.values_list("pk", "object_id"):
+        key = object_key or event_pk
+        if key in seen:
+            continue
+        seen.add(key)
+        process_stripe_webhook_event.delay(event_pk)
+
+    logger.info(f"Re-enqueued {len(seen)} stale Stripe webhook events")
+    return len(seen)
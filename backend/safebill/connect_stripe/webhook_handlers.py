@@ -0,0 +1,721 @@
+"""
+Handlers for Stripe webhook events.
+
+The webhook views only verify and store events (see StripeWebhookEvent); the
+Celery task process_stripe_webhook_event calls dispatch_event for each stored
+event, one object at a time and in Stripe's creation order.
+"""
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .models import StripeAccount, StripeIdentity
+from projects.models import Project
+from payments.models import Payment, Refund
+from payments.utils import send_payment_websocket_update
+from notifications.services import NotificationService
+from .tasks import (
+    send_payment_success_email_task,
+    send_payment_failed_email_task,
+)
+from payments.tasks import send_payment_success_email_seller_task
+from payments.services import BalanceService
+from payments.transfer_service import TransferService
+from adminpanelApp.services import RevenueService
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+# ====================================================================== Connect Account Events ======================================================================
+
+
+# Handle account.updated event
+def handle_account_updated(event):
+    logger.info(f"Account updated event: {event}")
+    account = event["data"]["object"]
+    account_id = account["id"]
+    user_id = account["metadata"]["user_id"]
+    user = User.objects.get(id=user_id)
+
+    try:
+        # Find StripeAccount by account ID
+        stripe_account = StripeAccount.objects.get(account_id=account_id)
+
+        # Update StripeAccount status with comprehensive checks
+        details_submitted = account.get("details_submitted", False)
+        charges_enabled = account.get("charges_enabled", False)
+        payouts_enabled = account.get("payouts_enabled", False)
+
+        # Check if business verification is complete
+        requirements = account.get("requirements", {})
+        currently_due = requirements.get("currently_due", [])
+        past_due = requirements.get("past_due", [])
+
+        # Onboarding is complete only if all conditions are met
+        is_onboarding_complete = (
+            details_submitted
+            and charges_enabled
+            and payouts_enabled
+            and len(currently_due) == 0
+            and len(past_due) == 0
+        )
+
+        if is_onboarding_complete:
+            stripe_account.account_status = "active"
+            user.onboarding_complete = True
+            user.seller_onboarding_complete = True
+            user.save()
+            stripe_account.onboarding_complete = True
+
+            # Sync with HubSpot after Stripe onboarding completion
+            from hubspot.sync_utils import safe_contact_sync
+            safe_contact_sync(user.id, "stripe_onboarding_complete")
+
+            # Send notification for successful Stripe onboarding
+            NotificationService.create_notification(
+                user,
+                message="notifications.stripe_onboarding_complete"
+            )
+
+            logger.info(
+                f"Stripe account {account_id} is now fully active for user {stripe_account.user.id}"
+            )
+        else:
+            # Only change to "pending" if user has started onboarding (details_submitted is True)
+            # Otherwise keep the current status (likely "onboarding")
+            if details_submitted:
+                stripe_account.account_status = "pending"
+            # If details_submitted is False, keep the current status (probably "onboarding")
+            logger.info(
+                f"Stripe account {account_id} status updated for user {stripe_account.user.id} - details_submitted: {details_submitted}, charges_enabled: {charges_enabled}, payouts_enabled: {payouts_enabled}, currently_due: {currently_due}, past_due: {past_due}, status: {stripe_account.account_status}"
+            )
+
+        # Store account information and last webhook event payload
+        stripe_account.account_data = {
+            "country": account.get("country"),
+            "default_currency": account.get("default_currency"),
+            "business_type": account.get("business_type"),
+            "charges_enabled": charges_enabled,
+            "payouts_enabled": payouts_enabled,
+            "details_submitted": details_submitted,
+            "requirements": requirements,
+            "currently_due": currently_due,
+            "eventually_due": requirements.get("eventually_due", []),
+            "past_due": past_due,
+            "last_webhook_event": event,
+        }
+        stripe_account.account_data_synced_at = timezone.now()
+
+        stripe_account.save()
+        logger.info(f"Updated StripeAccount {stripe_account.id} with account data")
+
+        # Update or create payout preferences if payouts are enabled
+        if payouts_enabled:
+            # Check if this is a settings change by comparing with previous data
+            previous_data = (
+                stripe_account.account_data.get("settings", {})
+                if stripe_account.account_data
+                else {}
+            )
+            current_settings = account.get("settings", {})
+
+            # Removed payout preferences update - sellers manage directly in Stripe Dashboard
+
+    except StripeAccount.DoesNotExist:
+        logger.error(f"StripeAccount not found for account {account_id}")
+    except Exception as e:
+        logger.error(f"Error updating StripeAccount for account {account_id}: {e}")
+
+
+# Handle account deauthorization
+def handle_account_application_deauthorized(event):
+    account = event["data"]["object"]
+    account_id = account["id"]
+
+    try:
+        stripe_account = StripeAccount.objects.get(account_id=account_id)
+        stripe_account.account_status = "disconnected"
+        stripe_account.onboarding_complete = False
+        stripe_account.account_data = {}
+        stripe_account.account_data_synced_at = timezone.now()
+        stripe_account.save()
+
+        # Send notification for Stripe account disconnection
+        NotificationService.create_notification(
+            stripe_account.user,
+            message="notifications.stripe_account_disconnected"
+        )
+
+        logger.info(
+            f"Stripe account {account_id} disconnected for user {stripe_account.user.id}"
+        )
+
+    except StripeAccount.DoesNotExist:
+        logger.error(f"StripeAccount not found for account {account_id}")
+    except Exception as e:
+        logger.error(f"Error disconnecting Stripe account {account_id}: {e}")
+
+
+# ====================================================================== Identity / Payments Events ======================================================================
+
+
+# Handle identity.verification_session.processing event
+def handle_identity_verification_session_processing(event):
+    verification_session = event["data"]["object"]
+    session_id = verification_session["id"]
+
+    try:
+        stripe_identity = StripeIdentity.objects.get(
+            verification_session_id=session_id
+        )
+        stripe_identity.identity_status = "processing"
+        # Save the exact webhook response
+        stripe_identity.verification_data = event
+        stripe_identity.save()
+        logger.info(
+            f"Updated identity status to processing for user {stripe_identity.user.id}"
+        )
+    except StripeIdentity.DoesNotExist:
+        logger.error(f"StripeIdentity not found for session {session_id}")
+    except Exception as e:
+        logger.error(f"Error updating identity status: {e}")
+
+
+# Handle identity.verification_session.verified event
+def handle_identity_verification_session_verified(event):
+    verification_session = event["data"]["object"]
+    session_id = verification_session["id"]
+    user_id = verification_session["metadata"]["user_id"]
+    user = User.objects.get(id=user_id)
+    logger.info(f"User {user.id} verified identity")
+
+    try:
+        stripe_identity = StripeIdentity.objects.get(
+            verification_session_id=session_id
+        )
+        stripe_identity.identity_status = "verified"
+        stripe_identity.identity_verified = True
+        stripe_identity.verification_data = event
+
+        user.onboarding_complete = True
+        user.pro_buyer_onboarding_complete = True
+        user.save()
+        stripe_identity.verified_at = timezone.now()
+        stripe_identity.save()
+
+        # Sync with HubSpot after identity verification completion
+        from hubspot.sync_utils import safe_contact_sync
+        safe_contact_sync(user.id, "identity_verification_complete")
+
+        # Send notification for successful identity verification
+        NotificationService.create_notification(
+            user,
+            message="notifications.identity_verification_success"
+        )
+
+        logger.info(
+            f"Identity verification completed for user {stripe_identity.user.id}"
+        )
+    except StripeIdentity.DoesNotExist:
+        logger.error(f"StripeIdentity not found for session {session_id}")
+    except Exception as e:
+        logger.error(f"Error updating identity status: {e}")
+
+
+# Handle identity.verification_session.requires_input event
+def handle_identity_verification_session_requires_input(event):
+    verification_session = event["data"]["object"]
+    session_id = verification_session["id"]
+
+    try:
+        stripe_identity = StripeIdentity.objects.get(
+            verification_session_id=session_id
+        )
+        stripe_identity.identity_status = "requires_input"
+        stripe_identity.identity_verified = False
+        # Save the exact webhook response
+        stripe_identity.verification_data = event
+        stripe_identity.save()
+        logger.info(
+            f"Identity verification requires input for user {stripe_identity.user.id}"
+        )
+    except StripeIdentity.DoesNotExist:
+        logger.error(f"StripeIdentity not found for session {session_id}")
+    except Exception as e:
+        logger.error(f"Error updating identity status: {e}")
+
+
+# Handle identity.verification_session.failed event
+def handle_identity_verification_session_failed(event):
+    verification_session = event["data"]["object"]
+    session_id = verification_session["id"]
+
+    try:
+        stripe_identity = StripeIdentity.objects.get(
+            verification_session_id=session_id
+        )
+        stripe_identity.identity_status = "failed"
+        stripe_identity.identity_verified = False
+        # Save the exact webhook response
+        stripe_identity.verification_data = event
+        stripe_identity.save()
+
+        # Send notification for failed identity verification
+        NotificationService.create_notification(
+            stripe_identity.user,
+            message="notifications.identity_verification_failed"
+        )
+
+        logger.info(
+            f"Identity verification failed for user {stripe_identity.user.id}"
+        )
+    except StripeIdentity.DoesNotExist:
+        logger.error(f"StripeIdentity not found for session {session_id}")
+    except Exception as e:
+        logger.error(f"Error updating identity status: {e}")
+
+
+# Handle identity.verification_session.canceled event
+def handle_identity_verification_session_canceled(event):
+    verification_session = event["data"]["object"]
+    session_id = verification_session["id"]
+
+    try:
+        stripe_identity = StripeIdentity.objects.get(
+            verification_session_id=session_id
+        )
+        stripe_identity.identity_status = "canceled"
+        stripe_identity.identity_verified = False
+        # Save the exact webhook response
+        stripe_identity.verification_data = event
+        stripe_identity.save()
+        logger.info(
+            f"Identity verification canceled for user {stripe_identity.user.id}"
+        )
+    except StripeIdentity.DoesNotExist:
+        logger.error(f"StripeIdentity not found for session {session_id}")
+    except Exception as e:
+        logger.error(f"Error updating identity status: {e}")
+
+
+# Handle checkout.session.completed event
+def handle_checkout_session_completed(event):
+    payment = event["data"]["object"]
+    payment_id = payment["id"]
+    project_id = payment["metadata"]["project_id"]
+    project = Project.objects.get(id=project_id)
+    project.status = "approved"
+    project.save()
+    # HubSpot sync now handled automatically by Django signals
+    payment = Payment.objects.get(stripe_payment_id=payment_id)
+    # Stripe redelivers events and failed handlers are replayed: only the first
+    # delivery that marks the payment paid records VAT and credits the escrow
+    already_paid = payment.status == "paid"
+    if not already_paid:
+        RevenueService.add_vat_collected(payment)
+    payment.status = "paid"
+    payment.webhook_response = event
+    payment.save()
+
+    # Update HubSpot Payments record via task (keeps Payments object in sync)
+    try:
+        from hubspot.tasks import sync_payment_to_hubspot
+        transaction.on_commit(lambda: sync_payment_to_hubspot.delay(payment_id=payment.id), robust=True)
+    except Exception:
+        pass
+
+    # Enqueue HubSpot Revenue monthly sync for payment metrics only
+    from hubspot.sync_utils import sync_revenue_to_hubspot
+    now = timezone.now()
+    
+    # Ensure revenue sync only happens after database commit
+    # Only sync payment-related metrics (VAT collected + total payments)
+    transaction.on_commit(
+        lambda: sync_revenue_to_hubspot(now.year, now.month, "payment_webhook_success", sync_type="payment")
+    )
+
+    try:
+        # The payment is held in escrow until milestones are approved
+        if project.client and not already_paid:
+            BalanceService.update_buyer_balance_on_payment(
+                buyer=project.client, payment_amount=payment.buyer_total_amount
+            )
+    except Exception as e:
+        logger.error(f"Error updating buyer balance: {e}")
+        # Don't break the webhook flow if balance update fails
+
+    # Buyer revenue tracking removed: buyers are only charged VAT
+
+    # Email: notify client of successful payment
+    try:
+        if project.client:
+            client = project.client
+            client_name = (
+                client.get_full_name()
+                or getattr(client, "username", None)
+                or (
+                    client.email.split("@")[0]
+                    if getattr(client, "email", None)
+                    else "User"
+                )
+            )
+            transaction.on_commit(
+                lambda: send_payment_success_email_task.delay(
+                    user_email=client.email,
+                    user_name=client_name,
+                    project_name=project.name,
+                    amount=str(payment.amount),
+                    language="fr",
+                ),
+                robust=True,
+            )
+            # Also notify the seller in French
+            try:
+                seller = project.user
+                if seller and getattr(seller, "email", None):
+                    seller_name = (
+                        seller.get_full_name()
+                        or getattr(seller, "username", None)
+                        or seller.email
+                    )
+                    transaction.on_commit(
+                        lambda: send_payment_success_email_seller_task.delay(
+                            seller.email,
+                            seller_name,
+                            project.name,
+                            float(payment.buyer_total_amount or payment.amount),
+                            "fr",
+                        ),
+                        robust=True,
+                    )
+            except Exception:
+                pass
+    except Exception:
+        # Avoid breaking webhook flow if email fails
+        pass
+
+    # Send notifications for successful payment
+    NotificationService.create_notification(
+        project.user,
+        message="notifications.project_approved_seller",
+        project_name=project.name
+    )
+    NotificationService.create_notification(
+        project.client,
+        message="notifications.payment_processed_buyer",
+        amount=str(payment.amount),
+        project_name=project.name
+    )
+
+    # Send WebSocket update
+    send_payment_websocket_update(
+        project_id=project.id,
+        payment_status="paid",
+        payment_amount=payment.amount,
+        project_status="approved",
+        updated_at=payment.updated_at,
+    )
+
+
+# Handle async success for bank transfers (customer_balance)
+def handle_checkout_session_async_payment_succeeded(event):
+    payment = event["data"]["object"]
+    payment_id = payment["id"]
+    project_id = payment["metadata"]["project_id"]
+    project = Project.objects.get(id=project_id)
+    project.status = "approved"
+    project.save()
+    # HubSpot sync now handled automatically by Django signals
+
+    payment_obj = Payment.objects.get(stripe_payment_id=payment_id)
+    if payment_obj.status != "paid":
+        RevenueService.add_vat_collected(payment_obj)
+    payment_obj.status = "paid"
+    payment_obj.webhook_response = event
+    payment_obj.save()
+
+    try:
+        if project.client:
+            client = project.client
+            client_name = (
+                client.get_full_name()
+                or getattr(client, "username", None)
+                or (
+                    client.email.split("@")[0]
+                    if getattr(client, "email", None)
+                    else "User"
+                )
+            )
+            transaction.on_commit(
+                lambda: send_payment_success_email_task.delay(
+                    user_email=client.email,
+                    user_name=client_name,
+                    project_name=project.name,
+                    amount=str(payment_obj.amount),
+                    language="fr",
+                ),
+                robust=True,
+            )
+            # Notify seller in French
+            try:
+                seller = project.user
+                if seller and getattr(seller, "email", None):
+                    seller_name = (
+                        seller.get_full_name()
+                        or getattr(seller, "username", None)
+                        or seller.email
+                    )
+                    transaction.on_commit(
+                        lambda: send_payment_success_email_seller_task.delay(
+                            seller.email,
+                            seller_name,
+                            project.name,
+                            float(payment_obj.buyer_total_amount or payment_obj.amount),
+                            "fr",
+                        ),
+                        robust=True,
+                    )
+            except Exception:
+                pass
+    except Exception:
+        pass
+
+    NotificationService.create_notification(
+        project.user,
+        message="notifications.project_approved_seller",
+        project_name=project.name
+    )
+    NotificationService.create_notification(
+        project.client,
+        message="notifications.payment_processed_buyer",
+        amount=str(payment_obj.amount),
+        project_name=project.name
+    )
+
+    send_payment_websocket_update(
+        project_id=project.id,
+        payment_status="paid",
+        payment_amount=payment_obj.amount,
+        project_status="approved",
+        updated_at=payment_obj.updated_at,
+    )
+
+
+# Handle checkout.session.expired event
+def handle_checkout_session_expired(event):
+    payment = event["data"]["object"]
+    payment_id = payment["id"]
+    project_id = payment["metadata"]["project_id"]
+    payment = Payment.objects.get(stripe_payment_id=payment_id)
+    payment.status = "pending"
+    payment.webhook_response = event
+    payment.save()
+
+    # Update HubSpot Payments record via task
+    try:
+        from hubspot.tasks import sync_payment_to_hubspot
+        transaction.on_commit(lambda: sync_payment_to_hubspot.delay(payment_id=payment.id), robust=True)
+    except Exception:
+        pass
+    project = Project.objects.get(id=project_id)
+    project.status = "pending"
+    project.save()
+
+    # Send notifications for expired payment session
+    NotificationService.create_notification(
+        project.client,
+        message="notifications.payment_session_expired",
+        project_name=project.name
+    )
+
+    # Send WebSocket update
+    send_payment_websocket_update(
+        project_id=project.id,
+        payment_status="pending",
+        payment_amount=payment.amount,
+        project_status="pending",
+        updated_at=payment.updated_at,
+    )
+
+
+# Handle checkout.session.failed event
+def handle_checkout_session_async_payment_failed(event):
+    payment = event["data"]["object"]
+    payment_id = payment["id"]
+    project_id = payment["metadata"]["project_id"]
+    payment = Payment.objects.get(stripe_payment_id=payment_id)
+    payment.status = "failed"
+    payment.webhook_response = event
+    payment.save()
+
+    # Update HubSpot Payments record via task
+    try:
+        from hubspot.tasks import sync_payment_to_hubspot
+        transaction.on_commit(lambda: sync_payment_to_hubspot.delay(payment_id=payment.id), robust=True)
+    except Exception:
+        pass
+    project = Project.objects.get(id=project_id)
+    project.status = "pending"
+    project.save()
+
+    # Email: notify client of failed payment
+    try:
+        if project.client:
+            client = project.client
+            client_name = (
+                client.get_full_name()
+                or getattr(client, "username", None)
+                or (
+                    client.email.split("@")[0]
+                    if getattr(client, "email", None)
+                    else "User"
+                )
+            )
+            transaction.on_commit(
+                lambda: send_payment_failed_email_task.delay(
+                    user_email=client.email,
+                    user_name=client_name,
+                    project_name=project.name,
+                    amount=str(payment.amount),
+                    language="fr",
+                ),
+                robust=True,
+            )
+    except Exception:
+        # Avoid breaking webhook flow if email fails
+        pass
+
+    # Send notifications for failed payment
+    NotificationService.create_notification(
+        project.client,
+        message="notifications.payment_failed",
+        project_name=project.name
+    )
+
+    # Send WebSocket update
+    send_payment_websocket_update(
+        project_id=project.id,
+        payment_status="failed",
+        payment_amount=payment.amount,
+        project_status="pending",
+        updated_at=payment.updated_at,
+    )
+
+
+# Handle transfer webhook events
+def handle_transfer_created_or_updated(event):
+    logger.info(f"Processing transfer.{event['type'].split('.')[1]} webhook event")
+    TransferService.handle_transfer_created(event)
+
+
+def handle_transfer_reversed(event):
+    logger.info(f"Processing transfer.reversed webhook event")
+    transfer_data = event["data"]["object"]
+    transfer_id = transfer_data["id"]
+    reason = transfer_data.get("reversal_details", {}).get(
+        "reason", "Transfer reversed"
+    )
+    TransferService.handle_transfer_reversal(transfer_id, reason)
+
+
+def handle_transfer_failed(event):
+    logger.info(f"Processing transfer.failed webhook event")
+    transfer_data = event["data"]["object"]
+    transfer_id = transfer_data["id"]
+    reason = "Transfer failed"
+    TransferService.handle_transfer_reversal(transfer_id, reason)
+
+
+def handle_refund_created(event):
+    refund = event["data"]["object"]
+    refund_id = refund["metadata"]["refund_id"]
+    project_id = refund["metadata"]["project_id"]
+    project = Project.objects.get(id=project_id)
+    project.refundable_amount = 0.00
+    project.save()
+    refund = Refund.objects.get(id=refund_id)
+    # client = refund.project.client
+    # balance = Balance.objects.get(user=client)
+    # balance.total_spent -= refund.amount
+    # balance.save()
+
+    refund.status = "paid"
+    refund.save()
+
+
+def handle_refund_updated(event):
+    refund = event["data"]["object"]
+    refund_id = refund["metadata"]["refund_id"]
+    project_id = refund["metadata"]["project_id"]
+    project = Project.objects.get(id=project_id)
+    project.refundable_amount = 0.00
+    project.save()
+    refund = Refund.objects.get(id=refund_id)
+    refund.status = "paid"
+    refund.save()
+    # client = refund.project.client
+    # balance = Balance.objects.get(user=client)
+    # balance.total_spent -= refund.amount
+    # balance.save()
+
+
+def handle_refund_failed(event):
+    refund = event["data"]["object"]
+    refund_id = refund["metadata"]["refund_id"]
+    refund = Refund.objects.get(id=refund_id)
+    refund.status = "failed"
+    refund.save()
+
+
+# Events received on the Connect webhook endpoint
+CONNECT_EVENT_HANDLERS = {
+    "account.updated": handle_account_updated,
+    "account.application.deauthorized": handle_account_application_deauthorized,
+}
+
+# Events received on the Identity webhook endpoint (identity, checkout, transfers, refunds)
+IDENTITY_EVENT_HANDLERS = {
+    "identity.verification_session.processing": handle_identity_verification_session_processing,
+    "identity.verification_session.verified": handle_identity_verification_session_verified,
+    "identity.verification_session.requires_input": handle_identity_verification_session_requires_input,
+    "identity.verification_session.failed": handle_identity_verification_session_failed,
+    "identity.verification_session.canceled": handle_identity_verification_session_canceled,
+    "checkout.session.completed": handle_checkout_session_completed,
+    "checkout.session.async_payment_succeeded": handle_checkout_session_async_payment_succeeded,
+    "checkout.session.expired": handle_checkout_session_expired,
+    "checkout.session.async_payment_failed": handle_checkout_session_async_payment_failed,
+    "transfer.created": handle_transfer_created_or_updated,
+    "transfer.updated": handle_transfer_created_or_updated,
+    "transfer.reversed": handle_transfer_reversed,
+    "transfer.failed": handle_transfer_failed,
+    "refund.created": handle_refund_created,
+    "refund.updated": handle_refund_updated,
+    "refund.failed": handle_refund_failed,
+}
+
+EVENT_HANDLERS = {
+    "connect": CONNECT_EVENT_HANDLERS,
+    "identity": IDENTITY_EVENT_HANDLERS,
+}
+
+
+def dispatch_event(endpoint, event):
+    """
+    Run the handler registered for an event.
+
+    Args:
+        endpoint: Webhook endpoint the event was received on ('connect' or 'identity')
+        event: Stripe event payload (dict)
+
+    Returns:
+        bool: True if a handler ran, False if the event type is not handled
+    """
+    handler = EVENT_HANDLERS.get(endpoint, {}).get(event["type"])
+    if handler is None:
+        logger.info(f"Unhandled Stripe {endpoint} event type: {event['type']}")
+        return False
+    handler(event)
+    return True
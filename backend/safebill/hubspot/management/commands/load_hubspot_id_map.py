@@ -0,0 +1,84 @@
+import csv
+
+from django.core.management.base import BaseCommand
+from hubspot.models import (
+    HubSpotCompanyLink,
+    HubSpotContactLink,
+    HubSpotMilestoneLink,
+    HubSpotObjectMap,
+    HubSpotTicketLink,
+)
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load the local HubSpot id map from a HubSpot CSV export or from the existing link tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-links',
+            action='store_true',
+            help='Backfill contacts, companies, tickets and milestone summaries from the HubSpot*Link tables'
+        )
+        parser.add_argument(
+            '--csv',
+            help='Path to a HubSpot export (CSV) to import'
+        )
+        parser.add_argument(
+            '--object-type',
+            choices=[choice for choice, _ in HubSpotObjectMap.OBJECT_TYPE_CHOICES],
+            help='Object type of the rows in --csv'
+        )
+        parser.add_argument(
+            '--local-id-column',
+            default='project_id',
+            help='CSV column holding the Safe Bill id (default: project_id)'
+        )
+        parser.add_argument(
+            '--hubspot-id-column',
+            default='Record ID',
+            help='CSV column holding the HubSpot record id (default: "Record ID")'
+        )
+
+    def handle(self, *args, **options):
+        if not options['from_links'] and not options['csv']:
+            self.stdout.write(self.style.ERROR('Please specify --from-links and/or --csv'))
+            return
+
+        if options['from_links']:
+            sources = [
+                ('contact', HubSpotContactLink.objects.values_list('user_id', 'hubspot_id')),
+                ('company', HubSpotCompanyLink.objects.values_list('business_detail_id', 'hubspot_id')),
+                ('ticket', HubSpotTicketLink.objects.values_list('dispute_id', 'hubspot_id')),
+                (
+                    'milestone_summary',
+                    HubSpotMilestoneLink.objects.exclude(hubspot_id='PROCESSING')
+                    .values_list('milestone__project_id', 'hubspot_id'),
+                ),
+            ]
+            for object_type, rows in sources:
+                count = HubSpotObjectMap.bulk_load(object_type, dict(rows), source='sync')
+                self.stdout.write(self.style.SUCCESS(f'Loaded {count} {object_type} ids from link table'))
+
+        if options['csv']:
+            object_type = options['object_type']
+            if not object_type:
+                self.stdout.write(self.style.ERROR('--object-type is required with --csv'))
+                return
+
+            local_column = options['local_id_column']
+            hubspot_column = options['hubspot_id_column']
+            mapping = {}
+            skipped = 0
+            with open(options['csv'], newline='', encoding='utf-8-sig') as f:
+                for row in csv.DictReader(f):
+                    local_id = (row.get(local_column) or '').strip()
+                    hubspot_id = (row.get(hubspot_column) or '').strip()
+                    if not local_id.isdigit() or not hubspot_id:
+                        skipped += 1
+                        continue
+                    mapping[int(local_id)] = hubspot_id
+
+            count = HubSpotObjectMap.bulk_load(object_type, mapping)
+            self.stdout.write(
+                self.style.SUCCESS(f'Imported {count} {object_type} ids from {options["csv"]} ({skipped} rows skipped)')
+            )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from hubspot.models import MonthlyRevenueRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized monthly revenue rollups used by the HubSpot revenue sync'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year',
+            type=int,
+            help='Refresh a single month (requires --month)'
+        )
+        parser.add_argument(
+            '--month',
+            type=int,
+            help='Refresh a single month (requires --year)'
+        )
+
+    def handle(self, *args, **options):
+        year, month = options['year'], options['month']
+        if year or month:
+            if not (year and month):
+                self.stdout.write(self.style.ERROR('Please specify both --year and --month'))
+                return
+            rollup = MonthlyRevenueRollup.refresh(year, month)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Refreshed {rollup.period_key}: GMV {rollup.gmv}, '
+                    f'commission {rollup.platform_fee_total}, '
+                    f'{rollup.total_milestones_approved} milestones'
+                )
+            )
+            return
+
+        count = MonthlyRevenueRollup.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt revenue rollups for {count} months'))
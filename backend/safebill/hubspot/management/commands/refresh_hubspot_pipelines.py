@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from hubspot.pipeline_cache import get_pipeline_stages, invalidate_pipeline
+
+
+class Command(BaseCommand):
+    help = 'Re-fetch the HubSpot deal and ticket pipelines into the pipeline cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Only drop the cached pipelines; the next sync fetches them again'
+        )
+
+    def handle(self, *args, **options):
+        from hubspot.services.DealsService import HubSpotClient
+        from hubspot.services.TicketsService import HubSpotTicketsClient
+
+        pipelines = [
+            ('deals', getattr(settings, 'HUBSPOT_DEALS_PIPELINE_ID', 'default'), HubSpotClient().get_pipeline),
+            ('tickets', str(getattr(settings, 'HUBSPOT_TICKETS_PIPELINE', '0')), HubSpotTicketsClient().get_pipeline),
+        ]
+
+        for object_type, pipeline_id, fetch in pipelines:
+            if options['clear']:
+                invalidate_pipeline(object_type)
+                self.stdout.write(self.style.SUCCESS(f'Cleared cached {object_type} pipelines'))
+                continue
+            try:
+                stages = get_pipeline_stages(object_type, pipeline_id, fetch, refresh=True)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Failed to refresh {object_type} pipeline {pipeline_id}: {e}'))
+                continue
+            labels = ', '.join(stage['label'] for stage in stages)
+            self.stdout.write(
+                self.style.SUCCESS(f'Refreshed {object_type} pipeline {pipeline_id}: {len(stages)} stages ({labels})')
+            )
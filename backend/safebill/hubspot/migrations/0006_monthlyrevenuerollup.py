@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hubspot', '0005_hubspotsyncqueue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('total_payments_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('gmv', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vat_collected', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_payments', models.PositiveIntegerField(default=0)),
+                ('platform_fee_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_milestones_approved', models.PositiveIntegerField(default=0)),
+                ('hubspot_id', models.CharField(blank=True, default='', max_length=64)),
+                ('payments_refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('milestones_refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Monthly Revenue Rollup',
+                'verbose_name_plural': 'Monthly Revenue Rollups',
+                'ordering': ['-year', '-month'],
+                'unique_together': {('year', 'month')},
+            },
+        ),
+    ]
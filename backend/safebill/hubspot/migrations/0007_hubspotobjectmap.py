@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hubspot', '0006_monthlyrevenuerollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HubSpotObjectMap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(choices=[('contact', 'Contact'), ('company', 'Company'), ('deal', 'Deal'), ('milestone_summary', 'Milestone Summary'), ('ticket', 'Ticket')], max_length=30)),
+                ('local_id', models.PositiveBigIntegerField()),
+                ('hubspot_id', models.CharField(max_length=64)),
+                ('associations', models.JSONField(blank=True, default=dict)),
+                ('source', models.CharField(choices=[('sync', 'Sync'), ('search', 'Search'), ('import', 'Import')], default='sync', max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'HubSpot Object Map',
+                'verbose_name_plural': 'HubSpot Object Map',
+                'indexes': [models.Index(fields=['object_type', 'hubspot_id'], name='hubspot_hub_object__182848_idx')],
+                'constraints': [models.UniqueConstraint(fields=('object_type', 'local_id'), name='hubspot_object_map_unique_local')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hubspot', '0007_hubspotobjectmap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hubspotcompanylink',
+            name='properties_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='hubspotcontactlink',
+            name='properties_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='hubspotmilestonelink',
+            name='properties_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='hubspotobjectmap',
+            name='properties_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
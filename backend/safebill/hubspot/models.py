@@ -17,6 +17,8 @@ class HubSpotContactLink(models.Model):
     last_synced_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, default="success")  # success|failed|pending
     last_error = models.TextField(blank=True, default="")
+    # Hash of the last property payload pushed to HubSpot (skip unchanged updates)
+    properties_hash = models.CharField(max_length=64, blank=True, default="")
 
     class Meta:
         indexes = [
@@ -36,6 +38,8 @@ class HubSpotCompanyLink(models.Model):
     last_synced_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, default="success")  # success|failed|pending
     last_error = models.TextField(blank=True, default="")
+    # Hash of the last property payload pushed to HubSpot (skip unchanged updates)
+    properties_hash = models.CharField(max_length=64, blank=True, default="")
 
     class Meta:
         indexes = [
@@ -74,6 +78,8 @@ class HubSpotMilestoneLink(models.Model):
     last_synced_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, default="success")  # success|failed|pending
     last_error = models.TextField(blank=True, default="")
+    # Hash of the last property payload pushed to HubSpot (skip unchanged updates)
+    properties_hash = models.CharField(max_length=64, blank=True, default="")
 
     class Meta:
         indexes = [
@@ -272,3 +278,348 @@ class HubSpotSyncQueue(models.Model):
             'status', 'error_message', 'error_details', 'retry_count', 
             'next_retry_at', 'worker_id'
         ])
+
+
+class MonthlyRevenueRollup(models.Model):
+    """
+    Materialized monthly revenue figures pushed to the HubSpot Revenue object.
+
+    Each revenue sync refreshes only its own month with grouped aggregate
+    queries (fees computed in SQL), so sync cost does not grow with the total
+    payment history. Also caches the HubSpot record id to skip the period search.
+    """
+
+    year = models.IntegerField()
+    month = models.IntegerField()  # 1-12
+
+    # Payment metrics (paid payments created in the month)
+    total_payments_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    gmv = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    vat_collected = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_payments = models.PositiveIntegerField(default=0)
+
+    # Milestone metrics (approved in the month, on projects paid in the month)
+    platform_fee_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_milestones_approved = models.PositiveIntegerField(default=0)
+
+    hubspot_id = models.CharField(max_length=64, blank=True, default="")
+    payments_refreshed_at = models.DateTimeField(null=True, blank=True)
+    milestones_refreshed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ["year", "month"]
+        ordering = ["-year", "-month"]
+        verbose_name = "Monthly Revenue Rollup"
+        verbose_name_plural = "Monthly Revenue Rollups"
+
+    def __str__(self):
+        return f"Revenue rollup {self.period_key}"
+
+    @property
+    def period_key(self):
+        return f"{self.year}-{self.month:02d}"
+
+    @staticmethod
+    def month_bounds(year, month):
+        """Return the [start, end) datetimes of a month, for index-friendly range filters."""
+        from django.utils import timezone
+        import datetime
+
+        start = timezone.make_aware(datetime.datetime(year, month, 1))
+        if month == 12:
+            end = timezone.make_aware(datetime.datetime(year + 1, 1, 1))
+        else:
+            end = timezone.make_aware(datetime.datetime(year, month + 1, 1))
+        return start, end
+
+    @staticmethod
+    def payment_totals_by_month(payments):
+        """
+        Group paid payments by month in a single query.
+
+        Returns:
+            QuerySet: dicts with period, total_payments_amount, gmv, vat_collected, total_payments
+        """
+        from django.db.models import Count, F, Sum
+        from django.db.models.functions import TruncMonth
+
+        return (
+            payments.filter(status="paid")
+            .annotate(period=TruncMonth("created_at"))
+            .order_by()
+            .values("period")
+            .annotate(
+                total_payments_amount=Sum("amount"),
+                gmv=Sum("buyer_total_amount"),
+                vat_collected=Sum(F("buyer_total_amount") - F("amount")),
+                total_payments=Count("id"),
+            )
+        )
+
+    @staticmethod
+    def milestone_totals_by_month(milestones):
+        """
+        Group approved milestones by completion month in a single query.
+
+        Only milestones whose project has a paid payment created in the same
+        month are counted. The platform fee is computed in SQL with
+        FeeCalculationService.platform_fee_expression().
+
+        Returns:
+            QuerySet: dicts with period, platform_fee_total, total_milestones_approved
+        """
+        from django.db.models import Count, Exists, OuterRef, Sum
+        from django.db.models.functions import TruncMonth
+        from payments.models import Payment
+        from payments.services import FeeCalculationService
+
+        paid_in_same_month = (
+            Payment.objects.filter(project=OuterRef("project_id"), status="paid")
+            .annotate(period=TruncMonth("created_at"))
+            .filter(period=OuterRef("period"))
+        )
+        return (
+            milestones.filter(status="approved", completion_date__isnull=False)
+            .annotate(period=TruncMonth("completion_date"))
+            .filter(Exists(paid_in_same_month))
+            .order_by()
+            .values("period")
+            .annotate(
+                platform_fee_total=Sum(FeeCalculationService.platform_fee_expression()),
+                total_milestones_approved=Count("id"),
+            )
+        )
+
+    @classmethod
+    def refresh(cls, year, month, sync_type="all"):
+        """
+        Recompute one month from the source tables and store it.
+
+        Args:
+            year: Year of the period
+            month: Month of the period
+            sync_type: "payment", "milestone" or "all" - which metrics to refresh
+
+        Returns:
+            MonthlyRevenueRollup: The refreshed row
+        """
+        from decimal import Decimal
+        from django.utils import timezone
+        from payments.models import Payment
+
+        start, end = cls.month_bounds(year, month)
+        rollup, _ = cls.objects.get_or_create(year=year, month=month)
+        now = timezone.now()
+        update_fields = ["updated_at"]
+
+        if sync_type in ["payment", "all"]:
+            totals = cls.payment_totals_by_month(
+                Payment.objects.filter(created_at__gte=start, created_at__lt=end)
+            ).order_by("period").first() or {}
+            rollup.total_payments_amount = totals.get("total_payments_amount") or Decimal("0")
+            rollup.gmv = totals.get("gmv") or Decimal("0")
+            rollup.vat_collected = totals.get("vat_collected") or Decimal("0")
+            rollup.total_payments = totals.get("total_payments") or 0
+            rollup.payments_refreshed_at = now
+            update_fields += [
+                "total_payments_amount", "gmv", "vat_collected",
+                "total_payments", "payments_refreshed_at",
+            ]
+
+        if sync_type in ["milestone", "all"]:
+            totals = cls.milestone_totals_by_month(
+                Milestone.objects.filter(completion_date__gte=start, completion_date__lt=end)
+            ).order_by("period").first() or {}
+            rollup.platform_fee_total = Decimal(totals.get("platform_fee_total") or 0).quantize(Decimal("0.01"))
+            rollup.total_milestones_approved = totals.get("total_milestones_approved") or 0
+            rollup.milestones_refreshed_at = now
+            update_fields += [
+                "platform_fee_total", "total_milestones_approved", "milestones_refreshed_at",
+            ]
+
+        rollup.save(update_fields=update_fields)
+        return rollup
+
+    @classmethod
+    def rebuild_all(cls):
+        """
+        Rebuild every month in two grouped queries and upsert the rows.
+
+        Returns:
+            int: Number of months written
+        """
+        from decimal import Decimal
+        from django.utils import timezone
+        from payments.models import Payment
+
+        now = timezone.now()
+        rows = {}
+        for totals in cls.payment_totals_by_month(Payment.objects.all()):
+            period = totals["period"]
+            row = rows.setdefault((period.year, period.month), cls(year=period.year, month=period.month))
+            row.total_payments_amount = totals["total_payments_amount"] or Decimal("0")
+            row.gmv = totals["gmv"] or Decimal("0")
+            row.vat_collected = totals["vat_collected"] or Decimal("0")
+            row.total_payments = totals["total_payments"]
+        for totals in cls.milestone_totals_by_month(Milestone.objects.all()):
+            period = totals["period"]
+            row = rows.setdefault((period.year, period.month), cls(year=period.year, month=period.month))
+            row.platform_fee_total = Decimal(totals["platform_fee_total"] or 0).quantize(Decimal("0.01"))
+            row.total_milestones_approved = totals["total_milestones_approved"]
+
+        for row in rows.values():
+            row.payments_refreshed_at = now
+            row.milestones_refreshed_at = now
+            row.updated_at = now
+
+        cls.objects.bulk_create(
+            rows.values(),
+            update_conflicts=True,
+            unique_fields=["year", "month"],
+            update_fields=[
+                "total_payments_amount", "gmv", "vat_collected", "total_payments",
+                "platform_fee_total", "total_milestones_approved",
+                "payments_refreshed_at", "milestones_refreshed_at", "updated_at",
+            ],
+        )
+        return len(rows)
+
+
+class HubSpotObjectMap(models.Model):
+    """
+    Local map of Safe Bill objects to HubSpot record ids and associations.
+
+    One row per (object type, local primary key), so resolving the HubSpot id of
+    a deal or milestone summary is a single indexed read instead of a search API
+    call. Associations already created in HubSpot are recorded on the row so
+    syncs do not re-create or re-list them. Rows are written by the sync tasks
+    and can be bulk-loaded from HubSpot exports or the link tables with the
+    ``load_hubspot_id_map`` command.
+    """
+
+    OBJECT_TYPE_CHOICES = [
+        ('contact', 'Contact'),               # local_id = User.id
+        ('company', 'Company'),               # local_id = BusinessDetail.id
+        ('deal', 'Deal'),                     # local_id = Project.id
+        ('milestone_summary', 'Milestone Summary'),  # local_id = Project.id
+        ('ticket', 'Ticket'),                 # local_id = Dispute.id
+    ]
+
+    SOURCE_CHOICES = [
+        ('sync', 'Sync'),
+        ('search', 'Search'),
+        ('import', 'Import'),
+    ]
+
+    object_type = models.CharField(max_length=30, choices=OBJECT_TYPE_CHOICES)
+    local_id = models.PositiveBigIntegerField()
+    hubspot_id = models.CharField(max_length=64)
+    # HubSpot ids this record is associated with, per target type:
+    # {"companies": ["123"], "contacts": ["456"]}
+    associations = models.JSONField(default=dict, blank=True)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='sync')
+    # Hash of the last property payload pushed to HubSpot (skip unchanged updates)
+    properties_hash = models.CharField(max_length=64, blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["object_type", "local_id"], name="hubspot_object_map_unique_local"),
+        ]
+        indexes = [
+            models.Index(fields=["object_type", "hubspot_id"]),
+        ]
+        verbose_name = "HubSpot Object Map"
+        verbose_name_plural = "HubSpot Object Map"
+
+    def __str__(self):
+        return f"{self.object_type}:{self.local_id} -> {self.hubspot_id}"
+
+    @classmethod
+    def get_entry(cls, object_type, local_id):
+        return cls.objects.filter(object_type=object_type, local_id=local_id).first()
+
+    @classmethod
+    def lookup(cls, object_type, local_id):
+        """Return the HubSpot id mapped to a local object, or None."""
+        return (
+            cls.objects.filter(object_type=object_type, local_id=local_id)
+            .values_list("hubspot_id", flat=True)
+            .first()
+        )
+
+    @classmethod
+    def lookup_many(cls, object_type, local_ids):
+        """
+        Resolve many local objects in one query.
+
+        Returns:
+            dict: local_id -> hubspot_id for the mapped objects only
+        """
+        return dict(
+            cls.objects.filter(object_type=object_type, local_id__in=list(local_ids))
+            .values_list("local_id", "hubspot_id")
+        )
+
+    @classmethod
+    def remember(cls, object_type, local_id, hubspot_id, source="sync"):
+        """
+        Record the HubSpot id of a local object.
+
+        Recorded associations and the pushed-properties hash are dropped when
+        the id changes, since they belonged to the previous HubSpot record.
+        """
+        hubspot_id = str(hubspot_id)
+        entry, created = cls.objects.get_or_create(
+            object_type=object_type,
+            local_id=local_id,
+            defaults={"hubspot_id": hubspot_id, "source": source},
+        )
+        if not created and entry.hubspot_id != hubspot_id:
+            entry.hubspot_id = hubspot_id
+            entry.source = source
+            entry.associations = {}
+            entry.properties_hash = ""
+            entry.save(update_fields=["hubspot_id", "source", "associations", "properties_hash", "updated_at"])
+        return entry
+
+    @classmethod
+    def forget(cls, object_type, local_id):
+        """Drop a mapping whose HubSpot record no longer exists."""
+        cls.objects.filter(object_type=object_type, local_id=local_id).delete()
+
+    @classmethod
+    def bulk_load(cls, object_type, mapping, source="import", batch_size=1000):
+        """
+        Upsert many mappings at once, e.g. from a HubSpot export.
+
+        Args:
+            object_type: One of OBJECT_TYPE_CHOICES
+            mapping: dict of local_id -> hubspot_id
+
+        Returns:
+            int: Number of rows written
+        """
+        rows = [
+            cls(object_type=object_type, local_id=int(local_id), hubspot_id=str(hubspot_id), source=source)
+            for local_id, hubspot_id in mapping.items()
+            if local_id and hubspot_id
+        ]
+        cls.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["object_type", "local_id"],
+            update_fields=["hubspot_id", "source", "associations", "properties_hash", "updated_at"],
+        )
+        return len(rows)
+
+    def has_association(self, to_type, hubspot_id):
+        return str(hubspot_id) in self.associations.get(to_type, [])
+
+    def add_association(self, to_type, hubspot_id):
+        ids = self.associations.setdefault(to_type, [])
+        if str(hubspot_id) not in ids:
+            ids.append(str(hubspot_id))
+            self.save(update_fields=["associations", "updated_at"])
@@ -0,0 +1,150 @@
+"""
+Cache of HubSpot pipeline definitions.
+
+Pipelines and their stages change rarely (only when someone edits them in
+HubSpot), yet every deal and ticket sync needs a stage id. Definitions are kept
+in two tiers so a sync normally costs no extra HubSpot round-trip:
+
+- a process-local dict, checked first;
+- Redis, shared by every Gunicorn/Daphne/Celery process so a cold worker does
+  not have to hit HubSpot either.
+
+Entries expire after HUBSPOT_PIPELINE_CACHE_TTL seconds and can be refreshed
+explicitly with the ``refresh_hubspot_pipelines`` management command.
+"""
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+
+from utils.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_CACHE_TTL = getattr(settings, 'HUBSPOT_PIPELINE_CACHE_TTL', 3600)
+KEY_PREFIX = 'hubspot:pipeline'
+# Minimum seconds between re-fetches triggered by a label missing from the cache,
+# so an unmapped status cannot turn every sync back into a HubSpot round-trip
+MISS_REFRESH_COOLDOWN = 60
+
+# (object_type, pipeline_id) -> (expires_at, stages)
+_local_cache: Dict[tuple, tuple] = {}
+_local_lock = threading.Lock()
+# (object_type, pipeline_id) -> time of the last miss-triggered refresh
+_last_miss_refresh: Dict[tuple, float] = {}
+
+
+def _redis_key(object_type: str, pipeline_id: str) -> str:
+    return f"{KEY_PREFIX}:{object_type}:{pipeline_id}"
+
+
+def _normalize_stages(data: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Keep only what stage resolution needs, in pipeline display order."""
+    return [
+        {"id": str(stage.get("id")), "label": str(stage.get("label", "")).strip()}
+        for stage in data.get("stages", [])
+    ]
+
+
+def _store(object_type: str, pipeline_id: str, stages: List[Dict[str, str]]) -> None:
+    with _local_lock:
+        _local_cache[(object_type, pipeline_id)] = (time.time() + PIPELINE_CACHE_TTL, stages)
+
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        client.set(_redis_key(object_type, pipeline_id), json.dumps(stages), ex=PIPELINE_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Failed to cache HubSpot {object_type} pipeline {pipeline_id} in Redis: {e}")
+
+
+def get_pipeline_stages(
+    object_type: str,
+    pipeline_id: str,
+    fetch: Callable[[str], Dict[str, Any]],
+    refresh: bool = False,
+) -> List[Dict[str, str]]:
+    """
+    Get the stages of a pipeline, fetching it from HubSpot only on a cache miss.
+
+    Args:
+        object_type: HubSpot object type of the pipeline ('deals', 'tickets')
+        pipeline_id: HubSpot pipeline id
+        fetch: Callable returning the raw pipeline JSON from HubSpot
+        refresh: Bypass both cache tiers and re-fetch the pipeline
+
+    Returns:
+        list: ``[{'id': ..., 'label': ...}, ...]`` in pipeline order
+    """
+    pipeline_id = str(pipeline_id)
+    cache_key = (object_type, pipeline_id)
+
+    if not refresh:
+        entry = _local_cache.get(cache_key)
+        if entry and entry[0] > time.time():
+            return entry[1]
+
+        client = get_redis_client()
+        if client is not None:
+            try:
+                cached = client.get(_redis_key(object_type, pipeline_id))
+                if cached:
+                    stages = json.loads(cached)
+                    ttl = client.ttl(_redis_key(object_type, pipeline_id))
+                    expires_at = time.time() + (ttl if ttl and ttl > 0 else PIPELINE_CACHE_TTL)
+                    with _local_lock:
+                        _local_cache[cache_key] = (expires_at, stages)
+                    return stages
+            except Exception as e:
+                logger.warning(f"Failed to read cached HubSpot {object_type} pipeline {pipeline_id}: {e}")
+
+    stages = _normalize_stages(fetch(pipeline_id))
+    _store(object_type, pipeline_id, stages)
+    logger.info(f"HubSpot: cached {object_type} pipeline {pipeline_id} ({len(stages)} stages)")
+    return stages
+
+
+def refresh_on_miss(object_type: str, pipeline_id: str) -> bool:
+    """
+    Decide whether a lookup miss should force a re-fetch of the pipeline.
+
+    Returns:
+        bool: True at most once per MISS_REFRESH_COOLDOWN per pipeline and process.
+    """
+    cache_key = (object_type, str(pipeline_id))
+    now = time.time()
+    with _local_lock:
+        if now - _last_miss_refresh.get(cache_key, 0.0) < MISS_REFRESH_COOLDOWN:
+            return False
+        _last_miss_refresh[cache_key] = now
+        return True
+
+
+def invalidate_pipeline(object_type: str, pipeline_id: Optional[str] = None) -> None:
+    """
+    Drop cached pipelines of ``object_type`` (all of them if no id is given).
+
+    Only this process's memory is cleared directly; other processes pick up the
+    change when their local entry expires or on their next Redis read.
+    """
+    with _local_lock:
+        for key in list(_local_cache):
+            if key[0] == object_type and (pipeline_id is None or key[1] == str(pipeline_id)):
+                del _local_cache[key]
+
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        if pipeline_id is not None:
+            client.delete(_redis_key(object_type, str(pipeline_id)))
+        else:
+            keys = list(client.scan_iter(match=f"{KEY_PREFIX}:{object_type}:*"))
+            if keys:
+                client.delete(*keys)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate cached HubSpot {object_type} pipelines: {e}")
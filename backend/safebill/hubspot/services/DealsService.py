@@ -32,12 +32,17 @@ class HubSpotClient:
             raise
         return resp.json()
 
-    def resolve_stage_id(self, pipeline_id: str, status_label: str) -> Optional[str]:
-        """Resolve a dealstage id from current pipeline labels, no env map needed."""
+    def resolve_stage_id(self, pipeline_id: str, status_label: str, refresh: bool = False) -> Optional[str]:
+        """Resolve a dealstage id from current pipeline labels, no env map needed.
+
+        Pipeline labels are served from the pipeline cache; HubSpot is only queried
+        on a cache miss, or once more if the label is unknown to the cached copy.
+        """
+        from hubspot.pipeline_cache import get_pipeline_stages, refresh_on_miss
+
         try:
-            data = self.get_pipeline(pipeline_id)
-            stages = data.get("stages", [])
-            labels_to_id = {str(s.get("label", "")).strip().lower(): str(s.get("id")) for s in stages}
+            stages = get_pipeline_stages("deals", pipeline_id, self.get_pipeline, refresh=refresh)
+            labels_to_id = {s["label"].lower(): s["id"] for s in stages}
             key = (status_label or "").strip().lower()
             if key in labels_to_id:
                 return labels_to_id[key]
@@ -60,11 +65,15 @@ class HubSpotClient:
                 lk = label.strip().lower()
                 if lk in labels_to_id:
                     return labels_to_id[lk]
+            # the pipeline may have been edited since it was cached
+            if not refresh and refresh_on_miss("deals", pipeline_id):
+                return self.resolve_stage_id(pipeline_id, status_label, refresh=True)
             # else return first stage id as last resort
-            return str(stages[0]["id"]) if stages else None
+            return stages[0]["id"] if stages else None
         except Exception as exc:
             logger.error("HubSpot resolve_stage_id error: %s", exc)
             return None
+
     def search_deal_by_project_id(self, project_id: str) -> Optional[Dict[str, Any]]:
         """Find the single deal associated with this project ID."""
         url = f"{self.base_url}/crm/v3/objects/deals/search"
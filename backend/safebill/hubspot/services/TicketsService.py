@@ -51,10 +51,11 @@ class HubSpotTicketsClient:
         return resp.json()
 
     def get_first_stage_id(self, pipeline_id: str) -> str:
+        from hubspot.pipeline_cache import get_pipeline_stages
+
         try:
-            data = self.get_pipeline(pipeline_id)
-            stages = data.get("stages", [])
-            return str(stages[0]["id"]) if stages else ""
+            stages = get_pipeline_stages("tickets", pipeline_id, self.get_pipeline)
+            return stages[0]["id"] if stages else ""
         except Exception:
             return ""
 
@@ -1,7 +1,6 @@
 import threading
 import logging
 import functools
-import time
 from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
 from django.db import transaction
@@ -23,15 +22,13 @@ from .sync_utils import (
     is_hubspot_sync_enabled,
     HUBSPOT_SYNC_ENABLED
 )
+from .sync_coordination import get_debounce_stats
 
 logger = logging.getLogger(__name__)
 _local = threading.local()
 
-# Global lock to prevent duplicate syncs within a short timeframe
-_milestone_sync_locks = {}
-_milestone_lock = threading.Lock()
-_project_sync_locks = {}
-_project_lock = threading.Lock()
+# Bursts of saves are coalesced across processes by the Redis debounce window
+# in sync_coordination (enabled with debounce=True on the sync helpers below)
 
 # Feature flags for gradual rollout (production safety)
 USER_SIGNALS_ENABLED = getattr(settings, 'HUBSPOT_USER_SIGNALS_ENABLED', True)
@@ -188,7 +185,7 @@ def auto_sync_user_to_hubspot(sender, instance, created, **kwargs):
     
     try:
         # Use transaction.on_commit for production data consistency
-        result = safe_contact_sync(user_id, reason, use_transaction_commit=True)
+        result = safe_contact_sync(user_id, reason, debounce=True, use_transaction_commit=True)
         logger.info(f"User {user_id} sync result ({sync_type}): {result}")
     except Exception as e:
         # Never let signal failures break the main application
@@ -222,7 +219,7 @@ def auto_sync_company_to_hubspot(sender, instance, created, **kwargs):
     
     try:
         # Use immediate execution for maximum reliability
-        result = safe_company_sync(business_id, reason)
+        result = safe_company_sync(business_id, reason, debounce=True)
         logger.info(f"Company {business_id} sync result: {result}")
     except Exception as e:
         # Never let signal failures break the main application
@@ -251,7 +248,8 @@ def capture_project_changes(sender, instance, **kwargs):
 def auto_sync_project_to_hubspot(sender, instance, created, **kwargs):
     """
     Automatically sync projects to HubSpot as deals.
-    Uses thread-safe global lock to prevent duplicate syncs from multiple webhook calls.
+    Rapid successive saves (e.g. multiple webhook calls) are debounced across
+    processes into a single trailing deal sync carrying the final project state.
     """
     # Only sync real projects (not quote chat projects)
     if getattr(instance, 'project_type', None) != 'real_project':
@@ -267,37 +265,6 @@ def auto_sync_project_to_hubspot(sender, instance, created, **kwargs):
     # Always log signal entry for debugging
     logger.info(f"DEBUG: Project signal fired for project_id={project_id}")
     
-    # CRITICAL: Use thread-safe global lock to prevent duplicate syncs
-    # This prevents multiple webhook calls from triggering duplicate syncs
-    lock_key = f"project_{project_id}_sync"
-    current_time = time.time()
-    
-    with _project_lock:
-        # Smart deduplication: prevent rapid duplicates but allow legitimate updates
-        if lock_key in _project_sync_locks:
-            last_sync_time, last_sync_status = _project_sync_locks[lock_key]
-            time_diff = current_time - last_sync_time
-            current_status = getattr(instance, 'status', None)
-            
-            # Skip if same status update within 10 seconds (likely duplicate)
-            if time_diff < 10 and last_sync_status == current_status:
-                logger.info(f"DEBUG: Project {project_id} duplicate sync detected (same status '{current_status}', {time_diff:.1f}s ago) - SKIPPING")
-                return
-            # Skip rapid duplicate only if status did not change
-            elif time_diff < 1 and last_sync_status == current_status:
-                logger.info(f"DEBUG: Project {project_id} rapid same-status sync ({time_diff:.1f}s ago) - SKIPPING")
-                return
-        
-        # Claim this project for syncing
-        current_status = getattr(instance, 'status', None)
-        _project_sync_locks[lock_key] = (current_time, current_status)
-        logger.info(f"DEBUG: Acquired sync lock for project {project_id} (status: {current_status})")
-        
-        # Clean up old locks (older than 5 minutes)
-        expired_keys = [k for k, v in _project_sync_locks.items() if current_time - v[0] > 300]
-        for k in expired_keys:
-            del _project_sync_locks[k]
-    
     # Simple text indicator when signal fires
     print("--- Django signal fired - Project sync")
     
@@ -312,6 +279,7 @@ def auto_sync_project_to_hubspot(sender, instance, created, **kwargs):
             result = sync_project_to_hubspot(
                 project_id=project_id,
                 reason=reason,
+                debounce=True,
                 use_transaction_commit=True
             )
             logger.info(f"Project {project_id} sync result: {result}")
@@ -340,7 +308,7 @@ def auto_sync_project_to_hubspot(sender, instance, created, **kwargs):
             if created and hasattr(instance, 'user') and instance.user:
                 user_id = getattr(instance.user, 'id', None)
                 if user_id:
-                    safe_contact_sync(user_id, "project_created", use_transaction_commit=True)
+                    safe_contact_sync(user_id, "project_created", debounce=True, use_transaction_commit=True)
                     logger.info(f"Queued contact sync for project owner (user_id={user_id}) after project {project_id} creation")
             
             # Sync project client (buyer) when:
@@ -349,12 +317,12 @@ def auto_sync_project_to_hubspot(sender, instance, created, **kwargs):
             if (created or client_changed):
                 # Sync new/current client if assigned
                 if current_client_id:
-                    safe_contact_sync(current_client_id, "project_client_assigned", use_transaction_commit=True)
+                    safe_contact_sync(current_client_id, "project_client_assigned", debounce=True, use_transaction_commit=True)
                     logger.info(f"Queued contact sync for project client (user_id={current_client_id}) after project {project_id} client assignment")
                 
                 # Sync old client if client was removed or reassigned (count decreased for old client)
                 if old_client_id and old_client_id != current_client_id:
-                    safe_contact_sync(old_client_id, "project_client_removed", use_transaction_commit=True)
+                    safe_contact_sync(old_client_id, "project_client_removed", debounce=True, use_transaction_commit=True)
                     logger.info(f"Queued contact sync for previous project client (user_id={old_client_id}) after project {project_id} client removal/reassignment")
         except Exception as e:
             # Never block project sync on contact sync failures
@@ -363,12 +331,6 @@ def auto_sync_project_to_hubspot(sender, instance, created, **kwargs):
     except Exception as e:
         # Never let signal failures break the main application
         logger.error(f"Project {project_id} signal sync failed: {e}", exc_info=True)
-        
-        # Clean up the sync lock if sync failed
-        with _project_lock:
-            if lock_key in _project_sync_locks:
-                del _project_sync_locks[lock_key]
-                logger.info(f"DEBUG: Cleaned up failed project sync lock for project {project_id}")
 
 
 @receiver(post_save, sender='projects.Milestone')
@@ -399,21 +361,17 @@ def auto_sync_milestone_to_hubspot(sender, instance, created, **kwargs):
     # Always log signal entry for debugging
     logger.info(f"DEBUG: Milestone signal fired for milestone_id={milestone_id}, project_id={project_id}")
         
-    lock_key = f"project_{project_id}_milestone_sync"
-    # Deduplication logic
-    with _milestone_lock:
-        if lock_key in _milestone_sync_locks:
-            last_sync_time = _milestone_sync_locks[lock_key]
-            if time.time() - last_sync_time < 5:  # 5 second debounce
-                return
-        _milestone_sync_locks[lock_key] = time.time()
-
     # Simple text indicator
     print(f"--- Django signal fired - Milestone update (Project {project_id})")
     
-    # Trigger full project/deal sync because milestone changes affect "Total Paid to Seller"
-    from .tasks import sync_deal_task
-    sync_deal_task.delay(project_id)
+    # Trigger full project/deal sync because milestone changes affect "Total Paid to Seller".
+    # Debounced: a batch of milestone saves yields one deal sync for the project.
+    sync_project_to_hubspot(
+        project_id=project_id,
+        reason="signal_milestone_updated",
+        debounce=True,
+        use_transaction_commit=True
+    )
     
     # Only queue the specific milestone object sync on creation
     if created:
@@ -449,10 +407,6 @@ def auto_sync_milestone_to_hubspot(sender, instance, created, **kwargs):
             logger.info(f"Skipping milestone creation sync for project {project_id} - already queued")
     except Exception as e:
         logger.error(f"Failed to queue milestone creation sync for project {project_id}: {e}", exc_info=True)
-        with _milestone_lock:
-            if lock_key in _milestone_sync_locks:
-                del _milestone_sync_locks[lock_key]
-                logger.info(f"DEBUG: Cleaned up failed milestone sync lock for project {project_id}")
 
 
 # DISABLED: This signal was causing double revenue sync triggers
@@ -521,6 +475,7 @@ def get_signals_status() -> dict:
         'dispute_signals_enabled': DISPUTE_SIGNALS_ENABLED,
         'signals_debug_mode': SIGNALS_DEBUG_MODE,
         'hubspot_sync_enabled': HUBSPOT_SYNC_ENABLED,
+        'debounce_events': get_debounce_stats(),
         'total_signals_active': sum([
             USER_SIGNALS_ENABLED,
             PROJECT_SIGNALS_ENABLED,
@@ -0,0 +1,176 @@
+"""
+Cross-process coordination for HubSpot syncs.
+
+Signal handlers and Celery tasks run in many Gunicorn/Daphne/Celery processes,
+so module-level dicts and sets cannot deduplicate work between them. This module
+keeps that state in Redis instead:
+
+- Debounce windows: the first change to an object inside a window schedules a
+  single trailing sync; further changes in the same window are coalesced into it.
+  The task reads the object from the DB when it runs, so it carries the final state.
+- Task locks: at most one sync per object runs at a time across all workers.
+- Counters of scheduled and coalesced events for monitoring.
+
+When Redis is unavailable every helper degrades to process-local
+behaviour (no debouncing, in-memory task locks) so syncs are never dropped.
+"""
+import logging
+import threading
+import uuid
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from utils.redis_client import get_redis_client, release_lock
+
+logger = logging.getLogger(__name__)
+
+DEBOUNCE_WINDOW = getattr(settings, 'HUBSPOT_SYNC_DEBOUNCE_SECONDS', 10)
+TASK_LOCK_TIMEOUT = getattr(settings, 'HUBSPOT_TASK_LOCK_TIMEOUT', 300)
+
+# The pending marker outlives the window so a task that sits in the broker queue
+# for a while still coalesces later events; the task clears it when it starts
+DEBOUNCE_MARKER_TTL = DEBOUNCE_WINDOW * 6
+
+KEY_PREFIX = 'hubspot:sync'
+STATS_TYPES = ['deal', 'contact', 'company']
+
+# Process-local fallback used only when Redis is down: task_key -> token
+_local_running_tasks: Dict[str, str] = {}
+_local_lock = threading.Lock()
+
+
+def debounce_key(object_type: str, object_id) -> str:
+    """Build the debounce key for an object, e.g. ``deal:42``."""
+    return f"{object_type}:{object_id}"
+
+
+def claim_debounce(key: str) -> bool:
+    """
+    Register a change for ``key`` in the current debounce window.
+
+    Returns:
+        bool: True if the caller must schedule the trailing sync (first event
+        in the window, or Redis unavailable); False if the event was coalesced
+        into a sync that is already scheduled.
+    """
+    client = get_redis_client()
+    if client is None:
+        return True
+
+    object_type = key.split(':', 1)[0]
+    pending_key = f"{KEY_PREFIX}:pending:{key}"
+    events_key = f"{KEY_PREFIX}:events:{key}"
+    try:
+        pipe = client.pipeline()
+        pipe.set(pending_key, 1, nx=True, ex=DEBOUNCE_MARKER_TTL)
+        pipe.incr(events_key)
+        pipe.expire(events_key, DEBOUNCE_MARKER_TTL)
+        claimed = bool(pipe.execute()[0])
+
+        counter = 'scheduled' if claimed else 'coalesced'
+        client.incr(f"{KEY_PREFIX}:stats:{object_type}:{counter}")
+        return claimed
+    except Exception as e:
+        logger.warning(f"HubSpot debounce claim failed for {key}, scheduling immediately: {e}")
+        return True
+
+
+def release_debounce(key: str) -> int:
+    """
+    Close the debounce window for ``key``; called by the task when it starts.
+
+    Changes made after this point open a new window and schedule another
+    trailing sync, so no update is lost.
+
+    Returns:
+        int: Number of change events served by this sync run.
+    """
+    client = get_redis_client()
+    if client is None:
+        return 0
+
+    pending_key = f"{KEY_PREFIX}:pending:{key}"
+    events_key = f"{KEY_PREFIX}:events:{key}"
+    try:
+        pipe = client.pipeline()
+        pipe.get(events_key)
+        pipe.delete(pending_key, events_key)
+        events, _ = pipe.execute()
+        events = int(events or 0)
+        if events > 1:
+            logger.info(f"HubSpot: sync for {key} coalesced {events} change events")
+        return events
+    except Exception as e:
+        logger.warning(f"HubSpot debounce release failed for {key}: {e}")
+        return 0
+
+
+def acquire_task_lock(task_key: str) -> Optional[str]:
+    """
+    Mark a sync task as running across all workers.
+
+    Returns:
+        str: Token identifying this claim, to pass to release_task_lock(), or
+        None if the task is already running.
+    """
+    token = uuid.uuid4().hex
+    client = get_redis_client()
+    if client is not None:
+        try:
+            claimed = client.set(f"{KEY_PREFIX}:lock:{task_key}", token, nx=True, ex=TASK_LOCK_TIMEOUT)
+            return token if claimed else None
+        except Exception as e:
+            logger.warning(f"HubSpot task lock unavailable for {task_key}, using local lock: {e}")
+
+    with _local_lock:
+        if task_key in _local_running_tasks:
+            return None
+        _local_running_tasks[task_key] = token
+        return token
+
+
+def release_task_lock(task_key: str, token: str) -> None:
+    """Mark a sync task as finished, if ``token`` still owns its lock."""
+    with _local_lock:
+        if _local_running_tasks.get(task_key) == token:
+            del _local_running_tasks[task_key]
+
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        if not release_lock(client, f"{KEY_PREFIX}:lock:{task_key}", token):
+            logger.warning(
+                f"HubSpot task lock for {task_key} expired before the task finished "
+                f"(HUBSPOT_TASK_LOCK_TIMEOUT={TASK_LOCK_TIMEOUT}s); left the current holder's lock in place"
+            )
+    except Exception as e:
+        logger.warning(f"HubSpot task lock release failed for {task_key}: {e}")
+
+
+def get_debounce_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Get scheduled/coalesced event counters per object type.
+
+    Returns:
+        dict: e.g. ``{'deal': {'scheduled': 10, 'coalesced': 37}, ...}``
+    """
+    stats = {object_type: {'scheduled': 0, 'coalesced': 0} for object_type in STATS_TYPES}
+    client = get_redis_client()
+    if client is None:
+        return stats
+
+    try:
+        keys = [
+            f"{KEY_PREFIX}:stats:{object_type}:{counter}"
+            for object_type in STATS_TYPES
+            for counter in ('scheduled', 'coalesced')
+        ]
+        values = iter(client.mget(keys))
+        for object_type in STATS_TYPES:
+            stats[object_type]['scheduled'] = int(next(values) or 0)
+            stats[object_type]['coalesced'] = int(next(values) or 0)
+    except Exception as e:
+        logger.warning(f"Failed to read HubSpot debounce stats: {e}")
+    return stats
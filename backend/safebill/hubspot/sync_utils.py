@@ -23,6 +23,14 @@ from django.core.cache import cache
 from django.utils import timezone
 import json
 
+from .sync_coordination import (
+    DEBOUNCE_WINDOW,
+    claim_debounce,
+    debounce_key as make_debounce_key,
+    get_debounce_stats,
+    release_debounce,
+)
+
 # Use structured logging for better production monitoring
 logger = logging.getLogger(__name__)
 
@@ -39,6 +47,28 @@ CIRCUIT_BREAKER_FAILURE_THRESHOLD = getattr(settings, 'HUBSPOT_CIRCUIT_BREAKER_T
 CIRCUIT_BREAKER_TIMEOUT = getattr(settings, 'HUBSPOT_CIRCUIT_BREAKER_TIMEOUT', 300)  # 5 minutes
 
 
+def properties_hash(properties: Dict[str, Any], exclude: tuple = ()) -> str:
+    """
+    Hash a HubSpot property payload for change detection.
+
+    The hash is stored on the link/map row after each successful push; a later
+    sync building the same payload can skip the PATCH entirely.
+
+    Args:
+        properties: Property dict as sent to HubSpot
+        exclude: Keys that change on every build (e.g. timestamps) and must
+            not count as a change on their own
+
+    Returns:
+        str: Hex SHA-256 digest of the canonical JSON payload
+    """
+    import hashlib
+
+    payload = {k: v for k, v in properties.items() if k not in exclude}
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
 class HubSpotSyncError(Exception):
     """Custom exception for HubSpot sync issues."""
     pass
@@ -95,13 +125,18 @@ def rate_limit_check() -> bool:
     Returns:
         bool: True if within limits, False if rate limited
     """
-    current_count = cache.get(HUBSPOT_RATE_LIMIT_CACHE_KEY, 0)
-    if current_count >= HUBSPOT_RATE_LIMIT_MAX:
+    # Atomic fixed-window counter: the cache is shared by every worker process,
+    # so a get-then-set would let concurrent calls overwrite each other's counts
+    cache.add(HUBSPOT_RATE_LIMIT_CACHE_KEY, 0, HUBSPOT_RATE_LIMIT_WINDOW)
+    try:
+        current_count = cache.incr(HUBSPOT_RATE_LIMIT_CACHE_KEY)
+    except ValueError:
+        # Window expired between add() and incr()
+        cache.set(HUBSPOT_RATE_LIMIT_CACHE_KEY, 1, HUBSPOT_RATE_LIMIT_WINDOW)
+        current_count = 1
+    if current_count > HUBSPOT_RATE_LIMIT_MAX:
         logger.warning(f"🚦 HubSpot rate limit reached: {current_count}/{HUBSPOT_RATE_LIMIT_MAX}")
         return False
-    
-    # Increment counter
-    cache.set(HUBSPOT_RATE_LIMIT_CACHE_KEY, current_count + 1, HUBSPOT_RATE_LIMIT_WINDOW)
     return True
 
 
@@ -149,6 +184,7 @@ def safe_hubspot_sync(
     *args,
     use_transaction_commit: bool = True,
     retry_on_failure: bool = True,
+    debounce_key: Optional[str] = None,
     **kwargs
 ) -> Dict[str, Any]:
     """
@@ -160,6 +196,8 @@ def safe_hubspot_sync(
         *args: Arguments to pass to the task
         use_transaction_commit: Whether to use transaction.on_commit()
         retry_on_failure: Whether to retry failed operations
+        debounce_key: If set, coalesce calls for this key into one trailing
+            task run DEBOUNCE_WINDOW seconds later (see sync_coordination)
         **kwargs: Keyword arguments to pass to the task
         
     Returns:
@@ -167,17 +205,30 @@ def safe_hubspot_sync(
     """
     start_time = time.time()
     
+    def _dispatch():
+        """Send the task to Celery, delayed to the end of the debounce window if any."""
+        if debounce_key:
+            return task_func.apply_async(args=args, kwargs=kwargs, countdown=DEBOUNCE_WINDOW)
+        return task_func.delay(*args, **kwargs)
+    
     def _queue_task():
         """Inner function to actually queue the task."""
         if not HUBSPOT_SYNC_ENABLED:
             logger.info(f"🔕 HubSpot sync disabled, skipping {task_name}")
             return {'status': 'disabled', 'message': 'HubSpot sync disabled'}
         
+        if debounce_key and not claim_debounce(debounce_key):
+            logger.info(f"HubSpot {task_name} coalesced into pending sync for {debounce_key}")
+            return {'status': 'coalesced', 'message': f'{task_name} coalesced into pending sync'}
+        
         if not rate_limit_check():
+            if debounce_key:
+                # Nothing was scheduled, so let the next change open a new window
+                release_debounce(debounce_key)
             return {'status': 'rate_limited', 'message': 'Rate limit exceeded'}
         
         try:
-            result = task_func.delay(*args, **kwargs)
+            result = _dispatch()
             duration = time.time() - start_time
             log_sync_attempt(task_name, args, kwargs, True, duration=duration)
             
@@ -193,7 +244,7 @@ def safe_hubspot_sync(
             if retry_on_failure and not isinstance(e, CircuitBreakerOpen):
                 logger.warning(f"Retrying {task_name} after failure: {e}")
                 try:
-                    result = task_func.delay(*args, **kwargs)
+                    result = _dispatch()
                     log_sync_attempt(f"{task_name}_retry", args, kwargs, True)
                     return {
                         'status': 'success_retry',
@@ -203,6 +254,8 @@ def safe_hubspot_sync(
                 except Exception as retry_error:
                     log_sync_attempt(f"{task_name}_retry", args, kwargs, False, error=retry_error)
             
+            if debounce_key:
+                release_debounce(debounce_key)
             return {
                 'status': 'failed',
                 'error': str(e),
@@ -241,6 +294,11 @@ def safe_hubspot_sync(
 
 def safe_hubspot_sync_with_backup(task_func, task_name, *args, **kwargs):
     """Enhanced sync with immediate backup execution to prevent silent failures"""
+    # Options consumed by safe_hubspot_sync must not leak into the task call
+    task_kwargs = {
+        k: v for k, v in kwargs.items()
+        if k not in ('use_transaction_commit', 'retry_on_failure', 'debounce_key')
+    }
     try:
         # Try the original method first
         result = safe_hubspot_sync(task_func, task_name, *args, **kwargs)
@@ -249,7 +307,7 @@ def safe_hubspot_sync_with_backup(task_func, task_name, *args, **kwargs):
         if result['status'] == 'failed':
             logger.info(f"{task_name} registration failed, trying immediate backup execution")
             try:
-                backup_result = task_func.delay(*args, **kwargs)
+                backup_result = task_func.delay(*args, **task_kwargs)
                 logger.info(f"{task_name} backup queued: {backup_result.id}")
                 return {'status': 'backup_success', 'task_id': backup_result.id}
             except Exception as backup_error:
@@ -262,7 +320,7 @@ def safe_hubspot_sync_with_backup(task_func, task_name, *args, **kwargs):
         logger.error(f"{task_name} sync failed completely: {e}")
         # Last resort: try immediate execution
         try:
-            result = task_func.delay(*args, **kwargs)
+            result = task_func.delay(*args, **task_kwargs)
             logger.info(f"Emergency {task_name} execution: {result.id}")
             return {'status': 'emergency_success', 'task_id': result.id}
         except Exception as emergency_error:
@@ -270,13 +328,14 @@ def safe_hubspot_sync_with_backup(task_func, task_name, *args, **kwargs):
             return {'status': 'complete_failure', 'error': str(emergency_error)}
 
 
-def sync_project_to_hubspot(project_id: int, reason: str = "unknown", **kwargs) -> Dict[str, Any]:
+def sync_project_to_hubspot(project_id: int, reason: str = "unknown", debounce: bool = False, **kwargs) -> Dict[str, Any]:
     """
     Safely sync a project to HubSpot as a Deal.
     
     Args:
         project_id: The project ID to sync
         reason: Reason for syncing (for monitoring)
+        debounce: Coalesce bursts of calls for this project into one trailing sync
         **kwargs: Additional options for sync behavior
         
     Returns:
@@ -284,6 +343,9 @@ def sync_project_to_hubspot(project_id: int, reason: str = "unknown", **kwargs)
     """
     from .tasks import sync_deal_task
     
+    if debounce:
+        kwargs['debounce_key'] = make_debounce_key('deal', project_id)
+    
     return safe_hubspot_sync_with_backup(
         sync_deal_task,
         f"Deal Sync (reason: {reason})",
@@ -382,6 +444,10 @@ class HubSpotHealthCheck:
                 'window_seconds': HUBSPOT_RATE_LIMIT_WINDOW
             },
             'circuit_breaker_status': {},
+            'debounce_status': {
+                'window_seconds': DEBOUNCE_WINDOW,
+                'events': get_debounce_stats(),
+            },
             'recent_sync_attempts': []
         }
         
@@ -412,21 +478,26 @@ class HubSpotHealthCheck:
         """
         try:
             from projects.models import Project
+            from .models import HubSpotObjectMap
             from .services.DealsService import HubSpotClient
             
             project = Project.objects.get(id=project_id)
-            client = HubSpotClient()
             
-            # Check if deal exists in HubSpot  
-            hubspot_deal = client.search_deal_by_project_id(str(project_id))
+            # Check the local id map first, HubSpot search only for unmapped projects
+            deal_id = HubSpotObjectMap.lookup("deal", project_id)
+            if not deal_id:
+                hubspot_deal = HubSpotClient().search_deal_by_project_id(str(project_id))
+                deal_id = hubspot_deal.get('id') if hubspot_deal else None
+                if deal_id:
+                    HubSpotObjectMap.remember("deal", project_id, deal_id, source="search")
             
             return {
                 'project_id': project_id,
                 'project_name': project.name,
                 'project_status': project.status,
                 'project_type': project.project_type,
-                'hubspot_synced': hubspot_deal is not None,
-                'hubspot_deal_id': hubspot_deal.get('id') if hubspot_deal else None,
+                'hubspot_synced': deal_id is not None,
+                'hubspot_deal_id': deal_id,
                 'created_at': str(project.created_at) if hasattr(project, 'created_at') else None,
                 'check_timestamp': timezone.now().isoformat()
             }
@@ -453,6 +524,7 @@ class HubSpotHealthCheck:
             list: Projects that need syncing
         """
         from projects.models import Project
+        from .models import HubSpotObjectMap
         from .services.DealsService import HubSpotClient
         from datetime import timedelta
         
@@ -461,17 +533,25 @@ class HubSpotHealthCheck:
         
         # Get recent real projects
         cutoff_time = timezone.now() - timedelta(hours=hours)
-        projects = Project.objects.filter(
+        projects = list(Project.objects.filter(
             project_type="real_project",
             created_at__gte=cutoff_time
-        ).order_by("-created_at")[:limit]
+        ).order_by("-created_at")[:limit])
         
-        logger.info(f"Checking {projects.count()} recent projects for HubSpot sync status")
+        mapped_deals = HubSpotObjectMap.lookup_many("deal", [project.id for project in projects])
+        logger.info(
+            f"Checking {len(projects)} recent projects for HubSpot sync status "
+            f"({len(mapped_deals)} already mapped)"
+        )
         
         for project in projects:
+            if project.id in mapped_deals:
+                continue
             try:
                 hubspot_deal = client.search_deal_by_project_id(str(project.id))
-                if not hubspot_deal:
+                if hubspot_deal:
+                    HubSpotObjectMap.remember("deal", project.id, hubspot_deal.get("id"), source="search")
+                else:
                     unsynced.append({
                         'id': project.id,
                         'name': project.name,
@@ -502,19 +582,23 @@ def get_hubspot_sync_stats() -> Dict[str, Any]:
     return HubSpotHealthCheck.get_system_status()
 
 
-def safe_contact_sync(user_id: int, reason: str = "unknown", **kwargs) -> Dict[str, Any]:
+def safe_contact_sync(user_id: int, reason: str = "unknown", debounce: bool = False, **kwargs) -> Dict[str, Any]:
     """
     Safely sync a contact to HubSpot with fallback.
     
     Args:
         user_id: The user ID to sync
         reason: Reason for syncing (for monitoring)
+        debounce: Coalesce bursts of calls for this user into one trailing sync
         
     Returns:
         dict: Operation result
     """
     from .tasks import sync_contact_task
     
+    if debounce:
+        kwargs['debounce_key'] = make_debounce_key('contact', user_id)
+    
     return safe_hubspot_sync_with_backup(
         sync_contact_task,
         f"Contact Sync (reason: {reason})",
@@ -523,23 +607,29 @@ def safe_contact_sync(user_id: int, reason: str = "unknown", **kwargs) -> Dict[s
     )
 
 
-def safe_company_sync(business_detail_id: int, reason: str = "unknown") -> Dict[str, Any]:
+def safe_company_sync(business_detail_id: int, reason: str = "unknown", debounce: bool = False) -> Dict[str, Any]:
     """
     Safely sync a company to HubSpot with fallback.
     
     Args:
         business_detail_id: The business detail ID to sync
         reason: Reason for syncing (for monitoring)
+        debounce: Coalesce bursts of calls for this company into one trailing sync
         
     Returns:
         dict: Operation result
     """
     from .tasks import sync_company_task
     
+    kwargs = {}
+    if debounce:
+        kwargs['debounce_key'] = make_debounce_key('company', business_detail_id)
+    
     return safe_hubspot_sync_with_backup(
         sync_company_task,
         f"Company Sync (reason: {reason})",
-        business_detail_id
+        business_detail_id,
+        **kwargs
     )
 
 
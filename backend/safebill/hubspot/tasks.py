@@ -25,6 +25,7 @@ Total: 11 clean, organized tasks (reduced from 15+ messy tasks)
 import logging
 from typing import Optional, Dict, Any
 
+import requests
 from celery import shared_task
 from celery import chain
 from django.conf import settings
@@ -47,6 +48,8 @@ from .services.DealsService import (
 from disputes.models import Dispute
 from .models import HubSpotTicketLink
 from .models import HubSpotMilestoneLink
+from .models import MonthlyRevenueRollup
+from .models import HubSpotObjectMap
 from .services.MilestonesService import HubSpotMilestonesClient, build_milestone_properties
 from projects.models import Milestone as ProjectMilestone
 from .services.TicketsService import HubSpotTicketsClient
@@ -54,12 +57,20 @@ from .services.FeedbackService import HubSpotFeedbackClient
 from .services.RevenueService import HubSpotRevenueClient
 from adminpanelApp.models import PlatformRevenue
 from payments.models import Payment
-from django.db.models import Sum
 from django.db import models
 from datetime import datetime
 from .services.ContactMessageService import HubSpotContactMessageClient
 from .services.LeadsService import HubSpotLeadsClient
 from .services.payment_service import PaymentService
+from .sync_utils import properties_hash
+from .sync_coordination import (
+    DEBOUNCE_WINDOW,
+    acquire_task_lock,
+    claim_debounce,
+    debounce_key,
+    release_debounce,
+    release_task_lock,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -92,20 +103,19 @@ def sync_deleted_user_task(self, deleted_user_id):
 # Deal pipeline id (Sales pipeline is "default")
 DEALS_PIPELINE_ID = getattr(settings, "HUBSPOT_DEALS_PIPELINE_ID", "default")
 
-# Simple in-memory task deduplication
-_running_tasks = set()
-
-def _is_task_running(task_key):
-    """Check if a task is already running"""
-    return task_key in _running_tasks
-
+# Cross-process task deduplication (Redis-backed, see sync_coordination)
 def _mark_task_running(task_key):
-    """Mark a task as running"""
-    _running_tasks.add(task_key)
+    """Mark a task as running; returns the lock token, or None if another worker is already running it"""
+    return acquire_task_lock(task_key)
+
+def _mark_task_finished(task_key, lock_token):
+    """Mark a task as finished, releasing only the lock this run acquired"""
+    release_task_lock(task_key, lock_token)
 
-def _mark_task_finished(task_key):
-    """Mark a task as finished"""
-    _running_tasks.discard(task_key)
+def _defer_while_running(task, sync_key):
+    """Re-schedule a sync whose object is already being synced, so its changes are not lost"""
+    if claim_debounce(sync_key):
+        task.apply_async(args=task.request.args, kwargs=task.request.kwargs, countdown=DEBOUNCE_WINDOW)
 
 
 def _get_or_sync_hubspot_company_id(business_detail) -> Optional[str]:
@@ -173,14 +183,17 @@ def sync_contact_task(self, user_id: int = None, queue_item_id: int = None) -> O
         logger.info("HubSpot: sync_contact_task start (direct mode) user_id=%s", user_id)
     
     task_key = f"sync_contact_task_{user_id}"
+    # Close the debounce window: this run reads the latest state from the DB
+    sync_key = debounce_key("contact", user_id)
+    release_debounce(sync_key)
     
-    # Check if task is already running
-    if _is_task_running(task_key):
-        logger.info("HubSpot: sync_contact_task already running for user_id=%s, skipping", user_id)
+    # Check if task is already running in any worker
+    lock_token = _mark_task_running(task_key)
+    if not lock_token:
+        logger.info("HubSpot: sync_contact_task already running for user_id=%s, deferring", user_id)
+        _defer_while_running(self, sync_key)
         return None
     
-    _mark_task_running(task_key)
-    
     try:
         user = User.objects.filter(id=user_id).first()
         if not user:
@@ -195,13 +208,18 @@ def sync_contact_task(self, user_id: int = None, queue_item_id: int = None) -> O
         link = HubSpotContactLink.objects.filter(user=user).first()
         hubspot_id = link.hubspot_id if link else None
         
+        props_hash = properties_hash(props)
         if hubspot_id:
+            if link.status == "success" and link.properties_hash == props_hash:
+                logger.info("HubSpot: contact id=%s unchanged since last push, skipping update", hubspot_id)
+                return hubspot_id
             logger.info("HubSpot: updating existing contact id=%s", hubspot_id)
             data = client.update_contact(hubspot_id, props)
             if link:
                 link.status = "success"
                 link.last_error = ""
-                link.save(update_fields=["status", "last_error", "last_synced_at"])
+                link.properties_hash = props_hash
+                link.save(update_fields=["status", "last_error", "properties_hash", "last_synced_at"])
             return data.get("id")
 
         # No stored ID: search by email
@@ -235,7 +253,8 @@ def sync_contact_task(self, user_id: int = None, queue_item_id: int = None) -> O
                 link.hubspot_id = hubspot_id
                 link.status = "success"
                 link.last_error = ""
-                link.save(update_fields=["hubspot_id", "status", "last_error", "last_synced_at"])
+                link.properties_hash = props_hash
+                link.save(update_fields=["hubspot_id", "status", "last_error", "properties_hash", "last_synced_at"])
             else:
                 # Use get_or_create to prevent duplicate link creation
                 link, created = HubSpotContactLink.objects.get_or_create(
@@ -244,6 +263,7 @@ def sync_contact_task(self, user_id: int = None, queue_item_id: int = None) -> O
                         'hubspot_id': hubspot_id,
                         'status': "success",
                         'last_error': "",
+                        'properties_hash': props_hash,
                     }
                 )
                 if not created:
@@ -251,7 +271,8 @@ def sync_contact_task(self, user_id: int = None, queue_item_id: int = None) -> O
                     link.hubspot_id = hubspot_id
                     link.status = "success"
                     link.last_error = ""
-                    link.save(update_fields=["hubspot_id", "status", "last_error", "last_synced_at"])
+                    link.properties_hash = props_hash
+                    link.save(update_fields=["hubspot_id", "status", "last_error", "properties_hash", "last_synced_at"])
 
         # Update queue item status if in queue mode
         if queue_item_id:
@@ -281,7 +302,7 @@ def sync_contact_task(self, user_id: int = None, queue_item_id: int = None) -> O
             link.save(update_fields=["status", "last_error", "last_synced_at"])
         raise
     finally:
-        _mark_task_finished(task_key)
+        _mark_task_finished(task_key, lock_token)
 
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_jitter=True, max_retries=5, queue='emails')
@@ -303,14 +324,17 @@ def sync_company_task(self, business_detail_id: int = None, queue_item_id: int =
         logger.info("HubSpot: sync_company_task start (direct mode) business_detail_id=%s", business_detail_id)
     
     task_key = f"sync_company_task_{business_detail_id}"
+    # Close the debounce window: this run reads the latest state from the DB
+    sync_key = debounce_key("company", business_detail_id)
+    release_debounce(sync_key)
     
-    # Check if task is already running
-    if _is_task_running(task_key):
-        logger.info("HubSpot: sync_company_task already running for business_detail_id=%s, skipping", business_detail_id)
+    # Check if task is already running in any worker
+    lock_token = _mark_task_running(task_key)
+    if not lock_token:
+        logger.info("HubSpot: sync_company_task already running for business_detail_id=%s, deferring", business_detail_id)
+        _defer_while_running(self, sync_key)
         return None
     
-    _mark_task_running(task_key)
-    
     try:
         bd = BusinessDetail.objects.filter(id=business_detail_id).first()
         if not bd:
@@ -340,13 +364,18 @@ def sync_company_task(self, business_detail_id: int = None, queue_item_id: int =
         link = HubSpotCompanyLink.objects.filter(business_detail=bd).first()
         hubspot_id = link.hubspot_id if link else None
         
+        props_hash = properties_hash(props)
         if hubspot_id:
+            if link.status == "success" and link.properties_hash == props_hash:
+                logger.info("HubSpot: company id=%s unchanged since last push, skipping update", hubspot_id)
+                return hubspot_id
             logger.info("HubSpot: updating existing company id=%s", hubspot_id)
             data = client.update_company(hubspot_id, props)
             if link:
                 link.status = "success"
                 link.last_error = ""
-                link.save(update_fields=["status", "last_error", "last_synced_at"])
+                link.properties_hash = props_hash
+                link.save(update_fields=["status", "last_error", "properties_hash", "last_synced_at"])
             return data.get("id")
 
         # No stored ID: search by SIRET, then by domain, then by name (fallback) to avoid duplicates
@@ -372,7 +401,8 @@ def sync_company_task(self, business_detail_id: int = None, queue_item_id: int =
                 link.hubspot_id = hubspot_id
                 link.status = "success"
                 link.last_error = ""
-                link.save(update_fields=["hubspot_id", "status", "last_error", "last_synced_at"])
+                link.properties_hash = props_hash
+                link.save(update_fields=["hubspot_id", "status", "last_error", "properties_hash", "last_synced_at"])
             else:
                 # Use get_or_create to prevent duplicate link creation
                 link, created = HubSpotCompanyLink.objects.get_or_create(
@@ -381,6 +411,7 @@ def sync_company_task(self, business_detail_id: int = None, queue_item_id: int =
                         'hubspot_id': hubspot_id,
                         'status': "success",
                         'last_error': "",
+                        'properties_hash': props_hash,
                     }
                 )
                 if not created:
@@ -388,7 +419,8 @@ def sync_company_task(self, business_detail_id: int = None, queue_item_id: int =
                     link.hubspot_id = hubspot_id
                     link.status = "success"
                     link.last_error = ""
-                    link.save(update_fields=["hubspot_id", "status", "last_error", "last_synced_at"])
+                    link.properties_hash = props_hash
+                    link.save(update_fields=["hubspot_id", "status", "last_error", "properties_hash", "last_synced_at"])
 
             # Best-effort association between this company and the user's HubSpot contact
             try:
@@ -396,8 +428,12 @@ def sync_company_task(self, business_detail_id: int = None, queue_item_id: int =
                 if user:
                     contact_link = HubSpotContactLink.objects.filter(user=user).first()
                     contact_id = contact_link.hubspot_id if contact_link else None
+                    contact_entry = HubSpotObjectMap.remember("contact", user.id, contact_id) if contact_id else None
 
-                    if contact_id:
+                    if contact_entry and contact_entry.has_association("companies", hubspot_id):
+                        # Association and placeholder cleanup already done for this pair
+                        logger.info("HubSpot: contact %s already associated with company %s", contact_id, hubspot_id)
+                    elif contact_id:
                         logger.info(
                             "HubSpot: associating company id=%s with contact id=%s for user_id=%s",
                             hubspot_id,
@@ -433,6 +469,7 @@ def sync_company_task(self, business_detail_id: int = None, queue_item_id: int =
                                         company_id,
                                     )
                                     client.disassociate_contact_company(contact_id, str(company_id))
+                            contact_entry.add_association("companies", hubspot_id)
                         except Exception as cleanup_exc:
                             logger.exception(
                                 "HubSpot: failed placeholder company cleanup for contact %s: %s",
@@ -476,7 +513,7 @@ def sync_company_task(self, business_detail_id: int = None, queue_item_id: int =
             link.save(update_fields=["status", "last_error", "last_synced_at"])
         raise
     finally:
-        _mark_task_finished(task_key)
+        _mark_task_finished(task_key, lock_token)
 
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_jitter=True, max_retries=5, queue='emails')
@@ -498,14 +535,17 @@ def sync_deal_task(self, project_id: int = None, queue_item_id: int = None) -> O
         logger.info("HubSpot: sync_deal_task start (direct mode) project_id=%s", project_id)
     
     task_key = f"sync_deal_task_{project_id}"
+    # Close the debounce window: this run reads the latest state from the DB
+    sync_key = debounce_key("deal", project_id)
+    release_debounce(sync_key)
     
-    # Check if task is already running
-    if _is_task_running(task_key):
-        logger.info("HubSpot: sync_deal_task already running for project_id=%s, skipping", project_id)
+    # Check if task is already running in any worker
+    lock_token = _mark_task_running(task_key)
+    if not lock_token:
+        logger.info("HubSpot: sync_deal_task already running for project_id=%s, deferring", project_id)
+        _defer_while_running(self, sync_key)
         return None
     
-    _mark_task_running(task_key)
-    
     try:
         project = Project.objects.filter(id=project_id).select_related("user").first()
         if not project:
@@ -529,49 +569,82 @@ def sync_deal_task(self, project_id: int = None, queue_item_id: int = None) -> O
         )
 
         try:
-            # Search for the single deal associated with this project
-            existing = client.search_deal_by_project_id(str(project.id))
-            
-            if existing:
-                deal_id = existing.get("id")
-                logger.info("HubSpot: updating existing deal id=%s for project_id=%s", deal_id, project_id)
-                client.update_deal(deal_id, props)
-            else:
-                created = client.create_deal(props)
-                deal_id = created.get("id")
-                logger.info("HubSpot: created new deal id=%s for project_id=%s", deal_id, project_id)
+            # Resolve the deal from the local id map; search HubSpot only for unmapped projects
+            deal_entry = HubSpotObjectMap.get_entry("deal", project.id)
+            deal_id = deal_entry.hubspot_id if deal_entry else None
+
+            # closedate is re-stamped on every build of a completed deal
+            props_hash = properties_hash(props, exclude=("closedate",))
+            if deal_id and deal_entry.properties_hash == props_hash:
+                logger.info("HubSpot: deal id=%s unchanged since last push, skipping update", deal_id)
+            elif deal_id:
+                try:
+                    logger.info("HubSpot: updating mapped deal id=%s for project_id=%s", deal_id, project_id)
+                    client.update_deal(deal_id, props)
+                except requests.HTTPError as update_exc:
+                    if getattr(update_exc.response, "status_code", None) != 404:
+                        raise
+                    # Deal was deleted in HubSpot: drop the stale mapping and resolve again
+                    logger.warning("HubSpot: mapped deal %s for project_id=%s no longer exists", deal_id, project_id)
+                    HubSpotObjectMap.forget("deal", project.id)
+                    deal_id = None
+
+            if not deal_id:
+                existing = client.search_deal_by_project_id(str(project.id))
+                if existing:
+                    deal_id = existing.get("id")
+                    logger.info("HubSpot: updating existing deal id=%s for project_id=%s", deal_id, project_id)
+                    client.update_deal(deal_id, props)
+                else:
+                    created = client.create_deal(props)
+                    deal_id = created.get("id")
+                    logger.info("HubSpot: created new deal id=%s for project_id=%s", deal_id, project_id)
+                if deal_id:
+                    deal_entry = HubSpotObjectMap.remember(
+                        "deal", project.id, deal_id, source="search" if existing else "sync"
+                    )
+
+            if deal_id and deal_entry.properties_hash != props_hash:
+                deal_entry.properties_hash = props_hash
+                deal_entry.save(update_fields=["properties_hash", "updated_at"])
 
             # Associations (Dual Association: Seller Company AND Buyer Company/Contact)
+            # already-recorded associations are skipped
             if deal_id:
                 # 1. Seller Company Association
                 seller_bd = getattr(project.user, "business_detail", None)
                 seller_hs_company_id = _get_or_sync_hubspot_company_id(seller_bd)
-                if seller_hs_company_id:
+                if seller_hs_company_id and not deal_entry.has_association("companies", seller_hs_company_id):
                     client.associate_deal_company(deal_id, seller_hs_company_id)
+                    deal_entry.add_association("companies", seller_hs_company_id)
                     logger.info("HubSpot: associated deal %s with seller company %s", deal_id, seller_hs_company_id)
 
                 # 2. Buyer Company/Contact Association
                 buyer_bd = getattr(project.client, "business_detail", None) if project.client else None
                 buyer_hs_company_id = _get_or_sync_hubspot_company_id(buyer_bd)
                 if buyer_hs_company_id:
-                    client.associate_deal_company(deal_id, buyer_hs_company_id)
-                    logger.info("HubSpot: associated deal %s with buyer company %s", deal_id, buyer_hs_company_id)
+                    if not deal_entry.has_association("companies", buyer_hs_company_id):
+                        client.associate_deal_company(deal_id, buyer_hs_company_id)
+                        deal_entry.add_association("companies", buyer_hs_company_id)
+                        logger.info("HubSpot: associated deal %s with buyer company %s", deal_id, buyer_hs_company_id)
                 else:
-                    # Fallback to Buyer Contact search by Email
+                    # Fallback to the Buyer Contact; resolved on every sync so a
+                    # reassigned client's contact gets associated too
                     buyer_contact_id = None
                     if project.client:
-                        from .models import HubSpotContactLink
                         buyer_contact_link = HubSpotContactLink.objects.filter(user=project.client).first()
                         if buyer_contact_link:
                             buyer_contact_id = buyer_contact_link.hubspot_id
 
-                    if not buyer_contact_id and project.client_email:
+                    # Search by email (a HubSpot round-trip) only while no contact is associated yet
+                    if not buyer_contact_id and project.client_email and not deal_entry.associations.get("contacts"):
                         existing_contact = client.search_contact_by_email(project.client_email)
                         if existing_contact:
                             buyer_contact_id = existing_contact.get("id")
 
-                    if buyer_contact_id:
+                    if buyer_contact_id and not deal_entry.has_association("contacts", buyer_contact_id):
                         client.associate_deal_contact(deal_id, buyer_contact_id)
+                        deal_entry.add_association("contacts", buyer_contact_id)
                         logger.info("HubSpot: associated deal %s with buyer contact %s", deal_id, buyer_contact_id)
             
             last_deal_id = deal_id
@@ -586,7 +659,7 @@ def sync_deal_task(self, project_id: int = None, queue_item_id: int = None) -> O
         logger.exception("HubSpot: sync_deal_task failed for project_id %s: %s", project_id, exc)
         raise
     finally:
-        _mark_task_finished(task_key)
+        _mark_task_finished(task_key, lock_token)
 
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_jitter=True, max_retries=5, queue='emails')
@@ -630,41 +703,62 @@ def sync_milestone_task(self, milestone_id: int = None, queue_item_id: int = Non
 
     link = HubSpotMilestoneLink.objects.filter(milestone=m).first()
     hubspot_id = link.hubspot_id if link else None
+    props_hash = properties_hash(props)
 
     try:
         # Check if we have a real HubSpot ID (not the temporary 'PROCESSING' marker)
         if hubspot_id and hubspot_id != 'PROCESSING':
+            if link.status == "success" and link.properties_hash == props_hash:
+                logger.info("HubSpot: milestone summary id=%s unchanged since last push, skipping update", hubspot_id)
+                return hubspot_id
             logger.info("HubSpot: updating existing milestone id=%s", hubspot_id)
             data = client.update(hubspot_id, props)
             if link:
                 link.status = "success"
                 link.last_error = ""
-                link.save(update_fields=["status", "last_error", "last_synced_at"])
+                link.properties_hash = props_hash
+                link.save(update_fields=["status", "last_error", "properties_hash", "last_synced_at"])
             return data.get("id")
 
-        # Create-only semantics: if a milestone summary already exists for this project,
-        # do NOT update it; simply return the existing id. This avoids duplicate writes on retries.
         project_id_str = props.get("safebill_project_id", "")
-        existing = client.search_by_project_id(project_id_str)
-        if existing:
-            hubspot_id = existing.get("id")
-            logger.info("HubSpot: milestone summary already exists for project=%s, id=%s — skipping update", props.get("project_name"), hubspot_id)
+        existing = None
+        # Whether HubSpot received these props; only then may the links record their hash
+        pushed = False
+        mapped_id = HubSpotObjectMap.lookup("milestone_summary", project.id)
+        if mapped_id:
+            # Summary known from the local id map (links missing for these milestones)
+            hubspot_id = mapped_id
+            logger.info("HubSpot: updating mapped milestone summary id=%s for project=%s", hubspot_id, props.get("project_name"))
+            client.update(hubspot_id, props)
+            pushed = True
         else:
-            try:
-                created = client.create(props)
-                hubspot_id = created.get("id")
-                logger.info("HubSpot: created milestone summary id=%s for project=%s", hubspot_id, props.get("project_name"))
-            except Exception as create_error:
-                # If another worker created it concurrently, resolve by search and then skip
-                if "409" in str(create_error) or "Conflict" in str(create_error):
-                    existing = client.search_by_project_id(project_id_str)
-                    if existing:
-                        hubspot_id = existing.get("id")
-                        logger.info("HubSpot: found milestone summary after conflict id=%s — skipping update", hubspot_id)
+            # Same as the mapped path: a summary found by search is updated, so the
+            # project syncs identically whichever lookup resolved it
+            existing = client.search_by_project_id(project_id_str)
+            if existing:
+                hubspot_id = existing.get("id")
+                logger.info("HubSpot: updating existing milestone summary id=%s for project=%s", hubspot_id, props.get("project_name"))
+                client.update(hubspot_id, props)
+                pushed = True
+            else:
+                try:
+                    created = client.create(props)
+                    hubspot_id = created.get("id")
+                    pushed = True
+                    logger.info("HubSpot: created milestone summary id=%s for project=%s", hubspot_id, props.get("project_name"))
+                except Exception as create_error:
+                    # If another worker created it concurrently, resolve by search and update it
+                    if "409" in str(create_error) or "Conflict" in str(create_error):
+                        existing = client.search_by_project_id(project_id_str)
+                        if existing:
+                            hubspot_id = existing.get("id")
+                            logger.info("HubSpot: found milestone summary after conflict id=%s, updating", hubspot_id)
+                            client.update(hubspot_id, props)
+                            pushed = True
+                        else:
+                            raise create_error
                     else:
                         raise create_error
-                else:
-                    raise create_error
 
         # If neither branch produced an id (extremely defensive), try a final search/update
         if not hubspot_id:
@@ -675,10 +769,14 @@ def sync_milestone_task(self, milestone_id: int = None, queue_item_id: int = Non
             else:
                 created = client.create(props)
                 hubspot_id = created.get("id")
+            pushed = True
 
         if hubspot_id:
             # Update ALL milestone links for this project with the same HubSpot ID
-            # This ensures all milestones point to the same summary record
+            # This ensures all milestones point to the same summary record.
+            # A summary found but not written keeps an empty hash, so the next
+            # sync pushes instead of comparing against props HubSpot never got
+            link_hash = props_hash if pushed else ""
             for milestone in milestones:
                 link, created = HubSpotMilestoneLink.objects.get_or_create(
                     milestone=milestone,
@@ -686,6 +784,7 @@ def sync_milestone_task(self, milestone_id: int = None, queue_item_id: int = Non
                         "hubspot_id": hubspot_id,
                         "status": "success",
                         "last_error": "",
+                        "properties_hash": link_hash,
                     }
                 )
                 if not created:
@@ -693,7 +792,9 @@ def sync_milestone_task(self, milestone_id: int = None, queue_item_id: int = Non
                     link.hubspot_id = hubspot_id
                     link.status = "success"
                     link.last_error = ""
-                    link.save(update_fields=["hubspot_id", "status", "last_error", "last_synced_at"])
+                    link.properties_hash = link_hash
+                    link.save(update_fields=["hubspot_id", "status", "last_error", "properties_hash", "last_synced_at"])
+            HubSpotObjectMap.remember("milestone_summary", project.id, hubspot_id)
 
         # Update queue item status if in queue mode
         if queue_item_id:
@@ -754,77 +855,17 @@ def sync_revenue_task(self, year: int = None, month: int = None, queue_item_id:
         logger.info("HubSpot: sync_revenue_task start (direct mode) year=%s month=%s", year, month)
     
     try:
-        # Initialize all revenue values
-        total_payments_amount = 0
-        vat_collected = 0
-        seller_revenue = 0
-        total_revenue = 0
-        total_gmv = 0
-        total_milestones_approved = 0
+        # Refresh this month's materialized figures with grouped aggregate queries
+        # (fees computed in SQL) instead of iterating payments and milestones in Python
+        rollup = MonthlyRevenueRollup.refresh(year, month, sync_type)
         
-        # Calculate revenue values based on sync type
-        if sync_type in ["payment", "all"]:
-            # 1. Total payments amount (what buyers paid)
-            total_payments_amount = (
-                Payment.objects.filter(status="paid", created_at__year=year, created_at__month=month)
-                .aggregate(total=Sum("amount"))
-                .get("total")
-                or 0
-            )
-            
-            # 1.1 Total GMV (Total spent by buyers including VAT/Fees)
-            total_gmv = (
-                Payment.objects.filter(status="paid", created_at__year=year, created_at__month=month)
-                .aggregate(total=Sum("buyer_total_amount"))
-                .get("total")
-                or 0
-            )
-            
-            # 2. VAT collected (difference between buyer_total and amount)
-            payments_with_vat = Payment.objects.filter(
-                status="paid", created_at__year=year, created_at__month=month
-            )
-            vat_collected = sum(
-                (p.buyer_total_amount or 0) - (p.amount or 0) for p in payments_with_vat
-            )
-        
-        if sync_type in ["milestone", "all"]:
-            # 3. Seller revenue (platform fees from approved milestones)
-            from projects.models import Milestone
-            from payments.services import FeeCalculationService
-            
-            # FIXED: Only count milestones from projects that received payments in this month
-            # This prevents counting milestones from projects without payments
-            paid_projects_in_month = Payment.objects.filter(
-                status="paid",
-                created_at__year=year,
-                created_at__month=month
-            ).values_list('project_id', flat=True).distinct()
-            
-            # Get approved milestones for this month but ONLY from projects with payments
-            milestones = Milestone.objects.filter(
-                status="approved",
-                completion_date__year=year,
-                completion_date__month=month,
-                project_id__in=paid_projects_in_month  # Only count milestones from paid projects
-            ).select_related('project')
-            
-            total_milestones_approved = milestones.count()
-            
-            for milestone in milestones:
-                try:
-                    # Calculate platform fee for this milestone
-                    fees = FeeCalculationService.calculate_fees(
-                        milestone.relative_payment,
-                        milestone.project.platform_fee_percentage,
-                        milestone.project.vat_rate
-                    )
-                    seller_revenue += float(fees["platform_fee"])
-                except Exception as e:
-                    logger.warning(f"Error calculating fees for milestone {milestone.id}: {e}")
-            
-            # 4. Total revenue (same as seller revenue for now)
-            total_revenue = seller_revenue
+        total_payments_amount = rollup.total_payments_amount
+        vat_collected = rollup.vat_collected
+        total_gmv = rollup.gmv
+        seller_revenue = rollup.platform_fee_total
+        # Total revenue (same as seller revenue for now)
+        total_revenue = seller_revenue
+        total_milestones_approved = rollup.total_milestones_approved
         
         # Debug logging and console output for GMV tracking
         gmv_log_msg = (
@@ -841,7 +882,8 @@ def sync_revenue_task(self, year: int = None, month: int = None, queue_item_id:
         period_key = f"{year}-{month:02d}"
 
         client = HubSpotRevenueClient()
-        existing = client.search_by_period(period_key)
+        # Reuse the HubSpot record id stored on the rollup; search only the first time
+        existing = {"id": rollup.hubspot_id} if rollup.hubspot_id else client.search_by_period(period_key)
         # Create period start date (first day of month at midnight UTC)
         period_start_date = f"{year}-{month:02d}-01T00:00:00Z"
         
@@ -875,10 +917,16 @@ def sync_revenue_task(self, year: int = None, month: int = None, queue_item_id:
             hs_id = existing.get("id")
             logger.info("HubSpot: updating Revenue %s", period_key)
             client.update(hs_id, props)
+            if rollup.hubspot_id != hs_id:
+                rollup.hubspot_id = hs_id
+                rollup.save(update_fields=["hubspot_id", "updated_at"])
             return hs_id
         created = client.create(props)
         hs_id = created.get("id")
         logger.info("HubSpot: created Revenue %s id=%s", period_key, hs_id)
+        if hs_id:
+            rollup.hubspot_id = hs_id
+            rollup.save(update_fields=["hubspot_id", "updated_at"])
         
         # Update queue item status if in queue mode
         if queue_item_id:
@@ -57,6 +57,38 @@ class NotificationService:
 
         return notification
 
+    @staticmethod
+    def create_notifications_bulk(user_ids, message, variables_by_user=None):
+        """
+        Create the same notification for many users with a single INSERT
+        and push each one via WebSocket
+
+        Args:
+            user_ids: Iterable of user IDs
+            message: Translation key shared by all notifications
+            variables_by_user: Optional dict of user ID -> translation variables
+
+        Returns:
+            List of created Notification instances
+        """
+        variables_by_user = variables_by_user or {}
+        notifications = Notification.objects.bulk_create(
+            [
+                Notification(
+                    user_id=user_id,
+                    message=message,
+                    translation_key=message,
+                    translation_variables=variables_by_user.get(user_id, {}),
+                )
+                for user_id in user_ids
+            ]
+        )
+
+        for notification in notifications:
+            NotificationService.send_notification_websocket(notification)
+
+        return notifications
+
     @staticmethod
     def send_notification_websocket(notification):
         """
@@ -67,7 +99,7 @@ class NotificationService:
         """
         channel_layer = get_channel_layer()
         if channel_layer:
-            group_name = f"notifications_{notification.user.id}"
+            group_name = f"notifications_{notification.user_id}"
 
             # Send the notification data
             async_to_sync(channel_layer.group_send)(
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Payment, Balance, Payout, PayoutHold, Refund
+from .models import (
+    Payment, Balance, Payout, PayoutHold, Refund, SellerMonthlyRevenue, PayoutRun, PayoutRunItem,
+)
 
 # Register your models here.
 admin.site.register(Payment)
@@ -7,3 +9,6 @@ admin.site.register(Balance)
 admin.site.register(Payout)
 admin.site.register(PayoutHold)
 admin.site.register(Refund)
+admin.site.register(SellerMonthlyRevenue)
+admin.site.register(PayoutRun)
+admin.site.register(PayoutRunItem)
@@ -0,0 +1,73 @@
+import stripe
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from subscription.models import Subscription
+
+
+class Command(BaseCommand):
+    help = (
+        "Store the Stripe Customer ID on users that already have a customer in Stripe, "
+        "so their next checkout skips the customer lookup. Customers are never created here."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report matches without saving them",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of users updated per query (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        dry_run = options["dry_run"]
+        batch_size = options["batch_size"]
+
+        missing = {
+            email.lower(): user_id
+            for user_id, email in User.objects.filter(stripe_customer_id="")
+            .exclude(email="")
+            .values_list("id", "email")
+        }
+        if not missing:
+            self.stdout.write(self.style.SUCCESS("All users already have a Stripe customer ID"))
+            return
+        self.stdout.write(f"{len(missing)} users without a stored Stripe customer ID")
+
+        # 1. Customers already known from seller subscriptions (no Stripe call needed)
+        matches = dict(
+            Subscription.objects.filter(user_id__in=missing.values())
+            .exclude(stripe_customer_id="")
+            .values_list("user_id", "stripe_customer_id")
+        )
+        self.stdout.write(f"{len(matches)} found in subscription records")
+
+        # 2. Page through Stripe customers once (100 per call) instead of one search per user
+        stripe.api_key = settings.STRIPE_API_KEY
+        scanned = 0
+        try:
+            for customer in stripe.Customer.list(limit=100).auto_paging_iter():
+                scanned += 1
+                email = (customer.get("email") or "").lower()
+                user_id = missing.get(email)
+                # Newest first, like the per-email lookup at checkout; subscription matches win
+                if user_id and user_id not in matches:
+                    matches[user_id] = customer["id"]
+        except stripe.error.StripeError as e:
+            self.stdout.write(self.style.ERROR(f"Stopped listing Stripe customers after {scanned}: {e}"))
+        self.stdout.write(f"Scanned {scanned} Stripe customers, {len(matches)} users matched")
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f"Dry run: {len(matches)} users would be updated"))
+            return
+
+        users = [User(id=user_id, stripe_customer_id=customer_id) for user_id, customer_id in matches.items()]
+        User.objects.bulk_update(users, ["stripe_customer_id"], batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Stored Stripe customer IDs for {len(users)} users"))
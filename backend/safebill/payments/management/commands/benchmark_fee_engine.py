@@ -0,0 +1,125 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from payments.services import FeeCalculationService
+from projects.models import Milestone
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark calculate_fees_batch against per-item calculate_fees and check "
+        "that both (and optionally the SQL annotations) give exactly the same amounts"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--items",
+            type=int,
+            default=20000,
+            help="Number of (amount, fee %%, VAT) tuples to generate (default: 20000)",
+        )
+        parser.add_argument(
+            "--distinct",
+            type=int,
+            default=500,
+            help="Number of distinct amounts to draw from (default: 500)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=42,
+            help="Random seed so runs are comparable (default: 42)",
+        )
+        parser.add_argument(
+            "--check-db",
+            action="store_true",
+            help="Also compare fee_annotations() with calculate_fees() on existing milestones",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        amounts = [
+            Decimal(rng.randint(100, 80_000_000)) / Decimal("100")
+            for _ in range(options["distinct"])
+        ]
+        fee_percentages = [None, Decimal("7.00"), Decimal("5.50"), Decimal("10")]
+        vat_rates = [Decimal("20"), Decimal("10"), Decimal("5.5"), Decimal("0")]
+        items = [
+            (rng.choice(amounts), rng.choice(fee_percentages), rng.choice(vat_rates))
+            for _ in range(options["items"])
+        ]
+
+        started = time.perf_counter()
+        scalar = [FeeCalculationService.calculate_fees(*item) for item in items]
+        scalar_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        batch = FeeCalculationService.calculate_fees_batch(items)
+        batch_seconds = time.perf_counter() - started
+
+        mismatches = self._mismatches(items, scalar, batch)
+        self.stdout.write(
+            f"{len(items)} items: scalar {scalar_seconds * 1000:.1f} ms, "
+            f"batch {batch_seconds * 1000:.1f} ms "
+            f"({scalar_seconds / batch_seconds if batch_seconds else 0:.1f}x)"
+        )
+
+        if options["check_db"]:
+            mismatches += self._check_db()
+
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"{mismatches} results differ from calculate_fees()"))
+        else:
+            self.stdout.write(self.style.SUCCESS("All results match calculate_fees() exactly"))
+
+    def _mismatches(self, items, expected, actual):
+        mismatches = 0
+        for item, expected_fees, actual_fees in zip(items, expected, actual):
+            # Compare string forms too, so a different Decimal exponent counts as a mismatch
+            if {k: str(v) for k, v in expected_fees.items()} != {
+                k: str(v) for k, v in actual_fees.items()
+            }:
+                mismatches += 1
+                if mismatches <= 5:
+                    self.stdout.write(f"Mismatch for {item}: {expected_fees} != {actual_fees}")
+        return mismatches
+
+    def _check_db(self):
+        fields = [
+            "vat_amount",
+            "gross_amount",
+            "commission_rate",
+            "platform_fee",
+            "stripe_fees",
+            "platform_net_commission",
+            "seller_net",
+        ]
+        rows = Milestone.objects.select_related("project").annotate(
+            **FeeCalculationService.fee_annotations()
+        )
+
+        started = time.perf_counter()
+        rows = list(rows)
+        db_seconds = time.perf_counter() - started
+
+        mismatches = 0
+        for milestone in rows:
+            expected = FeeCalculationService.calculate_fees(
+                milestone.relative_payment,
+                milestone.project.platform_fee_percentage,
+                milestone.project.vat_rate,
+            )
+            for field in fields:
+                # SQL numerics carry a different scale, so compare values here
+                if getattr(milestone, f"fee_{field}") != expected[field]:
+                    mismatches += 1
+                    if mismatches <= 5:
+                        self.stdout.write(
+                            f"Milestone {milestone.id} {field}: "
+                            f"{getattr(milestone, f'fee_{field}')} != {expected[field]}"
+                        )
+        self.stdout.write(f"SQL annotations: {len(rows)} milestones in {db_seconds * 1000:.1f} ms")
+        return mismatches
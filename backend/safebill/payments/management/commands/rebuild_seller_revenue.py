@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from payments.models import SellerMonthlyRevenue
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-seller monthly revenue rollup from approved milestones"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seller",
+            type=int,
+            help="Only rebuild the rows of this seller (user ID)",
+        )
+
+    def handle(self, *args, **options):
+        seller = None
+        if options["seller"]:
+            User = get_user_model()
+            try:
+                seller = User.objects.get(id=options["seller"])
+            except User.DoesNotExist:
+                self.stdout.write(self.style.ERROR(f"User {options['seller']} not found"))
+                return
+
+        count = SellerMonthlyRevenue.rebuild(seller=seller)
+        scope = f"seller {seller.id}" if seller else "all sellers"
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {count} monthly revenue rows for {scope}")
+        )
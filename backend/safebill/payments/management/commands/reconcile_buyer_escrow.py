@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from payments.services import BalanceService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute total_spent and held_in_escrow for every buyer from paid payments "
+        "and approved milestones, fix the balances that drifted and report them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drift without updating balances",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of balances written per query (default: 1000)",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=50,
+            help="Maximum number of drifted balances listed in the report (default: 50)",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        result = BalanceService.reconcile_all_buyer_escrow(
+            dry_run=dry_run, batch_size=options["batch_size"]
+        )
+        drift = result["drift"]
+
+        for entry in drift[: options["limit"]]:
+            spent_before, spent_after = entry["total_spent"]
+            escrow_before, escrow_after = entry["held_in_escrow"]
+            self.stdout.write(
+                f"user {entry['user_id']}: total_spent {spent_before} -> {spent_after}, "
+                f"held_in_escrow {escrow_before} -> {escrow_after}"
+            )
+        if len(drift) > options["limit"]:
+            self.stdout.write(f"... and {len(drift) - options['limit']} more")
+
+        summary = f"Checked {result['buyers']} buyers, {len(drift)} balances drifted"
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f"{summary} (dry run, nothing saved)"))
+        elif drift:
+            self.stdout.write(self.style.SUCCESS(f"{summary}, {result['updated']} balances updated"))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.models import Balance, PayoutRun
+from payments.payout_runs import PayoutRunService
+
+
+class Command(BaseCommand):
+    help = (
+        "Transfer available funds to every seller above the threshold in one payout run, "
+        "or resume an interrupted run"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threshold",
+            type=Decimal,
+            help="Minimum available_for_payout to include a seller (default: PAYOUT_RUN_THRESHOLD)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Concurrent Stripe transfers (default: PAYOUT_RUN_MAX_WORKERS)",
+        )
+        parser.add_argument(
+            "--resume",
+            type=int,
+            metavar="RUN_ID",
+            help="Resume this run instead of starting a new one",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many sellers and how much would be paid out",
+        )
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            from django.conf import settings
+            from django.db.models import Count, Sum
+
+            threshold = options["threshold"] or Decimal(str(getattr(settings, "PAYOUT_RUN_THRESHOLD", 10)))
+            totals = (
+                Balance.objects.filter(
+                    available_for_payout__gte=threshold,
+                    available_for_payout__gt=0,
+                    user__stripe_account__account_id__isnull=False,
+                )
+                .exclude(user__stripe_account__account_id="")
+                .aggregate(sellers=Count("id"), amount=Sum("available_for_payout"))
+            )
+            self.stdout.write(
+                f"{totals['sellers']} sellers eligible, {totals['amount'] or 0} to transfer "
+                f"(threshold {threshold}, matured holds not yet released)"
+            )
+            return
+
+        # Same lock as run_seller_payouts_task, so a resume never runs alongside it
+        lock_token = PayoutRunService.acquire_run_lock()
+        if not lock_token:
+            raise CommandError("A payout run is already in progress")
+        try:
+            if options["resume"]:
+                try:
+                    run = PayoutRun.objects.get(id=options["resume"])
+                except PayoutRun.DoesNotExist:
+                    self.stdout.write(self.style.ERROR(f"Payout run {options['resume']} not found"))
+                    return
+            else:
+                run = PayoutRunService.start_run(threshold=options["threshold"])
+                self.stdout.write(f"Started payout run {run.id} for {run.sellers_total} sellers")
+
+            run = PayoutRunService.execute_run(run, max_workers=options["workers"])
+        finally:
+            PayoutRunService.release_run_lock(lock_token)
+        summary = (
+            f"Payout run {run.id} {run.status}: {run.succeeded} succeeded, {run.failed} failed, "
+            f"{run.skipped} skipped, {run.amount_transferred} {run.currency} transferred"
+        )
+        if run.failed or run.status != "completed":
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:21
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Round, TruncMonth
+
+
+def build_seller_revenue(apps, schema_editor):
+    # Same grouped query as SellerMonthlyRevenue.rebuild(), so existing sellers'
+    # dashboards have their history right after deploy
+    Milestone = apps.get_model('projects', 'Milestone')
+    SellerMonthlyRevenue = apps.get_model('payments', 'SellerMonthlyRevenue')
+
+    net_amount = Round(
+        ExpressionWrapper(
+            F('relative_payment')
+            - F('relative_payment') * F('project__platform_fee_percentage') / Value(Decimal('100')),
+            output_field=DecimalField(max_digits=18, decimal_places=6),
+        ),
+        2,
+    )
+    rows = (
+        Milestone.objects.filter(
+            status='approved',
+            completion_date__isnull=False,
+            project__user__isnull=False,
+        )
+        .annotate(period=TruncMonth('completion_date'))
+        .order_by()
+        .values('project__user', 'period')
+        .annotate(net_revenue=Sum(net_amount), milestone_count=Count('id'))
+    )
+    SellerMonthlyRevenue.objects.bulk_create(
+        [
+            SellerMonthlyRevenue(
+                seller_id=row['project__user'],
+                year=row['period'].year,
+                month=row['period'].month,
+                net_revenue=row['net_revenue'],
+                milestone_count=row['milestone_count'],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0009_payment_payments_pa_status_343680_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerMonthlyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('net_revenue', models.DecimalField(decimal_places=2, default=0, help_text='Approved milestone amounts minus the platform fee', max_digits=14)),
+                ('milestone_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_revenue', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Seller Monthly Revenue',
+                'verbose_name_plural': 'Seller Monthly Revenue',
+                'ordering': ['-year', '-month'],
+                'constraints': [models.UniqueConstraint(fields=('seller', 'year', 'month'), name='unique_seller_monthly_revenue')],
+            },
+        ),
+        migrations.RunPython(build_seller_revenue, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0011_payoutrun'),
+        ('projects', '0025_milestone_projects_mi_status_745a58_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['project', '-created_at'], name='payments_pa_project_a6397a_idx'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from django.core.validators import MinValueValidator
 from django.contrib.auth import get_user_model
-from projects.models import Project
+from projects.models import Milestone, Project
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 import logging
@@ -40,6 +42,14 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Monthly revenue aggregates filter paid payments by created_at range
+            models.Index(fields=["status", "created_at"]),
+            # Latest payment per project (receipts, project completion)
+            models.Index(fields=["project", "-created_at"]),
+        ]
+
     def __str__(self):
         return f"{self.user.email} - {self.amount} - {self.status}"
 
@@ -177,6 +187,87 @@ class PayoutHold(models.Model):
         return f"PayoutHold({self.user.email}) {self.amount} {self.currency} - {status} until {self.hold_until}"
 
 
+class PayoutRun(models.Model):
+    """
+    A batch payout of available funds to all eligible sellers.
+
+    Sellers are snapshotted into PayoutRunItem rows when the run starts; the
+    run is then worked through item by item and can be resumed after a crash
+    (see payments.payout_runs.PayoutRunService).
+    """
+
+    STATUS_CHOICES = [
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="running")
+    threshold = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        help_text="Minimum available_for_payout for a seller to be included",
+    )
+    currency = models.CharField(max_length=10, default="EUR")
+    sellers_total = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    amount_transferred = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-started_at"]
+
+    def __str__(self):
+        return f"PayoutRun({self.id}) {self.status} - {self.succeeded}/{self.sellers_total}"
+
+
+class PayoutRunItem(models.Model):
+    """
+    One seller's transfer within a PayoutRun.
+
+    pending -> processing (balance deducted, Stripe transfer requested) ->
+    succeeded | failed (balance restored). skipped if the balance no longer
+    covers the snapshotted amount when the item is claimed.
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+        ("skipped", "Skipped"),
+    ]
+
+    run = models.ForeignKey(PayoutRun, on_delete=models.CASCADE, related_name="items")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="payout_run_items")
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    stripe_account_id = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    stripe_transfer_id = models.CharField(max_length=255, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["run", "user"], name="unique_payout_run_item"),
+        ]
+        indexes = [
+            models.Index(fields=["run", "status"]),
+        ]
+
+    def __str__(self):
+        return f"PayoutRunItem({self.run_id}, {self.user_id}) {self.amount} - {self.status}"
+
+    @property
+    def transfer_group(self):
+        """Stripe transfer_group used to find this item's transfer when resuming."""
+        return f"payout-run-{self.run_id}-{self.user_id}"
+
+
 class Refund(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -190,6 +281,247 @@ class Refund(models.Model):
         return f"Refund({self.user.email}) {self.amount} - {self.status}"
 
 
+class SellerMonthlyRevenue(models.Model):
+    """
+    Net revenue from approved milestones per seller and completion month.
+
+    Kept up to date incrementally by the Milestone signals below whenever an
+    approved milestone is saved, edited or deleted (see record_milestone_change),
+    so the seller revenue widgets read a couple of indexed rows instead of
+    aggregating the seller's whole history.
+    Can be recomputed from the milestones with the rebuild_seller_revenue command.
+    """
+
+    seller = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="monthly_revenue"
+    )
+    year = models.IntegerField()
+    month = models.IntegerField()  # 1-12
+    net_revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Approved milestone amounts minus the platform fee",
+    )
+    milestone_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["seller", "year", "month"],
+                name="unique_seller_monthly_revenue",
+            ),
+        ]
+        ordering = ["-year", "-month"]
+        verbose_name = "Seller Monthly Revenue"
+        verbose_name_plural = "Seller Monthly Revenue"
+
+    def __str__(self):
+        return f"SellerMonthlyRevenue({self.seller_id}) {self.year}-{self.month:02d} {self.net_revenue}"
+
+    @staticmethod
+    def milestone_net_amount(milestone, amount=None):
+        """
+        Net amount a milestone contributes: relative_payment (or ``amount``)
+        minus the platform fee percentage of the project, rounded to cents.
+        """
+        from decimal import Decimal, ROUND_HALF_UP
+
+        if amount is None:
+            amount = milestone.relative_payment
+        fee = amount * milestone.project.platform_fee_percentage / Decimal("100")
+        return (amount - fee).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+    @staticmethod
+    def milestone_net_expression():
+        """Database expression matching milestone_net_amount(), for grouped rebuilds."""
+        from decimal import Decimal
+        from django.db.models import DecimalField, ExpressionWrapper, F, Value
+        from django.db.models.functions import Round
+
+        return Round(
+            ExpressionWrapper(
+                F("relative_payment")
+                - F("relative_payment") * F("project__platform_fee_percentage") / Value(Decimal("100")),
+                output_field=DecimalField(max_digits=18, decimal_places=6),
+            ),
+            2,
+        )
+
+    @classmethod
+    def _apply(cls, seller_id, completion_date, amount, count):
+        from django.db.models import F
+
+        local = timezone.localtime(completion_date)
+        if count > 0:
+            # Removals never create rows: the seller may be being deleted
+            cls.objects.bulk_create(
+                [cls(seller_id=seller_id, year=local.year, month=local.month)],
+                ignore_conflicts=True,
+            )
+        cls.objects.filter(seller_id=seller_id, year=local.year, month=local.month).update(
+            net_revenue=F("net_revenue") + amount,
+            milestone_count=F("milestone_count") + count,
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def record_milestone_change(cls, milestone, old_status, old_completion_date, old_amount=None):
+        """
+        Apply a milestone change to the rollup.
+
+        Removes the milestone from its previous month if it was approved and adds
+        it to its current month if it is approved now (re-approval moves it, an
+        edited amount replaces the old one).
+
+        Args:
+            milestone: Milestone after the change was saved
+            old_status: Status before the change
+            old_completion_date: completion_date before the change
+            old_amount: relative_payment before the change (default: unchanged)
+        """
+        if old_amount is None:
+            old_amount = milestone.relative_payment
+        was_counted = old_status == "approved" and old_completion_date
+        is_counted = milestone.status == "approved" and milestone.completion_date
+        if not (was_counted or is_counted) or (
+            was_counted
+            and is_counted
+            and old_completion_date == milestone.completion_date
+            and old_amount == milestone.relative_payment
+        ):
+            return
+
+        seller_id = milestone.project.user_id
+        if not seller_id:
+            return
+
+        with transaction.atomic():
+            if was_counted:
+                cls._apply(
+                    seller_id, old_completion_date, -cls.milestone_net_amount(milestone, old_amount), -1
+                )
+            if is_counted:
+                cls._apply(seller_id, milestone.completion_date, cls.milestone_net_amount(milestone), 1)
+
+    @classmethod
+    def record_milestone_removal(cls, milestone):
+        """Take a deleted milestone out of the rollup if it was counted."""
+        if milestone.status != "approved" or not milestone.completion_date:
+            return
+        try:
+            seller_id = milestone.project.user_id
+        except Project.DoesNotExist:
+            # Deleted together with its project
+            return
+        if seller_id:
+            cls._apply(seller_id, milestone.completion_date, -cls.milestone_net_amount(milestone), -1)
+
+    @classmethod
+    def rebuild(cls, seller=None):
+        """
+        Recompute the rollup from approved milestones with one grouped query.
+
+        Args:
+            seller: Only rebuild this seller's rows (all sellers if None)
+
+        Returns:
+            int: Number of rows written
+        """
+        from django.db.models import Count, Sum
+        from django.db.models.functions import TruncMonth
+        from projects.models import Milestone
+
+        milestones = Milestone.objects.filter(
+            status="approved",
+            completion_date__isnull=False,
+            project__user__isnull=False,
+        )
+        if seller is not None:
+            milestones = milestones.filter(project__user=seller)
+
+        rows = [
+            cls(
+                seller_id=row["project__user"],
+                year=row["period"].year,
+                month=row["period"].month,
+                net_revenue=row["net_revenue"],
+                milestone_count=row["milestone_count"],
+            )
+            for row in milestones.annotate(period=TruncMonth("completion_date"))
+            .order_by()
+            .values("project__user", "period")
+            .annotate(
+                net_revenue=Sum(cls.milestone_net_expression()),
+                milestone_count=Count("id"),
+            )
+        ]
+
+        with transaction.atomic():
+            existing = cls.objects.all() if seller is None else cls.objects.filter(seller=seller)
+            existing.delete()
+            cls.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    @classmethod
+    def totals_for_months(cls, seller, periods):
+        """
+        Read the rollup rows of a seller for the given months.
+
+        Args:
+            seller: Seller user
+            periods: Iterable of (year, month) tuples
+
+        Returns:
+            dict: (year, month) -> {"net_revenue": Decimal, "milestone_count": int}
+        """
+        from decimal import Decimal
+        from django.db.models import Q
+
+        periods = list(periods)
+        totals = {
+            period: {"net_revenue": Decimal("0"), "milestone_count": 0}
+            for period in periods
+        }
+        query = Q()
+        for year, month in periods:
+            query |= Q(year=year, month=month)
+        for row in cls.objects.filter(query, seller=seller).values(
+            "year", "month", "net_revenue", "milestone_count"
+        ):
+            totals[(row["year"], row["month"])] = {
+                "net_revenue": row["net_revenue"],
+                "milestone_count": row["milestone_count"],
+            }
+        return totals
+
+
+@receiver(pre_save, sender=Milestone)
+def remember_milestone_revenue_state(sender, instance, **kwargs):
+    """Keep the stored state of an edited milestone so the rollup can move it"""
+    instance._previous_revenue_state = None
+    if instance.pk:
+        instance._previous_revenue_state = (
+            Milestone.objects.filter(pk=instance.pk)
+            .values_list("status", "completion_date", "relative_payment")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Milestone)
+def update_seller_revenue_on_milestone_save(sender, instance, created, **kwargs):
+    """Apply an approval, un-approval or amount change to the seller's monthly revenue"""
+    previous = getattr(instance, "_previous_revenue_state", None) or (None, None, None)
+    SellerMonthlyRevenue.record_milestone_change(instance, *previous)
+
+
+@receiver(post_delete, sender=Milestone)
+def remove_milestone_from_seller_revenue(sender, instance, **kwargs):
+    """Take a deleted approved milestone out of the seller's monthly revenue"""
+    SellerMonthlyRevenue.record_milestone_removal(instance)
+
+
 # 1000 = payment amount (from buyer)
 # 2 miletonses : 1st = 600 , 2nd = 400, total ammount = 1st + 2nd
 
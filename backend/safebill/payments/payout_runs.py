@@ -0,0 +1,404 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import logging
+import uuid
+
+import stripe
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import Balance, Payout, PayoutRun, PayoutRunItem
+from .services import BalanceService
+from notifications.services import NotificationService
+from utils import stripe_gateway
+from utils.redis_client import get_redis_client, release_lock
+from .tasks import send_transfer_initiated_email_task
+
+logger = logging.getLogger(__name__)
+
+# Held while a run executes, so the scheduled task and run_payouts never overlap
+RUN_LOCK_KEY = "payments:payout_run:lock"
+RUN_LOCK_TIMEOUT = 6 * 3600
+
+
+class PayoutRunService:
+    """
+    Pay out available funds to every eligible seller in one run.
+
+    A run snapshots eligible sellers into PayoutRunItem rows, then works through
+    them in batches:
+
+    1. Claim: the batch's items still pending and their balances are locked,
+       those still covering the item amount are debited with one UPDATE and
+       their items marked processing.
+    2. Transfer: Stripe transfers are created concurrently on a bounded thread
+       pool (only Stripe calls run in the pool, never the ORM). Each item has a
+       deterministic idempotency key and its own transfer_group.
+    3. Record: Payout rows are bulk-created, items bulk-updated, and balances
+       of failed transfers restored with one UPDATE.
+
+    If the process dies mid-run, resuming re-sends processing items: Stripe
+    answers a repeated idempotency key with the original transfer, and items
+    attempted before are first looked up by transfer_group, so no seller is
+    paid twice and no balance is debited twice. Only one process executes
+    runs at a time (acquire_run_lock).
+    """
+
+    @staticmethod
+    def acquire_run_lock():
+        """
+        Take the lock that keeps payout runs from executing concurrently.
+
+        Returns:
+            str: Token to pass to release_run_lock(), or None if another
+            process holds the lock. Without Redis no lock is taken.
+        """
+        token = uuid.uuid4().hex
+        client = get_redis_client()
+        if client is None:
+            return token
+        return token if client.set(RUN_LOCK_KEY, token, nx=True, ex=RUN_LOCK_TIMEOUT) else None
+
+    @staticmethod
+    def release_run_lock(token):
+        """Release the run lock, unless it expired and another process took it."""
+        client = get_redis_client()
+        if client is None:
+            return
+        try:
+            if not release_lock(client, RUN_LOCK_KEY, token):
+                logger.warning("Payout run lock expired before the run finished; left the current holder's lock in place")
+        except Exception as e:
+            logger.warning(f"Payout run lock release failed: {e}")
+
+    @staticmethod
+    def start_run(threshold=None, currency="EUR"):
+        """
+        Create a run and snapshot every seller eligible for a payout.
+
+        Args:
+            threshold: Minimum available_for_payout (defaults to PAYOUT_RUN_THRESHOLD)
+            currency: Transfer currency
+
+        Returns:
+            PayoutRun: The new run, with its items created
+        """
+        if threshold is None:
+            threshold = getattr(settings, "PAYOUT_RUN_THRESHOLD", 10)
+        threshold = Decimal(str(threshold))
+
+        # Matured holds first, so funds that just cleared are included
+        BalanceService.release_all_matured_holds(
+            batch_size=getattr(settings, "PAYOUT_HOLD_RELEASE_BATCH_SIZE", 500)
+        )
+
+        with transaction.atomic():
+            run = PayoutRun.objects.create(threshold=threshold, currency=currency)
+            eligible = (
+                Balance.objects.filter(
+                    available_for_payout__gte=threshold,
+                    available_for_payout__gt=0,
+                    user__stripe_account__account_id__isnull=False,
+                )
+                .exclude(user__stripe_account__account_id="")
+                .values_list("user_id", "available_for_payout", "user__stripe_account__account_id")
+            )
+            items = PayoutRunItem.objects.bulk_create(
+                [
+                    PayoutRunItem(
+                        run=run,
+                        user_id=user_id,
+                        amount=amount,
+                        stripe_account_id=account_id,
+                    )
+                    for user_id, amount, account_id in eligible
+                ],
+                batch_size=1000,
+            )
+            run.sellers_total = len(items)
+            run.save(update_fields=["sellers_total"])
+
+        logger.info(f"Payout run {run.id} started for {run.sellers_total} sellers (threshold {threshold})")
+        return run
+
+    @staticmethod
+    def execute_run(run, max_workers=None, batch_size=None):
+        """
+        Process the pending and unfinished items of a run until none are left.
+
+        Safe to call again on a run that was interrupted.
+
+        Returns:
+            PayoutRun: The run with its totals refreshed
+        """
+        max_workers = max_workers or getattr(settings, "PAYOUT_RUN_MAX_WORKERS", 8)
+        batch_size = batch_size or getattr(settings, "PAYOUT_RUN_BATCH_SIZE", 200)
+
+        # Items left in processing by a crashed run are resent first;
+        # their balances were already debited when they were claimed
+        stuck_ids = list(
+            PayoutRunItem.objects.filter(run=run, status="processing")
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        for start in range(0, len(stuck_ids), batch_size):
+            stuck = list(PayoutRunItem.objects.filter(id__in=stuck_ids[start:start + batch_size]))
+            PayoutRunService._transfer_and_record(run, stuck, max_workers)
+
+        while True:
+            pending = list(
+                PayoutRunItem.objects.filter(run=run, status="pending").order_by("id")[:batch_size]
+            )
+            if not pending:
+                break
+            claimed = PayoutRunService._claim(pending)
+            if claimed:
+                PayoutRunService._transfer_and_record(run, claimed, max_workers)
+
+        return PayoutRunService._finish(run)
+
+    @staticmethod
+    def resume_unfinished_runs(max_workers=None):
+        """
+        Resume every run still marked running (e.g. after a worker crash).
+
+        Returns:
+            list: The resumed runs
+        """
+        runs = list(PayoutRun.objects.filter(status="running").order_by("started_at"))
+        for run in runs:
+            logger.info(f"Resuming payout run {run.id}")
+            PayoutRunService.execute_run(run, max_workers=max_workers)
+        return runs
+
+    @staticmethod
+    def _claim(items):
+        """
+        Debit the balances of a batch and mark the covered items processing.
+
+        Items another process claimed since they were read are left alone.
+
+        Returns:
+            list: Items that were claimed
+        """
+        with transaction.atomic():
+            items = list(
+                PayoutRunItem.objects.select_for_update()
+                .filter(id__in=[item.id for item in items], status="pending")
+                .order_by("id")
+            )
+            balances = {
+                balance.user_id: balance
+                for balance in Balance.objects.select_for_update().filter(
+                    user_id__in=[item.user_id for item in items]
+                )
+            }
+            claimed = []
+            skipped = []
+            for item in items:
+                balance = balances.get(item.user_id)
+                if balance and balance.available_for_payout >= item.amount:
+                    claimed.append(item)
+                else:
+                    skipped.append(item.id)
+
+            if claimed:
+                debit = Case(
+                    *[When(user_id=item.user_id, then=Value(item.amount)) for item in claimed],
+                    output_field=DecimalField(max_digits=12, decimal_places=2),
+                )
+                Balance.objects.filter(user_id__in=[item.user_id for item in claimed]).update(
+                    current_balance=F("current_balance") - debit,
+                    available_for_payout=F("available_for_payout") - debit,
+                    updated_at=timezone.now(),
+                )
+                PayoutRunItem.objects.filter(id__in=[item.id for item in claimed]).update(
+                    status="processing", updated_at=timezone.now()
+                )
+            if skipped:
+                PayoutRunItem.objects.filter(id__in=skipped).update(
+                    status="skipped",
+                    error="Balance no longer covers the payout amount",
+                    updated_at=timezone.now(),
+                )
+
+        for item in claimed:
+            item.status = "processing"
+        return claimed
+
+    @staticmethod
+    def _create_transfer(item, currency):
+        """
+        Create (or find, when resuming) the Stripe transfer of one item.
+        Runs on the thread pool: must not touch the database.
+
+        Returns:
+            tuple: (item, transfer_id or None, error message or "", ambiguous).
+            ambiguous is True when the outcome is unknown (connection lost
+            after Stripe's own retries), so the item must stay processing.
+        """
+        try:
+            if item.attempts > 0:
+                existing = stripe_gateway.call(
+                    "Transfer.list",
+                    stripe.Transfer.list,
+                    transfer_group=item.transfer_group,
+                    limit=1,
+                )
+                if existing.data:
+                    return item, existing.data[0].id, "", False
+
+            amount_cents = int(item.amount * 100)
+            transfer = stripe_gateway.create_transfer(
+                idempotency_key=stripe_gateway.idempotency_key(
+                    "payout-run", item.run_id, item.user_id, amount_cents
+                ),
+                amount=amount_cents,
+                currency=currency.lower(),
+                destination=item.stripe_account_id,
+                transfer_group=item.transfer_group,
+                description=f"Payout run {item.run_id}",
+                metadata={
+                    "user_id": str(item.user_id),
+                    "payout_run_id": str(item.run_id),
+                    "transfer_type": "earnings",
+                    "platform": "Safe-Bill",
+                },
+            )
+            return item, transfer.id, "", False
+        except stripe.error.APIConnectionError as e:
+            return item, None, str(e), True
+        except stripe.error.StripeError as e:
+            return item, None, str(e), False
+
+    @staticmethod
+    def _transfer_and_record(run, items, max_workers):
+        # Count the attempt before calling Stripe, so a crash during the calls
+        # makes the resume look the transfer up by transfer_group first
+        PayoutRunItem.objects.filter(id__in=[item.id for item in items]).update(
+            attempts=F("attempts") + 1
+        )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(
+                pool.map(lambda item: PayoutRunService._create_transfer(item, run.currency), items)
+            )
+
+        succeeded = [(item, transfer_id) for item, transfer_id, _, _ in results if transfer_id]
+        failed = [
+            (item, error)
+            for item, transfer_id, error, ambiguous in results
+            if not transfer_id and not ambiguous
+        ]
+        for item, transfer_id, error, ambiguous in results:
+            if ambiguous:
+                # Left processing with its balance debited; the next resume retries it
+                logger.warning(
+                    f"Payout run {run.id}: transfer outcome unknown for user {item.user_id}, "
+                    f"will retry on resume: {error}"
+                )
+        now = timezone.now()
+
+        with transaction.atomic():
+            Payout.objects.bulk_create(
+                [
+                    Payout(
+                        user_id=item.user_id,
+                        amount=item.amount,
+                        currency=run.currency,
+                        status="in_transit",
+                        stripe_transfer_id=transfer_id,
+                        stripe_account_id=item.stripe_account_id,
+                    )
+                    for item, transfer_id in succeeded
+                ],
+                ignore_conflicts=True,
+            )
+
+            for item, transfer_id in succeeded:
+                item.status = "succeeded"
+                item.stripe_transfer_id = transfer_id
+                item.error = ""
+                item.updated_at = now
+            for item, error in failed:
+                item.status = "failed"
+                item.error = error
+                item.updated_at = now
+            PayoutRunItem.objects.bulk_update(
+                [item for item, _ in succeeded] + [item for item, _ in failed],
+                ["status", "stripe_transfer_id", "error", "updated_at"],
+            )
+
+            if failed:
+                # Give back what was debited when the failed items were claimed
+                credit = Case(
+                    *[When(user_id=item.user_id, then=Value(item.amount)) for item, _ in failed],
+                    output_field=DecimalField(max_digits=12, decimal_places=2),
+                )
+                Balance.objects.filter(user_id__in=[item.user_id for item, _ in failed]).update(
+                    current_balance=F("current_balance") + credit,
+                    available_for_payout=F("available_for_payout") + credit,
+                    updated_at=now,
+                )
+
+        for item, error in failed:
+            logger.error(f"Payout run {run.id}: transfer failed for user {item.user_id}: {error}")
+
+        if succeeded:
+            PayoutRunService._notify_transfers(run, [item for item, _ in succeeded])
+
+    @staticmethod
+    def _notify_transfers(run, items):
+        try:
+            NotificationService.create_notifications_bulk(
+                [item.user_id for item in items],
+                "notifications.transfer_sent",
+                {
+                    item.user_id: {"amount": str(item.amount), "currency": run.currency}
+                    for item in items
+                },
+            )
+        except Exception as e:
+            logger.error(f"Payout run {run.id}: failed to send transfer notifications: {e}")
+
+        emails = dict(
+            PayoutRunItem.objects.filter(id__in=[item.id for item in items]).values_list(
+                "user_id", "user__email"
+            )
+        )
+        for item in items:
+            try:
+                send_transfer_initiated_email_task.delay(
+                    emails.get(item.user_id), float(item.amount), run.currency
+                )
+            except Exception as e:
+                logger.error(f"Payout run {run.id}: failed to queue email for user {item.user_id}: {e}")
+
+    @staticmethod
+    def _finish(run):
+        totals = PayoutRunItem.objects.filter(run=run).aggregate(
+            succeeded=Count("id", filter=Q(status="succeeded")),
+            failed=Count("id", filter=Q(status="failed")),
+            skipped=Count("id", filter=Q(status="skipped")),
+            amount=Sum("amount", filter=Q(status="succeeded")),
+        )
+        run.succeeded = totals["succeeded"]
+        run.failed = totals["failed"]
+        run.skipped = totals["skipped"]
+        run.amount_transferred = totals["amount"] or Decimal("0.00")
+        if PayoutRunItem.objects.filter(run=run, status__in=["pending", "processing"]).exists():
+            # Some transfers have an unknown outcome; keep the run resumable
+            run.save()
+            logger.warning(f"Payout run {run.id} left running with unresolved transfers")
+            return run
+        run.status = "completed"
+        run.finished_at = timezone.now()
+        run.save()
+
+        logger.info(
+            f"Payout run {run.id} completed: {run.succeeded} succeeded, {run.failed} failed, "
+            f"{run.skipped} skipped, {run.amount_transferred} {run.currency} transferred"
+        )
+        return run
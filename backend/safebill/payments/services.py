@@ -1,18 +1,40 @@
 from decimal import Decimal
 from datetime import timedelta
 from django.db import transaction
+from django.db.models import (
+    Case, DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce, Least
+from django.db.models.lookups import GreaterThan, LessThanOrEqual
 from django.utils import timezone
 from .models import Balance, Payment, PayoutHold
 from django.contrib.auth import get_user_model
 from projects.models import Project, Milestone
 from notifications.services import NotificationService
-from .tasks import send_hold_released_email_task
+from .tasks import send_hold_released_email_task, send_hold_released_emails_task
 import logging
 
 User = get_user_model()
 
 logger = logging.getLogger(__name__)
 
+_HUNDRED = Decimal("100")
+_THOUSAND = Decimal("1000")
+_BANK_TRANSFER_RATE = Decimal("0.005")
+_CARD_RATE = Decimal("0.015")
+_CARD_FIXED_FEE = Decimal("0.25")
+
+# Degressive platform commission: (gross amount upper bound incl. VAT, rate %)
+COMMISSION_TIERS = (
+    (Decimal("1000"), Decimal("10")),
+    (Decimal("100000"), Decimal("7")),
+    (Decimal("200000"), Decimal("5")),
+    (Decimal("300000"), Decimal("3")),
+    (Decimal("400000"), Decimal("2.5")),
+    (Decimal("500000"), Decimal("2")),
+)
+COMMISSION_TOP_RATE = Decimal("1.5")
+
 
 class FeeCalculationService:
     """
@@ -26,20 +48,10 @@ class FeeCalculationService:
         Determine the commission rate based on the gross amount (incl. VAT).
         """
         gross_amount = Decimal(str(gross_amount))
-        if gross_amount <= Decimal("1000"):
-            return Decimal("10")
-        elif gross_amount <= Decimal("100000"):
-            return Decimal("7")
-        elif gross_amount <= Decimal("200000"):
-            return Decimal("5")
-        elif gross_amount <= Decimal("300000"):
-            return Decimal("3")
-        elif gross_amount <= Decimal("400000"):
-            return Decimal("2.5")
-        elif gross_amount <= Decimal("500000"):
-            return Decimal("2")
-        else:
-            return Decimal("1.5")
+        for upper_bound, rate in COMMISSION_TIERS:
+            if gross_amount <= upper_bound:
+                return rate
+        return COMMISSION_TOP_RATE
 
     @staticmethod
     def calculate_stripe_fees(gross_amount, payment_method="card"):
@@ -49,12 +61,12 @@ class FeeCalculationService:
         - Bank Transfer: 0.5% in + 0.5% out (for > €1,000)
         """
         gross_amount = Decimal(str(gross_amount))
-        if gross_amount > Decimal("1000") or payment_method == "bank_transfer":
+        if gross_amount > _THOUSAND or payment_method == "bank_transfer":
             # 0.5% incoming + 0.5% outgoing
-            return (gross_amount * Decimal("0.005")) + (gross_amount * Decimal("0.005"))
+            return (gross_amount * _BANK_TRANSFER_RATE) + (gross_amount * _BANK_TRANSFER_RATE)
         else:
             # 1.5% + €0.25
-            return (gross_amount * Decimal("0.015")) + Decimal("0.25")
+            return (gross_amount * _CARD_RATE) + _CARD_FIXED_FEE
 
     @staticmethod
     def calculate_fees(base_amount, platform_fee_percentage=None, vat_rate=Decimal("20")):
@@ -76,7 +88,7 @@ class FeeCalculationService:
         vat_rate = Decimal(str(vat_rate))
         
         # Calculate VAT and Gross Amount
-        vat_amount = (base_amount * vat_rate) / Decimal("100")
+        vat_amount = (base_amount * vat_rate) / _HUNDRED
         gross_amount = base_amount + vat_amount
 
         # Determine platform commission rate (use provided or degressive logic)
@@ -86,7 +98,7 @@ class FeeCalculationService:
             commission_rate = Decimal(str(platform_fee_percentage))
 
         # Calculate Gross Platform Commission (on gross amount)
-        platform_gross_commission = (gross_amount * commission_rate) / Decimal("100")
+        platform_gross_commission = (gross_amount * commission_rate) / _HUNDRED
 
         # Calculate Stripe fees (deducted from platform commission)
         stripe_fees = FeeCalculationService.calculate_stripe_fees(gross_amount)
@@ -113,6 +125,143 @@ class FeeCalculationService:
             "seller_net": seller_net,
         }
 
+    @staticmethod
+    def platform_fee_expression(
+        base_amount="relative_payment",
+        platform_fee_percentage="project__platform_fee_percentage",
+        vat_rate="project__vat_rate",
+    ):
+        """
+        Database expression equal to calculate_fees(...)["platform_fee"].
+
+        Lets querysets sum or annotate platform commissions in SQL instead of
+        calling calculate_fees() for each row. Uses the explicit fee percentage
+        (always set on Project), i.e. base * (100 + vat) / 100 * fee_pct / 100.
+        This is the only SQL copy of the commission formula; fee_annotations()
+        builds on it.
+
+        Args:
+            base_amount (str): Field holding the base amount (excl. VAT)
+            platform_fee_percentage (str | Expression): Field holding the fee
+                percentage, or an expression computing it
+            vat_rate (str): Field holding the VAT rate percentage
+
+        Returns:
+            ExpressionWrapper: Decimal expression usable in annotate()/aggregate()
+        """
+        if isinstance(platform_fee_percentage, str):
+            platform_fee_percentage = F(platform_fee_percentage)
+        return ExpressionWrapper(
+            F(base_amount)
+            * (Value(Decimal("100")) + F(vat_rate))
+            * platform_fee_percentage
+            / Value(Decimal("10000")),
+            output_field=DecimalField(max_digits=20, decimal_places=6),
+        )
+
+    @staticmethod
+    def calculate_fees_batch(items):
+        """
+        Calculate fees for many (base_amount, platform_fee_percentage, vat_rate)
+        tuples at once.
+
+        Identical tuples are computed once per call, so loops over milestones
+        (revenue recounts, invoices, seller net estimates) stop redoing the
+        same Decimal math.
+        Results are exactly those of calculate_fees() for each tuple.
+
+        Args:
+            items: Iterable of (base_amount, platform_fee_percentage, vat_rate);
+                platform_fee_percentage may be None for the degressive rate
+
+        Returns:
+            list: One calculate_fees() dict per input tuple, in input order
+        """
+        computed = {}
+        results = []
+        for base_amount, platform_fee_percentage, vat_rate in items:
+            key = (
+                str(base_amount),
+                None if platform_fee_percentage is None else str(platform_fee_percentage),
+                str(vat_rate),
+            )
+            fees = computed.get(key)
+            if fees is None:
+                fees = computed[key] = FeeCalculationService.calculate_fees(
+                    base_amount, platform_fee_percentage, vat_rate
+                )
+            # Copy so callers can modify a result without affecting duplicates
+            results.append(dict(fees))
+        return results
+
+    @staticmethod
+    def fee_annotations(
+        base_amount="relative_payment",
+        platform_fee_percentage="project__platform_fee_percentage",
+        vat_rate="project__vat_rate",
+        prefix="fee_",
+    ):
+        """
+        Database expressions for the calculate_fees() amounts, keyed for annotate().
+
+        ``queryset.annotate(**FeeCalculationService.fee_annotations())`` adds
+        fee_vat_amount, fee_gross_amount, fee_commission_rate, fee_platform_fee,
+        fee_stripe_fees, fee_platform_net_commission and fee_seller_net to each
+        row, computed in SQL. When the fee percentage field is NULL the
+        degressive commission tier is used, as in calculate_fees().
+
+        Args:
+            base_amount (str): Field holding the base amount (excl. VAT)
+            platform_fee_percentage (str): Field holding the fee percentage
+            vat_rate (str): Field holding the VAT rate percentage
+            prefix (str): Prefix for the annotation names
+
+        Returns:
+            dict: Annotation name -> expression
+        """
+        output = DecimalField(max_digits=20, decimal_places=6)
+        base = F(base_amount)
+        vat_amount = ExpressionWrapper(
+            base * F(vat_rate) / Value(_HUNDRED), output_field=output
+        )
+        gross_amount = ExpressionWrapper(base + vat_amount, output_field=output)
+        commission_rate = Coalesce(
+            F(platform_fee_percentage),
+            Case(
+                *[
+                    When(LessThanOrEqual(gross_amount, Value(upper_bound)), then=Value(rate))
+                    for upper_bound, rate in COMMISSION_TIERS
+                ],
+                default=Value(COMMISSION_TOP_RATE),
+            ),
+            output_field=DecimalField(max_digits=5, decimal_places=2),
+        )
+        platform_fee = FeeCalculationService.platform_fee_expression(
+            base_amount, commission_rate, vat_rate
+        )
+        stripe_fees = Case(
+            When(
+                GreaterThan(gross_amount, Value(_THOUSAND)),
+                then=gross_amount * Value(_BANK_TRANSFER_RATE)
+                + gross_amount * Value(_BANK_TRANSFER_RATE),
+            ),
+            default=gross_amount * Value(_CARD_RATE) + Value(_CARD_FIXED_FEE),
+            output_field=output,
+        )
+        return {
+            f"{prefix}vat_amount": vat_amount,
+            f"{prefix}gross_amount": gross_amount,
+            f"{prefix}commission_rate": commission_rate,
+            f"{prefix}platform_fee": platform_fee,
+            f"{prefix}stripe_fees": stripe_fees,
+            f"{prefix}platform_net_commission": ExpressionWrapper(
+                platform_fee - stripe_fees, output_field=output
+            ),
+            f"{prefix}seller_net": ExpressionWrapper(
+                gross_amount - platform_fee, output_field=output
+            ),
+        }
+
     @staticmethod
     def calculate_seller_net_for_amount(project, base_amount):
         """
@@ -257,8 +406,12 @@ class BalanceService:
                 logger.info(
                     f"Adding ${total_released} to available_for_payout for {user.email}"
                 )
-                balance.available_for_payout += total_released
-                balance.save()
+                # F() so a concurrent bulk release cannot be overwritten by this save
+                Balance.objects.filter(pk=balance.pk).update(
+                    available_for_payout=F("available_for_payout") + total_released,
+                    updated_at=now,
+                )
+                balance.refresh_from_db(fields=["available_for_payout"])
                 logger.info(
                     f"New available_for_payout: ${balance.available_for_payout}"
                 )
@@ -281,6 +434,108 @@ class BalanceService:
 
             return total_released
 
+    @staticmethod
+    def release_all_matured_holds(batch_size=500):
+        """
+        Release matured holds for all users in bounded batches.
+
+        Each batch is claimed with SKIP LOCKED (so it never blocks on, or double
+        releases, holds handled by release_matured_holds), marked released with
+        one UPDATE, and credited to every affected balance with one more UPDATE
+        built from the per-user sums. Holds are taken in user order so a seller's
+        holds usually land in one batch and get a single notification.
+
+        Args:
+            batch_size: Maximum number of holds released per transaction
+
+        Returns:
+            dict: Totals released: {"holds", "users", "amount"}
+        """
+        totals = {"holds": 0, "users": 0, "amount": Decimal("0.00")}
+        credited_users = set()
+        now = timezone.now()
+
+        while True:
+            with transaction.atomic():
+                hold_ids = list(
+                    PayoutHold.objects.select_for_update(skip_locked=True)
+                    .filter(released=False, hold_until__lte=now)
+                    .order_by("user_id", "id")
+                    .values_list("id", flat=True)[:batch_size]
+                )
+                if not hold_ids:
+                    break
+
+                released_by_user = {
+                    row["user_id"]: row["total"]
+                    for row in PayoutHold.objects.filter(id__in=hold_ids)
+                    .values("user_id")
+                    .annotate(total=Sum("amount"))
+                }
+                PayoutHold.objects.filter(id__in=hold_ids).update(
+                    released=True, released_at=now
+                )
+
+                Balance.objects.bulk_create(
+                    [Balance(user_id=user_id) for user_id in released_by_user],
+                    ignore_conflicts=True,
+                )
+                Balance.objects.filter(user_id__in=released_by_user).update(
+                    available_for_payout=F("available_for_payout")
+                    + Case(
+                        *[
+                            When(user_id=user_id, then=Value(total))
+                            for user_id, total in released_by_user.items()
+                        ],
+                        output_field=DecimalField(max_digits=12, decimal_places=2),
+                    ),
+                    updated_at=now,
+                )
+
+            batch_amount = sum(released_by_user.values(), Decimal("0.00"))
+            totals["holds"] += len(hold_ids)
+            credited_users.update(released_by_user)
+            totals["users"] = len(credited_users)
+            totals["amount"] += batch_amount
+            logger.info(
+                f"Released {len(hold_ids)} matured holds ({batch_amount}) "
+                f"for {len(released_by_user)} users"
+            )
+            BalanceService._notify_holds_released(released_by_user)
+
+            if len(hold_ids) < batch_size:
+                break
+
+        return totals
+
+    @staticmethod
+    def _notify_holds_released(released_by_user):
+        """
+        Send the funds released notification and email for one bulk release batch
+        """
+        try:
+            NotificationService.create_notifications_bulk(
+                released_by_user.keys(),
+                "notifications.funds_released",
+                {user_id: {"amount": str(total)} for user_id, total in released_by_user.items()},
+            )
+        except Exception as e:
+            logger.error(f"Failed to send funds released notifications: {e}")
+
+        try:
+            emails = dict(
+                User.objects.filter(id__in=released_by_user).values_list("id", "email")
+            )
+            send_hold_released_emails_task.delay(
+                [
+                    [emails[user_id], float(total)]
+                    for user_id, total in released_by_user.items()
+                    if emails.get(user_id)
+                ]
+            )
+        except Exception as e:
+            logger.error(f"Failed to queue funds released emails: {e}")
+
     @staticmethod
     def reconcile_buyer_escrow(user):
         """
@@ -344,6 +599,122 @@ class BalanceService:
 
             return {"held_in_escrow": recalculated_escrow, "total_spent": total_paid}
 
+    @staticmethod
+    def reconcile_all_buyer_escrow(dry_run=False, batch_size=1000):
+        """
+        Platform-wide version of reconcile_buyer_escrow.
+
+        Computes total_spent and held_in_escrow for every buyer with two grouped
+        queries (paid payments and approved milestones are summed per project in
+        subqueries, then per client), compares them with the stored balances and
+        bulk-updates only the rows that drifted. Rules match the per-user method:
+        approved releases are capped at what was paid for each project, and
+        sellers are skipped.
+
+        Args:
+            dry_run: Report drift without writing anything
+            batch_size: Rows per bulk_create / bulk_update statement
+
+        Returns:
+            dict: {"buyers": checked, "drift": [per-user differences], "updated": rows written}
+        """
+        zero = Value(Decimal("0.00"), output_field=DecimalField(max_digits=12, decimal_places=2))
+        project_paid = (
+            Payment.objects.filter(
+                project=OuterRef("pk"), user=OuterRef("client"), status="paid"
+            )
+            .values("project")
+            .annotate(total=Sum("amount"))
+            .values("total")
+        )
+        project_approved = (
+            Milestone.objects.filter(project=OuterRef("pk"), status="approved")
+            .values("project")
+            .annotate(total=Sum("relative_payment"))
+            .values("total")
+        )
+        expected = {
+            row["client_id"]: row
+            for row in Project.objects.filter(client__isnull=False)
+            .exclude(client__role="seller")
+            .annotate(
+                paid=Coalesce(Subquery(project_paid), zero),
+                approved=Coalesce(Subquery(project_approved), zero),
+            )
+            .values("client_id")
+            .annotate(
+                total_spent=Sum("paid"),
+                released=Sum(Least("paid", "approved")),
+            )
+            .values("client_id", "total_spent", "released")
+        }
+
+        # Stored balances of non-seller users: buyers with projects, plus anyone
+        # whose stored escrow or spending would have to be reset to zero
+        balances = {
+            balance.user_id: balance
+            for balance in Balance.objects.exclude(user__role="seller").filter(
+                Q(user_id__in=expected.keys())
+                | ~Q(total_spent=0)
+                | ~Q(held_in_escrow=0)
+            )
+        }
+
+        drift = []
+        to_create = []
+        to_update = []
+        for user_id in sorted(set(expected) | set(balances)):
+            row = expected.get(user_id)
+            total_spent = row["total_spent"] if row else Decimal("0.00")
+            held_in_escrow = (
+                max(Decimal("0.00"), total_spent - row["released"]) if row else Decimal("0.00")
+            )
+            balance = balances.get(user_id)
+            stored_spent = balance.total_spent if balance else Decimal("0.00")
+            stored_escrow = balance.held_in_escrow if balance else Decimal("0.00")
+            if stored_spent == total_spent and stored_escrow == held_in_escrow:
+                continue
+
+            drift.append(
+                {
+                    "user_id": user_id,
+                    "total_spent": (stored_spent, total_spent),
+                    "held_in_escrow": (stored_escrow, held_in_escrow),
+                }
+            )
+            if balance is None:
+                to_create.append(
+                    Balance(
+                        user_id=user_id,
+                        total_spent=total_spent,
+                        held_in_escrow=held_in_escrow,
+                    )
+                )
+            else:
+                balance.total_spent = total_spent
+                balance.held_in_escrow = held_in_escrow
+                to_update.append(balance)
+
+        if not dry_run:
+            with transaction.atomic():
+                Balance.objects.bulk_create(to_create, batch_size=batch_size, ignore_conflicts=True)
+                Balance.objects.bulk_update(
+                    to_update,
+                    ["total_spent", "held_in_escrow"],
+                    batch_size=batch_size,
+                )
+
+        if drift:
+            logger.warning(
+                f"Buyer escrow reconciliation found drift for {len(drift)} users"
+                f"{' (dry run)' if dry_run else ''}"
+            )
+        return {
+            "buyers": len(expected),
+            "drift": drift,
+            "updated": 0 if dry_run else len(to_update) + len(to_create),
+        }
+
     @staticmethod
     def update_buyer_balance_on_payment(buyer, payment_amount):
         """
@@ -458,3 +829,86 @@ class BalanceService:
         return FeeCalculationService.calculate_seller_net_for_amount(
             project, base_amount
         )
+
+
+class StripeCustomerService:
+    """
+    Service class for resolving the Stripe Customer of a user
+    """
+
+    @staticmethod
+    def find_existing_customer_id(user, exclude=()):
+        """
+        Look up a Stripe Customer created for this user before IDs were stored.
+
+        Checks the subscription record first, then searches Stripe by email.
+
+        Args:
+            user: User paying for a checkout
+            exclude: Customer IDs known to be invalid (e.g. deleted in Stripe)
+
+        Returns:
+            str: Customer ID, or "" if none exists
+        """
+        import stripe
+
+        subscription = getattr(user, "subscription", None)
+        if (
+            subscription is not None
+            and subscription.stripe_customer_id
+            and subscription.stripe_customer_id not in exclude
+        ):
+            return subscription.stripe_customer_id
+
+        existing_customers = stripe.Customer.list(email=user.email, limit=len(exclude) + 1)
+        for customer in existing_customers.data:
+            if customer.id not in exclude:
+                return customer.id
+        return ""
+
+    @staticmethod
+    def get_or_create_customer_id(user, exclude=()):
+        """
+        Get the user's Stripe Customer ID, creating the customer only once.
+
+        The ID is stored on the user, so checkouts after the first one make no
+        Customer API call at all.
+
+        Args:
+            user: User paying for a checkout
+            exclude: Customer IDs known to be invalid, never reused from the
+                subscription record or the email search
+
+        Returns:
+            str: Stripe Customer ID
+        """
+        if user.stripe_customer_id:
+            return user.stripe_customer_id
+
+        import stripe
+
+        with transaction.atomic():
+            # Lock the user so concurrent checkouts don't create two customers
+            locked_user = User.objects.select_for_update().only("id", "email", "stripe_customer_id").get(pk=user.pk)
+            customer_id = locked_user.stripe_customer_id
+            if not customer_id:
+                customer_id = StripeCustomerService.find_existing_customer_id(user, exclude)
+                if not customer_id:
+                    customer = stripe.Customer.create(
+                        email=user.email,
+                        metadata={"user_id": str(user.id)},
+                    )
+                    customer_id = customer.id
+                # update() avoids User.save() side effects (signals, role checks)
+                User.objects.filter(pk=user.pk).update(stripe_customer_id=customer_id)
+
+        user.stripe_customer_id = customer_id
+        return customer_id
+
+    @staticmethod
+    def forget_customer_id(user):
+        """
+        Drop a stored customer ID that Stripe no longer knows (e.g. deleted customer)
+        """
+        User.objects.filter(pk=user.pk, stripe_customer_id=user.stripe_customer_id).update(stripe_customer_id="")
+        user.stripe_customer_id = ""
@@ -209,3 +209,70 @@ def send_hold_released_email_task(self, user_email, amount, language="fr"):
         self.retry(exc=exc, countdown=2 ** self.request.retries)
 
 
+
+
+@shared_task(queue='emails')
+def send_hold_released_emails_task(recipients, language="fr"):
+    """
+    Send the hold released email to a batch of sellers.
+
+    Args:
+        recipients: List of [user_email, amount] pairs
+
+    Failed sends are handed to send_hold_released_email_task individually so
+    one bad address does not retry the whole batch.
+    """
+    sent = 0
+    for user_email, amount in recipients:
+        try:
+            send_hold_released_email_task.run(user_email, amount, language)
+            sent += 1
+        except Exception as exc:
+            logger.error(f"Error sending hold released email to {user_email}, retrying individually: {exc}")
+            send_hold_released_email_task.delay(user_email, amount, language)
+    return sent
+
+
+@shared_task
+def release_matured_payout_holds_task():
+    """
+    Release every matured payout hold across all sellers in bounded batches
+    """
+    from django.conf import settings
+    from .services import BalanceService
+
+    result = BalanceService.release_all_matured_holds(
+        batch_size=getattr(settings, "PAYOUT_HOLD_RELEASE_BATCH_SIZE", 500)
+    )
+    if result["holds"]:
+        logger.info(
+            f"Released {result['holds']} matured payout holds for {result['users']} users "
+            f"({result['amount']} total)"
+        )
+    return result
+
+
+@shared_task
+def run_seller_payouts_task(threshold=None):
+    """
+    Resume any interrupted payout run, then pay out every eligible seller
+    """
+    from .payout_runs import PayoutRunService
+
+    lock_token = PayoutRunService.acquire_run_lock()
+    if not lock_token:
+        logger.info("A payout run is already in progress, skipping")
+        return None
+
+    try:
+        PayoutRunService.resume_unfinished_runs()
+        run = PayoutRunService.execute_run(PayoutRunService.start_run(threshold=threshold))
+        return {
+            "run_id": run.id,
+            "succeeded": run.succeeded,
+            "failed": run.failed,
+            "skipped": run.skipped,
+            "amount": str(run.amount_transferred),
+        }
+    finally:
+        PayoutRunService.release_run_lock(lock_token)
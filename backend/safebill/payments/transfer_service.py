@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.db import transaction
 from decimal import Decimal
 import logging
 import stripe
@@ -7,6 +8,7 @@ from .models import Balance, Payout
 from .services import BalanceService
 from connect_stripe.models import StripeAccount
 from notifications.services import NotificationService
+from utils import stripe_gateway
 from .tasks import (
     send_transfer_initiated_email_task,
     send_transfer_paid_email_task,
@@ -67,12 +69,19 @@ class TransferService:
             except StripeAccount.DoesNotExist:
                 return {"success": False, "error": "Stripe Connect account not found"}
 
-            # Set Stripe API key
-            stripe.api_key = settings.STRIPE_API_KEY
-
-            # Create transfer to connected account
-            transfer = stripe.Transfer.create(
-                amount=int(transfer_amount * 100),  # Amount in cents
+            # Create transfer to connected account. The idempotency key changes
+            # whenever the balance does, so retrying this attempt reuses the
+            # original transfer while the next payout gets a new key
+            amount_cents = int(transfer_amount * 100)
+            transfer = stripe_gateway.create_transfer(
+                idempotency_key=stripe_gateway.idempotency_key(
+                    "transfer",
+                    user.id,
+                    stripe_account.account_id,
+                    amount_cents,
+                    balance.updated_at.isoformat(),
+                ),
+                amount=amount_cents,  # Amount in cents
                 currency=currency.lower(),
                 destination=stripe_account.account_id,
                 description=f"Platform earnings transfer for {user.email}",
@@ -167,9 +176,12 @@ class TransferService:
                 reason=reason
             )
 
-            # Send email asynchronously
-            send_transfer_reversed_email_task.delay(
-                payout.user.email, float(payout.amount), payout.currency
+            # Send email asynchronously, once the reversal is committed
+            transaction.on_commit(
+                lambda: send_transfer_reversed_email_task.delay(
+                    payout.user.email, float(payout.amount), payout.currency
+                ),
+                robust=True,
             )
 
             logger.info(
@@ -299,7 +311,10 @@ class TransferService:
                 user_email = payout.user.email
                 amount = float(payout.amount)
                 currency = payout.currency
-                send_transfer_paid_email_task.delay(user_email, amount, currency)
+                transaction.on_commit(
+                    lambda: send_transfer_paid_email_task.delay(user_email, amount, currency),
+                    robust=True,
+                )
             except Exception as e:
                 logger.error(f"Failed to enqueue transfer paid email: {e}")
 
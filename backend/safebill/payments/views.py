@@ -8,8 +8,7 @@ from projects.models import Project, PaymentInstallment, Milestone
 from decimal import Decimal, DecimalException
 from datetime import timedelta
 from django.utils import timezone
-from django.db.models import Sum, F, ExpressionWrapper, DecimalField
-from .models import Payment, Balance, Payout, PayoutHold, Refund
+from .models import Payment, Balance, Payout, PayoutHold, Refund, SellerMonthlyRevenue
 from .serializers import (
     PaymentSerializer,
     BalanceSerializer,
@@ -18,7 +17,8 @@ from .serializers import (
     RefundSerializer,
 )
 from .transfer_service import TransferService
-from .services import BalanceService, FeeCalculationService
+from utils import stripe_gateway
+from .services import BalanceService, FeeCalculationService, StripeCustomerService
 
 # from connect_stripe.models import StripeAccount
 # from notifications.models import Notification
@@ -78,16 +78,10 @@ def create_stripe_payment(request, project_id):
         stripe_fees = fees.get("stripe_fees", Decimal("0"))
         # Build checkout session params
 
-        # Check if customer already exists, otherwise create new one
-        existing_customers = stripe.Customer.list(email=user.email, limit=1)
-        if existing_customers.data:
-            customer = existing_customers.data[0]
-        else:
-            customer = stripe.Customer.create(
-                email=user.email,
-            )
+        # Reuse the stored Stripe customer (created once on the first checkout)
+        customer_id = StripeCustomerService.get_or_create_customer_id(user)
         checkout_params = {
-            "customer": customer.id,
+            "customer": customer_id,
             "line_items": [
                 {
                     "price_data": {
@@ -126,7 +120,19 @@ def create_stripe_payment(request, project_id):
             }
         }
 
-        checkout_session = stripe.checkout.Session.create(**checkout_params)
+        try:
+            checkout_session = stripe.checkout.Session.create(**checkout_params)
+        except stripe.error.InvalidRequestError as e:
+            if getattr(e, "param", None) != "customer":
+                raise
+            # Stored customer was deleted in Stripe: resolve it again and retry once
+            logger.warning(f"Stripe customer {customer_id} for user {user.id} is invalid: {e}")
+            StripeCustomerService.forget_customer_id(user)
+            # The stale ID may have come from the subscription record: never reuse it
+            checkout_params["customer"] = StripeCustomerService.get_or_create_customer_id(
+                user, exclude={customer_id}
+            )
+            checkout_session = stripe.checkout.Session.create(**checkout_params)
         # Delete any existing payments for this project by this user
         Payment.objects.filter(project=project, user=user).delete()
 
@@ -575,7 +581,7 @@ def revenue_comparison(request):
             day=1, hour=0, minute=0, second=0, microsecond=0
         )
 
-        # Calculate last month's start and end
+        # Calculate last month's start
         if current_month_start.month == 1:
             last_month_start = current_month_start.replace(
                 year=current_month_start.year - 1, month=12
@@ -585,52 +591,14 @@ def revenue_comparison(request):
                 month=current_month_start.month - 1
             )
 
-        last_month_end = current_month_start - timedelta(microseconds=1)
-
-        # Get seller's projects
-        seller_projects = Project.objects.filter(user=user)
-
-        # Calculate current month revenue from approved milestones
-        current_month_milestones = Milestone.objects.filter(
-            project__in=seller_projects,
-            status="approved",
-            completion_date__gte=current_month_start,
-            completion_date__lt=now,
-        )
-
-        current_month_revenue = current_month_milestones.annotate(
-            _platform_fee_amount=ExpressionWrapper(
-                F("relative_payment")
-                * F("project__platform_fee_percentage")
-                / Decimal("100"),
-                output_field=DecimalField(max_digits=18, decimal_places=2),
-            ),
-            _net_amount=ExpressionWrapper(
-                F("relative_payment") - F("_platform_fee_amount"),
-                output_field=DecimalField(max_digits=18, decimal_places=2),
-            ),
-        ).aggregate(total=Sum("_net_amount")).get("total") or Decimal("0")
-
-        # Calculate last month revenue from approved milestones
-        last_month_milestones = Milestone.objects.filter(
-            project__in=seller_projects,
-            status="approved",
-            completion_date__gte=last_month_start,
-            completion_date__lte=last_month_end,
+        # Read both months from the per-seller rollup (kept up to date on approval)
+        current_period = (current_month_start.year, current_month_start.month)
+        last_period = (last_month_start.year, last_month_start.month)
+        totals = SellerMonthlyRevenue.totals_for_months(
+            user, [current_period, last_period]
         )
-
-        last_month_revenue = last_month_milestones.annotate(
-            _platform_fee_amount=ExpressionWrapper(
-                F("relative_payment")
-                * F("project__platform_fee_percentage")
-                / Decimal("100"),
-                output_field=DecimalField(max_digits=18, decimal_places=2),
-            ),
-            _net_amount=ExpressionWrapper(
-                F("relative_payment") - F("_platform_fee_amount"),
-                output_field=DecimalField(max_digits=18, decimal_places=2),
-            ),
-        ).aggregate(total=Sum("_net_amount")).get("total") or Decimal("0")
+        current_month_revenue = totals[current_period]["net_revenue"]
+        last_month_revenue = totals[last_period]["net_revenue"]
 
         # Calculate percentage change
         if last_month_revenue > 0:
@@ -649,8 +617,8 @@ def revenue_comparison(request):
             change_type = "no_previous_data"
 
         # Get additional stats
-        current_month_milestone_count = current_month_milestones.count()
-        last_month_milestone_count = last_month_milestones.count()
+        current_month_milestone_count = totals[current_period]["milestone_count"]
+        last_month_milestone_count = totals[last_period]["milestone_count"]
 
         # Get current month name for display
         current_month_name = current_month_start.strftime("%B %Y")
@@ -702,7 +670,6 @@ def payment_refund(request, project_id):
         user = request.user
         project = Project.objects.get(id=project_id)
         amount = project.refundable_amount
-        stripe.api_key = settings.STRIPE_API_KEY
 
         # Validate refundable amount
         if not amount or Decimal(str(amount)) <= 0:
@@ -729,37 +696,58 @@ def payment_refund(request, project_id):
                     {"detail": "A refund is already in progress. Please wait."},
                     status=400,
                 )
-            # Auto-expire stale pending refunds (>5 minutes)
-            if existing.status == "pending" and existing.created_at < five_minutes_ago:
-                existing.status = "failed"
-                existing.save(update_fields=["status", "updated_at"])
-
         payment = Payment.objects.get(project=project)
         stripe_payment_id = payment.stripe_payment_id
 
-        # Create refund record first (pending)
-        refund = Refund.objects.create(
-            user=user,
-            project=project,
-            amount=amount,
-            status="pending",
-        )
+        if (
+            existing
+            and existing.status == "pending"
+            and existing.amount == Decimal(str(amount))
+        ):
+            # Stale attempt (>5 minutes, e.g. the process died after Stripe accepted
+            # it): retry with the same record, so Stripe sees the same request
+            refund = existing
+        else:
+            # Auto-expire stale pending refunds for another amount
+            if existing and existing.status == "pending":
+                existing.status = "failed"
+                existing.save(update_fields=["status", "updated_at"])
 
-        # Email: refund requested
-        try:
-            send_refund_created_email_task.delay(
-                user.email, project.name, float(amount)
+            # Create refund record first (pending)
+            refund = Refund.objects.create(
+                user=user,
+                project=project,
+                amount=amount,
+                status="pending",
             )
-        except Exception:
-            pass
+
+            # Email: refund requested
+            try:
+                send_refund_created_email_task.delay(
+                    user.email, project.name, float(amount)
+                )
+            except Exception:
+                pass
 
         # Create Stripe refund
-        session = stripe.checkout.Session.retrieve(stripe_payment_id)
+        session = stripe_gateway.retrieve_checkout_session(stripe_payment_id)
         payment_intent_id = session.payment_intent
 
-        stripe_refund = stripe.Refund.create(
+        # Keyed on the money movement (project, payment intent, amount), so a
+        # re-submitted refund is answered with the original one. Refunds Stripe
+        # already reported failed are counted in, so the user can try again.
+        amount_cents = int(Decimal(str(amount)) * 100)
+        failed_attempts = (
+            Refund.objects.filter(project=project, status="failed")
+            .exclude(stripe_refund_id="")
+            .count()
+        )
+        stripe_refund = stripe_gateway.create_refund(
+            idempotency_key=stripe_gateway.idempotency_key(
+                "refund", project.id, payment_intent_id, amount_cents, failed_attempts
+            ),
             payment_intent=payment_intent_id,
-            amount=int(Decimal(str(amount)) * 100),
+            amount=amount_cents,
             reason="requested_by_customer",
             metadata={"refund_id": str(refund.id), "project_id": str(project.id)},
         )
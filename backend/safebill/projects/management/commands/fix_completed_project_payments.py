@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from projects.models import Project
-from payments.models import Payment
+from projects.querysets import latest_payment, latest_payment_prefetch
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,11 +24,13 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
         
         # Find completed projects with pending payments
-        completed_projects = Project.objects.filter(status="completed")
+        completed_projects = Project.objects.filter(status="completed").prefetch_related(
+            latest_payment_prefetch()
+        )
         inconsistencies = []
         
         for project in completed_projects:
-            payment = Payment.objects.filter(project=project).order_by("-created_at").first()
+            payment = latest_payment(project)
             
             if payment and payment.status == "pending":
                 inconsistencies.append({
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0024_alter_project_platform_fee_percentage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='milestone',
+            index=models.Index(fields=['status', 'completion_date'], name='projects_mi_status_745a58_idx'),
+        ),
+    ]
@@ -203,6 +203,10 @@ class Milestone(models.Model):
 
     class Meta:
         ordering = ["created_date"]
+        indexes = [
+            # Monthly revenue aggregates filter approved milestones by completion_date range
+            models.Index(fields=["status", "completion_date"]),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.project.name}"
@@ -0,0 +1,90 @@
+"""
+Querysets for the project list and receipt endpoints.
+
+The list serializers read milestone counts, the latest completion date and the
+latest payment from the annotations/prefetches added here, and quote,
+installments and milestones from select_related/prefetch_related, so a list
+costs a fixed number of queries whatever the number of projects.
+"""
+from django.db.models import Count, Max, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+
+from payments.models import Payment
+
+from .models import Milestone
+
+
+def _milestone_aggregate(aggregate, **filters):
+    # Correlated subqueries rather than JOIN + GROUP BY: callers may already
+    # join milestones (e.g. to filter on their status), which would skew counts.
+    milestones = (
+        Milestone.objects.filter(project=OuterRef("pk"), **filters)
+        .order_by()
+        .values("project")
+    )
+    return Subquery(milestones.annotate(value=aggregate).values("value")[:1])
+
+
+def with_list_stats(queryset):
+    """
+    Annotate projects with approved_milestones_count, total_milestones_count
+    and latest_completion_date.
+    """
+    return queryset.annotate(
+        approved_milestones_count=Coalesce(
+            _milestone_aggregate(Count("id"), status="approved"), 0
+        ),
+        total_milestones_count=Coalesce(_milestone_aggregate(Count("id")), 0),
+        latest_completion_date=_milestone_aggregate(Max("completion_date")),
+    )
+
+
+def for_project_list(queryset):
+    """Projects ready for ProjectListSerializer (seller side)."""
+    return (
+        with_list_stats(queryset)
+        .select_related("quote")
+        .prefetch_related("installments")
+    )
+
+
+def for_client_project_list(queryset):
+    """Projects ready for ClientProjectSerializer (buyer side)."""
+    return (
+        with_list_stats(queryset)
+        .select_related("quote", "user")
+        .prefetch_related("installments", "milestones")
+    )
+
+
+def latest_payment_prefetch():
+    """
+    Prefetch only the most recent Payment of each project into
+    ``project.latest_payments`` (a list of zero or one payment).
+    """
+    return Prefetch(
+        "payment_set",
+        queryset=Payment.objects.order_by("project_id", "-created_at", "-id").distinct("project_id"),
+        to_attr="latest_payments",
+    )
+
+
+def latest_payment(project):
+    """Most recent Payment of a project, from latest_payment_prefetch() when applied."""
+    if hasattr(project, "latest_payments"):
+        return project.latest_payments[0] if project.latest_payments else None
+    return Payment.objects.filter(project=project).order_by("-created_at", "-id").first()
+
+
+def for_receipts(queryset):
+    """Projects ready for SellerReceiptProjectSerializer."""
+    return (
+        with_list_stats(queryset)
+        .select_related(
+            "quote",
+            "user__business_detail",
+            "client__business_detail",
+            "client__buyer_profile",
+        )
+        .prefetch_related("milestones", "installments", latest_payment_prefetch())
+    )
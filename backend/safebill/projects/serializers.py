@@ -12,6 +12,7 @@ from notifications.models import Notification
 from notifications.services import NotificationService
 from django.db.models import Sum
 from .tasks import send_project_invitation_email_task
+from .querysets import latest_payment
 from django.db import transaction
 import logging
 
@@ -388,6 +389,9 @@ class ProjectListSerializer(serializers.ModelSerializer):
 
     def get_completion_date(self, obj):
         # Use the latest milestone completion_date as completion date fallback
+        if hasattr(obj, "latest_completion_date"):
+            latest = obj.latest_completion_date
+            return latest.strftime("%Y-%m-%d") if latest else None
         latest = (
             obj.milestones.filter(completion_date__isnull=False)
             .order_by("-completion_date")
@@ -404,12 +408,17 @@ class ProjectListSerializer(serializers.ModelSerializer):
         return sum(float(inst.amount) for inst in obj.installments.all())
 
     def get_approved_milestones(self, obj):
+        # Annotated by projects.querysets on list endpoints
+        if hasattr(obj, "approved_milestones_count"):
+            return obj.approved_milestones_count
         try:
             return obj.milestones.filter(status="approved").count()
         except Exception:
             return 0
 
     def get_total_milestones(self, obj):
+        if hasattr(obj, "total_milestones_count"):
+            return obj.total_milestones_count
         try:
             return obj.milestones.count()
         except Exception:
@@ -472,12 +481,17 @@ class ClientProjectSerializer(serializers.ModelSerializer):
         return sum(float(inst.amount) for inst in obj.installments.all())
 
     def get_approved_milestones(self, obj):
+        # Annotated by projects.querysets on list endpoints
+        if hasattr(obj, "approved_milestones_count"):
+            return obj.approved_milestones_count
         try:
             return obj.milestones.filter(status="approved").count()
         except Exception:
             return 0
 
     def get_total_milestones(self, obj):
+        if hasattr(obj, "total_milestones_count"):
+            return obj.total_milestones_count
         try:
             return obj.milestones.count()
         except Exception:
@@ -570,6 +584,9 @@ class SellerReceiptProjectSerializer(serializers.ModelSerializer):
 
     def get_completion_date(self, obj):
         # Use the latest milestone completion_date as completion date fallback
+        if hasattr(obj, "latest_completion_date"):
+            latest = obj.latest_completion_date
+            return latest.strftime("%Y-%m-%d %H:%M:%S") if latest else None
         latest = (
             obj.milestones.filter(completion_date__isnull=False)
             .order_by("-completion_date")
@@ -580,8 +597,7 @@ class SellerReceiptProjectSerializer(serializers.ModelSerializer):
     def get_payment_id(self, obj):
         """Get the Stripe payment ID for this project"""
         try:
-            from payments.models import Payment
-            payment = Payment.objects.filter(project=obj).order_by("-created_at").first()
+            payment = latest_payment(obj)
             return payment.stripe_payment_id if payment else None
         except Exception:
             return None
@@ -589,8 +605,7 @@ class SellerReceiptProjectSerializer(serializers.ModelSerializer):
     def get_payment_status(self, obj):
         """Get the payment status for this project"""
         try:
-            from payments.models import Payment
-            payment = Payment.objects.filter(project=obj).order_by("-created_at").first()
+            payment = latest_payment(obj)
             
             # If project is completed, payment should be paid
             if obj.status == "completed" and payment:
@@ -617,8 +632,7 @@ class SellerReceiptProjectSerializer(serializers.ModelSerializer):
     def get_payment_date(self, obj):
         """Get the payment date for this project"""
         try:
-            from payments.models import Payment
-            payment = Payment.objects.filter(project=obj).order_by("-created_at").first()
+            payment = latest_payment(obj)
             return payment.created_at.strftime("%Y-%m-%d %H:%M:%S") if payment else None
         except Exception:
             return None
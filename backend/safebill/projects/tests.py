@@ -1,3 +1,116 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from payments.models import Payment
+from projects.models import Milestone, PaymentInstallment, Project, Quote
+
+User = get_user_model()
+
+
+class ProjectListQueryCountTests(TestCase):
+    """
+    The project list and receipt endpoints run a fixed number of queries,
+    however many projects the seller/buyer has. A higher count means a
+    serializer field went back to querying per project.
+    """
+
+    # (url name, query params, which user calls it, expected queries)
+    ENDPOINTS = [
+        ("project-list", {}, "seller", 2),
+        ("project-list", {"page_size": 10}, "seller", 2),
+        ("completed-projects", {}, "seller", 2),
+        ("expired-project-invites", {}, "seller", 2),
+        ("client-project-list", {}, "buyer", 3),
+        ("client-project-list", {"page_size": 10}, "buyer", 3),
+        ("client-projects-pending", {}, "buyer", 3),
+        ("seller-receipts", {}, "seller", 4),
+        ("buyer-receipts", {}, "buyer", 4),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            "seller": User.objects.create(
+                username="query_check_seller", email="query_check_seller@example.com", role="seller"
+            ),
+            "buyer": User.objects.create(
+                username="query_check_buyer", email="query_check_buyer@example.com", role="buyer"
+            ),
+        }
+        cls._create_projects(3)
+
+    @classmethod
+    def _create_projects(cls, count):
+        # bulk_create skips the model signals (HubSpot sync, emails) and Milestone.save limits
+        seller, buyer = cls.users["seller"], cls.users["buyer"]
+        start = Project.objects.count()
+        expired = timezone.now() - timedelta(days=1)
+        projects = Project.objects.bulk_create([
+            Project(
+                user=seller,
+                client=buyer,
+                client_email=buyer.email,
+                name=f"Query check {i}",
+                status=["completed", "pending", "in_progress"][i % 3],
+                invite_token=f"query-check-{i}",
+                invite_token_expiry=expired,
+            )
+            for i in range(start, start + count)
+        ])
+        Quote.objects.bulk_create([
+            Quote(project=project, file="quotes/query-check.pdf", reference_number=f"QC-{project.pk}")
+            for project in projects
+        ])
+        installments = PaymentInstallment.objects.bulk_create([
+            PaymentInstallment(project=project, amount=Decimal("100.00"), step=f"Step {step}")
+            for project in projects
+            for step in range(3)
+        ])
+        Milestone.objects.bulk_create([
+            Milestone(
+                project=installment.project,
+                related_installment=installment,
+                name=installment.step,
+                description="",
+                relative_payment=installment.amount,
+                status=["approved", "pending", "not_submitted"][i % 3],
+                completion_date=timezone.now() if i % 3 == 0 else None,
+            )
+            for i, installment in enumerate(installments)
+        ])
+        # An older failed attempt and the successful payment, so receipts must pick the latest
+        Payment.objects.bulk_create([
+            Payment(
+                user=buyer,
+                project=project,
+                amount=Decimal("300.00"),
+                status=status,
+                stripe_payment_id=f"pi_query_check_{project.pk}_{status}",
+            )
+            for project in projects
+            for status in ["failed", "paid"]
+        ])
+
+    def _assert_query_counts(self):
+        factory = APIRequestFactory()
+        for url_name, params, role, queries in self.ENDPOINTS:
+            with self.subTest(endpoint=url_name, params=params):
+                path = reverse(url_name)
+                request = factory.get(path, params)
+                force_authenticate(request, user=self.users[role])
+                with self.assertNumQueries(queries):
+                    response = resolve(path).func(request)
+                self.assertEqual(response.status_code, 200, response.data)
+
+    def test_few_projects(self):
+        self._assert_query_counts()
 
-# Create your tests here.
+    def test_many_projects(self):
+        self._create_projects(30)
+        self._assert_query_counts()
@@ -5,9 +5,11 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.pagination import CursorPagination
 from django.utils import timezone
 from datetime import timedelta
 from .models import Project, Quote, PaymentInstallment, Milestone
+from .querysets import for_client_project_list, for_project_list, for_receipts, latest_payment
 from .serializers import (
     ProjectCreateSerializer,
     ProjectListSerializer,
@@ -145,14 +147,35 @@ class ProjectCreateAPIView(generics.CreateAPIView):
     def perform_create(self, serializer):
         project = serializer.save()
 
+class ProjectCursorPagination(CursorPagination):
+    """
+    Cursor pagination for project lists, newest first.
+
+    Opt-in: only applied when the request sends ``cursor`` or ``page_size``,
+    so clients reading the plain list keep getting it.
+    """
+
+    ordering = "-id"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
 class ProjectListAPIView(generics.ListAPIView):
     serializer_class = ProjectListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ProjectCursorPagination
 
     def get_queryset(self):
         # Only show real projects, not quote chat projects
-        return Project.objects.filter(
-            user=self.request.user, project_type="real_project"
+        return for_project_list(
+            Project.objects.filter(user=self.request.user, project_type="real_project")
         ).order_by("-id")
 
 
@@ -163,11 +186,14 @@ class ClientProjectListAPIView(generics.ListAPIView):
 
     serializer_class = ClientProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ProjectCursorPagination
 
     def get_queryset(self):
         from django.db.models import Q
-        return Project.objects.filter(
-            Q(client=self.request.user) | Q(client__isnull=True, client_email__iexact=self.request.user.email)
+        return for_client_project_list(
+            Project.objects.filter(
+                Q(client=self.request.user) | Q(client__isnull=True, client_email__iexact=self.request.user.email)
+            )
         ).order_by("-id")
 
 
@@ -312,8 +338,7 @@ class ProjectCompletionAPIView(APIView):
             )
 
         # Verify payment is completed before marking project as completed
-        from payments.models import Payment
-        payment = Payment.objects.filter(project=project).order_by("-created_at").first()
+        payment = latest_payment(project)
         if payment and payment.status != "paid":
             return Response(
                 {
@@ -768,6 +793,7 @@ class MilestoneApprovalAPIView(APIView):
                     milestone_amount=milestone.relative_payment,
                     platform_fee_percentage=project.platform_fee_percentage,
                     vat_rate=project.vat_rate,
+                    milestone_id=milestone.id,
                 )
             except Exception as e:
                 logger.error(
@@ -843,8 +869,7 @@ class MilestoneApprovalAPIView(APIView):
                 )
                 if not has_unapproved and project.status != "completed":
                     # Verify payment is completed before auto-completing project
-                    from payments.models import Payment
-                    payment = Payment.objects.filter(project=project).order_by("-created_at").first()
+                    payment = latest_payment(project)
                     if payment and payment.status == "paid":
                         project.status = "completed"
                         project.save(update_fields=["status"])
@@ -928,17 +953,18 @@ class ClientProjectsWithPendingMilestonesAPIView(generics.ListAPIView):
 
     serializer_class = ClientProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ProjectCursorPagination
 
     def get_queryset(self):
-        from django.db.models import Q
-        return (
+        from django.db.models import Exists, OuterRef, Q
+        # EXISTS instead of joining milestones + DISTINCT over every project column
+        has_pending = Milestone.objects.filter(project=OuterRef("pk"), status="pending")
+        return for_client_project_list(
             Project.objects.filter(
                 Q(client=self.request.user) | Q(client__isnull=True, client_email__iexact=self.request.user.email),
-                milestones__status="pending"
+                Exists(has_pending),
             )
-            .distinct()
-            .order_by("-id")
-        )
+        ).order_by("-id")
 
 
 class ClientProjectDetailAPIView(generics.RetrieveAPIView):
@@ -951,8 +977,10 @@ class ClientProjectDetailAPIView(generics.RetrieveAPIView):
 
     def get_queryset(self):
         from django.db.models import Q
-        return Project.objects.filter(
-            Q(client=self.request.user) | Q(client__isnull=True, client_email__iexact=self.request.user.email)
+        return for_client_project_list(
+            Project.objects.filter(
+                Q(client=self.request.user) | Q(client__isnull=True, client_email__iexact=self.request.user.email)
+            )
         )
 
 
@@ -972,9 +1000,9 @@ def get_completed_projects(request):
         )
 
     # Get all completed projects for this seller
-    completed_projects = Project.objects.filter(user=user, status="completed").order_by(
-        "-created_at"
-    )
+    completed_projects = for_project_list(
+        Project.objects.filter(user=user, status="completed")
+    ).order_by("-created_at")
 
     # Serialize the projects
     serializer = ProjectListSerializer(completed_projects, many=True)
@@ -996,12 +1024,9 @@ def seller_receipts(request):
             {"detail": "Only sellers can access this endpoint."}, status=403
         )
 
-    projects = (
+    projects = for_receipts(
         Project.objects.filter(user=user, status="completed")
-        .prefetch_related("milestones", "installments", "quote", "payment_set")
-        .select_related("user__business_detail", "client__business_detail", "client__buyer_profile")
-        .order_by("-created_at")
-    )
+    ).order_by("-created_at")
     serializer = SellerReceiptProjectSerializer(projects, many=True)
     return Response({"projects": serializer.data, "count": projects.count()})
 
@@ -1018,12 +1043,9 @@ def buyer_receipts(request):
     if not (getattr(user, "role", None) in ["buyer", "professional-buyer"]):
         return Response({"detail": "Only buyers can access this endpoint."}, status=403)
 
-    projects = (
+    projects = for_receipts(
         Project.objects.filter(client=user, status="completed")
-        .prefetch_related("milestones", "installments", "quote", "payment_set")
-        .select_related("user__business_detail", "client__business_detail", "client__buyer_profile")
-        .order_by("-created_at")
-    )
+    ).order_by("-created_at")
     serializer = SellerReceiptProjectSerializer(projects, many=True)
     return Response({"projects": serializer.data, "count": projects.count()})
 
@@ -1042,13 +1064,15 @@ def list_expired_project_invites(request):
             status=status.HTTP_403_FORBIDDEN,
         )
 
-    expired = Project.objects.filter(
-        user=user,
-        invite_token__isnull=False,
-        invite_token_expiry__isnull=False,
-        invite_token_expiry__lt=timezone.now(),
-        invite_token_used=False,
-        status="pending",
+    expired = for_project_list(
+        Project.objects.filter(
+            user=user,
+            invite_token__isnull=False,
+            invite_token_expiry__isnull=False,
+            invite_token_expiry__lt=timezone.now(),
+            invite_token_used=False,
+            status="pending",
+        )
     ).order_by("-created_at")
 
     serializer = ProjectListSerializer(expired, many=True)
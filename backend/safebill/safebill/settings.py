@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 from datetime import timedelta
 
@@ -108,6 +109,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # third-party-apps
     "rest_framework",
     "rest_framework_simplejwt.token_blacklist",
@@ -176,6 +178,39 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Shared Redis for cross-process locks, debounce windows and counters (utils.redis_client)
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0')
+
+# Django cache shared by every Gunicorn, Daphne and Celery process (HubSpot circuit
+# breaker and rate limiter, utils.cache.get_or_compute). CACHE_BACKEND=locmem gives
+# a per-process cache for local development without Redis
+if os.environ.get('CACHE_BACKEND', 'redis').lower() == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_REDIS_URL', REDIS_URL),
+            'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'safebill'),
+            # Bump to invalidate every cached value at once (e.g. after changing what is cached)
+            'VERSION': int(os.environ.get('CACHE_VERSION', 1)),
+            'TIMEOUT': int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300)),
+            'OPTIONS': {
+                'serializer': 'utils.cache.CompressedRedisSerializer',
+                'socket_connect_timeout': 2,
+                'socket_timeout': 2,
+                'health_check_interval': 30,
+            },
+        },
+    }
+
+# Cached values of at least this many bytes (pickled) are zlib-compressed
+CACHE_COMPRESS_MIN_BYTES = int(os.environ.get('CACHE_COMPRESS_MIN_BYTES', 1024))
+
 # Note: MIDDLEWARE is already defined above, no need to redefine
 
 # Database
@@ -193,6 +228,61 @@ DATABASES = {
 }
 
 
+def _process_type():
+    # Settings load while the safebill package (and its Celery app) is imported,
+    # before wsgi.py/asgi.py run, so infer from the launched program unless set
+    explicit = os.environ.get("DJANGO_PROCESS_TYPE")
+    if explicit:
+        return explicit.lower()
+    program = sys.argv[0].lower() if sys.argv else ""
+    if "celery" in program:
+        return "celery"
+    if any(server in program for server in ("daphne", "uvicorn", "hypercorn")):
+        return "asgi"
+    # With daphne installed, "manage.py runserver" is daphne's ASGI runserver
+    if "runserver" in sys.argv[1:2] and "daphne" in INSTALLED_APPS:
+        return "asgi"
+    return "web"
+
+# "web" (WSGI), "asgi" (Daphne/Channels) or "celery"; connection reuse and pool
+# sizes are tuned per process type below. Set DJANGO_PROCESS_TYPE explicitly
+# when the server binary does not reveal it (e.g. gunicorn with uvicorn workers)
+DJANGO_PROCESS_TYPE = _process_type()
+
+# Connection reuse: "persistent" (CONN_MAX_AGE + health checks), "pool" (Django's
+# built-in pool; needs "psycopg[pool]" installed in place of psycopg2-binary) or
+# "none" (a new connection per request/task)
+DB_CONNECTION_MODE = os.environ.get("DB_CONNECTION_MODE", "persistent").lower()
+if DB_CONNECTION_MODE == "pool":
+    _pool_process = DJANGO_PROCESS_TYPE.upper()
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            # Per process: web workers serve one request at a time, ASGI serves many
+            # concurrently from a thread pool, Celery one task per worker process
+            "min_size": int(os.environ.get(f"DB_POOL_MIN_SIZE_{_pool_process}", 1)),
+            "max_size": int(
+                os.environ.get(
+                    f"DB_POOL_MAX_SIZE_{_pool_process}",
+                    {"WEB": 4, "ASGI": 10, "CELERY": 2}.get(_pool_process, 4),
+                )
+            ),
+            # Seconds a request waits for a free connection before erroring
+            "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+        },
+    }
+elif DB_CONNECTION_MODE == "persistent":
+    # ASGI defaults to 0: connections are per thread and persistent ones pile up
+    # in the sync_to_async executor; use the pool mode there instead
+    DATABASES["default"]["CONN_MAX_AGE"] = int(
+        os.environ.get(
+            f"DB_CONN_MAX_AGE_{DJANGO_PROCESS_TYPE.upper()}",
+            {"asgi": 0}.get(DJANGO_PROCESS_TYPE, 60),
+        )
+    )
+    # Ping reused connections at the start of each request/task, dropping dead ones
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -303,6 +393,29 @@ STRIPE_CONNECT_WEBHOOK_SECRET = os.environ.get("STRIPE_CONNECT_WEBHOOK_SECRET")
 STRIPE_VERIFICATION_FLOW_ID = os.environ.get("STRIPE_VERIFICATION_FLOW_ID")
 STRIPE_SUBSCRIPTION_WEBHOOK_SECRET = os.environ.get("STRIPE_SUBSCRIPTION_WEBHOOK_SECRET", "")
 STRIPE_SUBSCRIPTION_PRICE_ID = os.environ.get("STRIPE_SUBSCRIPTION_PRICE_ID", "")
+# Attempts before a failing webhook event is given up on (later events for its object then proceed)
+STRIPE_WEBHOOK_MAX_ATTEMPTS = int(os.environ.get("STRIPE_WEBHOOK_MAX_ATTEMPTS", 5))
+# Stripe client (utils.stripe_gateway): SDK network retries, HTTP timeout (s),
+# pooled connections per process and the latency above which calls are logged as slow (ms)
+STRIPE_MAX_NETWORK_RETRIES = int(os.environ.get("STRIPE_MAX_NETWORK_RETRIES", 2))
+STRIPE_HTTP_TIMEOUT = float(os.environ.get("STRIPE_HTTP_TIMEOUT", 30))
+STRIPE_HTTP_POOL_SIZE = int(os.environ.get("STRIPE_HTTP_POOL_SIZE", 10))
+STRIPE_SLOW_CALL_MS = int(os.environ.get("STRIPE_SLOW_CALL_MS", 1000))
+# Seconds a stored Connect account snapshot is served before check_stripe_status asks Stripe again
+STRIPE_ACCOUNT_STATUS_MAX_AGE = int(os.environ.get("STRIPE_ACCOUNT_STATUS_MAX_AGE", 300))
+# Matured payout holds released per transaction by the scheduled bulk release
+PAYOUT_HOLD_RELEASE_BATCH_SIZE = int(os.environ.get("PAYOUT_HOLD_RELEASE_BATCH_SIZE", 500))
+# Seller payout runs (payments.payout_runs): minimum available_for_payout, concurrent
+# Stripe transfers and sellers claimed per batch
+PAYOUT_RUN_THRESHOLD = float(os.environ.get("PAYOUT_RUN_THRESHOLD", 10))
+PAYOUT_RUN_MAX_WORKERS = int(os.environ.get("PAYOUT_RUN_MAX_WORKERS", 8))
+PAYOUT_RUN_BATCH_SIZE = int(os.environ.get("PAYOUT_RUN_BATCH_SIZE", 200))
+# Seller location search: default radius (km) and an optional postal_code,latitude,longitude
+# CSV replacing the bundled accounts/data/postal_code_centroids.csv
+SELLER_SEARCH_RADIUS_KM = float(os.environ.get("SELLER_SEARCH_RADIUS_KM", 30))
+SELLER_POSTAL_CENTROIDS_FILE = os.environ.get("SELLER_POSTAL_CENTROIDS_FILE", "")
+# Seconds browsers/CDNs may reuse a seller listing before revalidating it (ETag/Last-Modified)
+SELLER_LISTING_MAX_AGE = int(os.environ.get("SELLER_LISTING_MAX_AGE", 60))
 
 # X-Frame-Options disabled for PDF iframe embedding
 
@@ -400,6 +513,30 @@ CELERY_BEAT_SCHEDULE = {
             'priority': 1,
         }
     },
+    'rollup-platform-revenue': {
+        'task': 'adminpanelApp.tasks.rollup_platform_revenue_task',
+        'schedule': float(os.environ.get('PLATFORM_REVENUE_ROLLUP_INTERVAL', 60.0)),
+        'options': {
+            'queue': 'emails',
+            'priority': 5,
+        }
+    },
+    'release-matured-payout-holds': {
+        'task': 'payments.tasks.release_matured_payout_holds_task',
+        'schedule': float(os.environ.get('PAYOUT_HOLD_RELEASE_INTERVAL', 3600.0)),
+        'options': {
+            'queue': 'emails',
+            'priority': 5,
+        }
+    },
+    'requeue-stale-stripe-webhook-events': {
+        'task': 'connect_stripe.tasks.requeue_stale_stripe_webhook_events',
+        'schedule': float(os.environ.get('STRIPE_WEBHOOK_REQUEUE_INTERVAL', 300.0)),
+        'options': {
+            'queue': 'emails',
+            'priority': 6,
+        }
+    },
     'no-project-nurture-orchestrator': {
         'task': 'feedback.tasks.orchestrate_no_project_nurture_task',
         'schedule': float(os.environ.get('NO_PROJECT_ORCHESTRATOR_INTERVAL', 86400.0)),
@@ -424,6 +561,14 @@ CELERY_BEAT_SCHEDULE = {
             'priority': 4,
         }
     },
+    'verify-seller-ratings': {
+        'task': 'accounts.tasks.verify_seller_ratings_task',
+        'schedule': float(os.environ.get('SELLER_RATING_VERIFY_INTERVAL', 86400.0)),
+        'options': {
+            'queue': 'emails',
+            'priority': 2,
+        }
+    },
     'cleanup-old-email-logs': {
         'task': 'feedback.tasks.cleanup_old_email_logs_task',
         'schedule': float(os.environ.get('EMAIL_LOG_CLEANUP_INTERVAL', '86400.0')),  # Default: daily (24 hours)
@@ -434,6 +579,17 @@ CELERY_BEAT_SCHEDULE = {
     },
 }
 
+# Automatic seller payout runs are opt-in: set PAYOUT_RUN_INTERVAL (e.g. 604800 for weekly)
+if os.environ.get('PAYOUT_RUN_INTERVAL'):
+    CELERY_BEAT_SCHEDULE['run-seller-payouts'] = {
+        'task': 'payments.tasks.run_seller_payouts_task',
+        'schedule': float(os.environ.get('PAYOUT_RUN_INTERVAL')),
+        'options': {
+            'queue': 'emails',
+            'priority': 5,
+        }
+    }
+
 # Celery Beat max loop interval
 CELERY_BEAT_MAX_LOOP_INTERVAL = int(os.environ.get('CELERY_BEAT_MAX_LOOP_INTERVAL', 3600))
 
@@ -487,6 +643,15 @@ HUBSPOT_PROJECT_SIGNALS_ENABLED = os.environ.get('HUBSPOT_PROJECT_SIGNALS_ENABLE
 HUBSPOT_MILESTONE_SIGNALS_ENABLED = os.environ.get('HUBSPOT_MILESTONE_SIGNALS_ENABLED', 'True').lower() == 'true'
 HUBSPOT_SIGNALS_DEBUG = os.environ.get('HUBSPOT_SIGNALS_DEBUG', 'False').lower() == 'true'
 
+# Debounce window for signal-triggered syncs: bursts of saves on the same object
+# are coalesced into one trailing sync that runs this many seconds after the first
+HUBSPOT_SYNC_DEBOUNCE_SECONDS = int(os.environ.get('HUBSPOT_SYNC_DEBOUNCE_SECONDS', 10))
+# Upper bound for the cross-process "task running" lock (released early on completion)
+HUBSPOT_TASK_LOCK_TIMEOUT = int(os.environ.get('HUBSPOT_TASK_LOCK_TIMEOUT', 300))
+# How long pipeline/stage definitions are cached (process memory + Redis) before
+# being re-fetched; run `refresh_hubspot_pipelines` after editing pipelines in HubSpot
+HUBSPOT_PIPELINE_CACHE_TTL = int(os.environ.get('HUBSPOT_PIPELINE_CACHE_TTL', 3600))
+
 # Rate limiting and circuit breaker
 HUBSPOT_RATE_LIMIT_MAX = int(os.environ.get('HUBSPOT_RATE_LIMIT_MAX', 100))
 HUBSPOT_RATE_LIMIT_WINDOW = int(os.environ.get('HUBSPOT_RATE_LIMIT_WINDOW', 60))
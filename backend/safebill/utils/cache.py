@@ -0,0 +1,110 @@
+"""
+Helpers for the shared Redis cache (settings.CACHES['default'])
+Values are pickled like Django's own Redis backend, and large ones are
+zlib-compressed. get_or_compute() lets one process rebuild an expired entry
+while the others wait for it instead of all recomputing at once.
+"""
+import logging
+import pickle
+import time
+import zlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.redis import RedisSerializer
+
+logger = logging.getLogger(__name__)
+
+# Seconds between cache reads while another process computes the value
+WAIT_POLL_INTERVAL = 0.05
+
+_MISSING = object()
+
+
+class CompressedRedisSerializer(RedisSerializer):
+    """
+    RedisSerializer that zlib-compresses pickled values of at least
+    CACHE_COMPRESS_MIN_BYTES. Compressed payloads start with a marker byte that
+    neither pickles (b'\\x80') nor plain integers (kept as-is for incr/decr) use.
+    """
+
+    MARKER = b'z'
+
+    def __init__(self, protocol=None):
+        super().__init__(protocol)
+        self.min_size = getattr(settings, 'CACHE_COMPRESS_MIN_BYTES', 1024)
+        self.level = getattr(settings, 'CACHE_COMPRESS_LEVEL', 6)
+
+    def dumps(self, obj):
+        data = super().dumps(obj)
+        if isinstance(data, int) or len(data) < self.min_size:
+            return data
+        compressed = zlib.compress(data, self.level)
+        if len(compressed) + 1 >= len(data):
+            return data
+        return self.MARKER + compressed
+
+    def loads(self, data):
+        if data[:1] == self.MARKER:
+            return pickle.loads(zlib.decompress(data[1:]))
+        return super().loads(data)
+
+
+def get_or_compute(key, compute, timeout=DEFAULT_TIMEOUT, lock_timeout=30, wait_timeout=5, version=None, alias='default'):
+    """
+    Return the cached value of ``key``, computing and storing it on a miss.
+
+    On a miss, only the process that wins a short lock (cache.add) calls
+    ``compute``; the others poll the cache for up to ``wait_timeout`` seconds
+    and only compute themselves if the value still has not appeared. A cache
+    outage never fails the caller: the value is then computed directly.
+
+    Args:
+        key: Cache key (the backend adds KEY_PREFIX and the version)
+        compute: Callable returning the value; None is a valid, cached value
+        timeout: Expiry of the cached value in seconds (default: cache TIMEOUT)
+        lock_timeout: Expiry of the lock, so a crashed computation cannot hold it
+        wait_timeout: Seconds to wait for another process's computation
+        version: Cache key version (default: cache VERSION)
+        alias: Cache alias in settings.CACHES
+
+    Returns:
+        The cached or freshly computed value
+    """
+    cache = caches[alias]
+    lock_key = f"{key}:lock"
+    try:
+        value = cache.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+        locked = cache.add(lock_key, 1, lock_timeout, version=version)
+    except Exception as e:
+        logger.warning(f"Cache unavailable for {key}, computing directly: {e}")
+        return compute()
+
+    if not locked:
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_POLL_INTERVAL)
+            try:
+                value = cache.get(key, _MISSING, version=version)
+            except Exception:
+                break
+            if value is not _MISSING:
+                return value
+        logger.info(f"Timed out waiting for {key} to be computed elsewhere; computing it here")
+
+    try:
+        value = compute()
+        try:
+            cache.set(key, value, timeout, version=version)
+        except Exception as e:
+            logger.warning(f"Failed to cache {key}: {e}")
+        return value
+    finally:
+        if locked:
+            try:
+                cache.delete(lock_key, version=version)
+            except Exception:
+                pass
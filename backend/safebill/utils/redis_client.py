@@ -0,0 +1,72 @@
+"""
+Shared Redis connection for cross-process coordination
+Used for locks, debounce windows and counters that must be visible to every
+Gunicorn, Daphne and Celery process (unlike module-level dicts or LocMemCache)
+"""
+import logging
+import threading
+import time
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before trying to reconnect after Redis was unreachable
+RECONNECT_BACKOFF = 30
+
+# Deletes a lock only if it still holds the caller's token, so a process whose
+# lock expired mid-run cannot release the lock another process now holds
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_client = None
+_last_failure = 0.0
+_client_lock = threading.Lock()
+
+
+def get_redis_client():
+    """
+    Return a process-wide Redis client, or None if Redis is unreachable.
+
+    The client is created lazily from settings.REDIS_URL and reused, so each
+    process keeps a single connection pool. Callers must handle None and fall
+    back to their local behaviour.
+    """
+    global _client, _last_failure
+    if _client is not None:
+        return _client
+
+    if time.time() - _last_failure < RECONNECT_BACKOFF:
+        return None
+
+    with _client_lock:
+        if _client is None:
+            try:
+                client = redis.Redis.from_url(
+                    settings.REDIS_URL,
+                    socket_connect_timeout=2,
+                    socket_timeout=2,
+                    health_check_interval=30,
+                )
+                client.ping()
+                _client = client
+            except Exception as e:
+                _last_failure = time.time()
+                logger.warning(f"Redis not available at {settings.REDIS_URL}: {e}")
+                return None
+    return _client
+
+
+def release_lock(client, key, token):
+    """
+    Delete the lock ``key`` if it still holds ``token``.
+
+    Returns:
+        bool: False if the lock had expired and is now held by someone else
+    """
+    return bool(client.eval(RELEASE_LOCK_SCRIPT, 1, key, token))
@@ -0,0 +1,119 @@
+"""
+Thin gateway in front of the Stripe SDK
+Configures the SDK once per process (API key, pooled HTTP session, bounded
+network retries) instead of setting stripe.api_key on every request, attaches
+deterministic idempotency keys to money-moving calls so a retried request can
+never move money twice, and logs the latency of every call
+"""
+import hashlib
+import logging
+import threading
+import time
+
+import requests
+import stripe
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_stripe():
+    """
+    Configure the Stripe SDK for this process; safe to call repeatedly.
+
+    The SDK retries network errors, 409s and responses flagged with
+    Stripe-Should-Retry up to STRIPE_MAX_NETWORK_RETRIES times with backoff,
+    reusing the same idempotency key, so retries are safe for POSTs too.
+    """
+    global _configured
+    if _configured:
+        return
+
+    with _configure_lock:
+        if _configured:
+            return
+        pool_size = getattr(settings, "STRIPE_HTTP_POOL_SIZE", 10)
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+
+        stripe.api_key = settings.STRIPE_API_KEY
+        stripe.max_network_retries = getattr(settings, "STRIPE_MAX_NETWORK_RETRIES", 2)
+        stripe.default_http_client = stripe.RequestsClient(
+            timeout=getattr(settings, "STRIPE_HTTP_TIMEOUT", 30),
+            session=session,
+        )
+        _configured = True
+
+
+def idempotency_key(operation, *parts):
+    """
+    Build a deterministic idempotency key for a money-moving call.
+
+    The same operation and parts always give the same key, so repeating an
+    attempt (a retried task or a double-submitted request) is answered by
+    Stripe with the original result instead of creating a second object.
+
+    Args:
+        operation: Kind of call, e.g. "transfer" or "refund"
+        *parts: Values identifying this attempt (ids, amounts, versions)
+
+    Returns:
+        str: e.g. ``safebill-transfer-3f2a...``
+    """
+    digest = hashlib.sha256(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f"safebill-{operation}-{digest[:48]}"
+
+
+def call(operation, method, *args, **kwargs):
+    """
+    Call a Stripe SDK method on the configured client and log its latency.
+
+    Args:
+        operation: Name used in logs, e.g. "Transfer.create"
+        method: SDK callable, e.g. stripe.Transfer.create
+        *args, **kwargs: Passed through (including idempotency_key)
+
+    Returns:
+        The SDK result; Stripe errors are re-raised unchanged.
+    """
+    configure_stripe()
+    slow_call_ms = getattr(settings, "STRIPE_SLOW_CALL_MS", 1000)
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        return method(*args, **kwargs)
+    except stripe.error.StripeError as e:
+        outcome = type(e).__name__
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        message = f"Stripe {operation} {outcome} in {elapsed_ms:.0f} ms"
+        if elapsed_ms >= slow_call_ms:
+            logger.warning(message)
+        else:
+            logger.info(message)
+
+
+def create_transfer(idempotency_key, **params):
+    """Create a Transfer to a connected account (idempotency key required)."""
+    return call("Transfer.create", stripe.Transfer.create, idempotency_key=idempotency_key, **params)
+
+
+def create_refund(idempotency_key, **params):
+    """Create a Refund (idempotency key required)."""
+    return call("Refund.create", stripe.Refund.create, idempotency_key=idempotency_key, **params)
+
+
+def retrieve_account(account_id):
+    """Retrieve a connected account."""
+    return call("Account.retrieve", stripe.Account.retrieve, account_id)
+
+
+def retrieve_checkout_session(session_id):
+    """Retrieve a Checkout Session."""
+    return call("checkout.Session.retrieve", stripe.checkout.Session.retrieve, session_id)